@@ -11,13 +11,12 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 import streamlit as st
-import dspy
 from config import Config
 from src.utils.model_factory import ModelFactory
-from src.modules.rag import AuraArchitect
-from src.modules.multihop import AuraMultiHop
-from src.modules.agent import AuraAgent
-from src.modules.reflector import AuraReflector
+from src.utils.engines import get_engine
+from src.retrieval.cache import get_retrieval_cache
+from src.utils.streaming import stream_events
+from src.utils.tracing import capture, waterfall
 
 # =============================================================================
 # Page Configuration
@@ -267,7 +266,7 @@ with st.sidebar:
     st.markdown('<p class="config-label">🏗️ Architect Mode</p>', unsafe_allow_html=True)
     mode = st.selectbox(
         "Mode",
-        ["Standard RAG", "Multi-Hop Reasoning", "Autonomous ReAct Agent", "Self-Reflecting Architect"],
+        ["Standard RAG", "Multi-Hop Reasoning", "Multi-Hop Fan-Out", "Autonomous ReAct Agent", "Self-Reflecting Architect"],
         label_visibility="collapsed"
     )
     
@@ -275,7 +274,7 @@ with st.sidebar:
     st.markdown('<p class="config-label">🔍 Retrieval Mode</p>', unsafe_allow_html=True)
     retrieval_mode = st.selectbox(
         "Retrieval Mode",
-        ["📚 Local Knowledge Base (Stable)", "🌐 ColBERTv2 Wikipedia (Remote)"],
+        ["📚 Local Knowledge Base (Stable)", "📂 Local Corpus (BM25)", "🌐 ColBERTv2 Wikipedia (Remote)"],
         index=0,  # Default to Local Knowledge Base (always works)
         label_visibility="collapsed"
     )
@@ -290,10 +289,41 @@ with st.sidebar:
             label_visibility="collapsed"
         )
         st.warning("⚠️ Remote server may be unstable. Use 'Local Knowledge Base' for reliability.")
+        if Config.RETRIEVAL_CACHE_ENABLED:
+            cache_stats = get_retrieval_cache(
+                Config.RETRIEVAL_CACHE_PATH, Config.RETRIEVAL_CACHE_TTL, Config.RETRIEVAL_CACHE_MAX_ENTRIES
+            ).stats()
+            st.caption(
+                f"🗄️ Retrieval cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                f"(~{cache_stats['saved_seconds']:.1f}s saved)"
+            )
+    
+    # Only show corpus path input if a local corpus is selected
+    retriever_path = Config.LOCAL_CORPUS_PATH
+    if "Local Corpus" in retrieval_mode:
+        st.markdown('<p class="config-label">📂 Corpus Path (JSONL or compiled index dir)</p>', unsafe_allow_html=True)
+        retriever_path = st.text_input(
+            "Corpus Path",
+            value=Config.LOCAL_CORPUS_PATH,
+            label_visibility="collapsed"
+        )
     
     st.markdown('<p class="config-label">📊 Top-K Results</p>', unsafe_allow_html=True)
     top_k = st.slider("Top-K", 1, 10, 3, label_visibility="collapsed")
     
+    st.markdown('<p class="config-label">🎯 Reranking</p>', unsafe_allow_html=True)
+    reranker_type = st.selectbox(
+        "Reranking",
+        list(ModelFactory.RERANKERS),
+        index=list(ModelFactory.RERANKERS).index(Config.RERANKER) if Config.RERANKER in ModelFactory.RERANKERS else 0,
+        format_func=ModelFactory.RERANKERS.get,
+        label_visibility="collapsed"
+    )
+    if reranker_type != "none":
+        st.caption(f"Over-fetches {Config.RERANK_FETCH_K} candidates and keeps the best {top_k}.")
+    
+    show_trace = st.checkbox("⏱️ Show request trace", value=False, help="Per-step latency and token waterfall")
+    
     # Configuration Status
     st.markdown("---")
     if provider_key == "ollama":
@@ -304,43 +334,36 @@ with st.sidebar:
         st.warning("⚠️ Enter API Key to continue")
 
 # =============================================================================
-# Configure DSPy (Thread-safe approach with change detection)
+# Engine (shared across sessions; requests run in a scoped dspy context)
 # =============================================================================
 
 # Map UI choice to retriever type
-retriever_type = "mock" if "Local Knowledge Base" in retrieval_mode else "colbert"
+if "Local Knowledge Base" in retrieval_mode:
+    retriever_type = "mock"
+elif "Local Corpus" in retrieval_mode:
+    # Directories are compiled indexes (python main.py build-index)
+    retriever_type = "index" if os.path.isdir(retriever_path) else "bm25"
+else:
+    retriever_type = "colbert"
 
-# Create a config hash to detect changes
-config_hash = f"{provider_key}:{model}:{retrieval_mode}:{retriever_url}"
+# UI modes -> ModelFactory.get_module modes
+MODE_KEYS = {
+    "Standard RAG": "rag",
+    "Multi-Hop Reasoning": "multihop",
+    "Multi-Hop Fan-Out": "fanout",
+    "Autonomous ReAct Agent": "agent",
+    "Self-Reflecting Architect": "reflector",
+}
 
-# Initialize session state
-if 'dspy_configured' not in st.session_state:
-    st.session_state.dspy_configured = False
-    st.session_state.config_error = None
-    st.session_state.config_hash = None
-
-# Reconfigure if settings changed OR not configured yet
-if st.session_state.config_hash != config_hash:
-    st.session_state.dspy_configured = False
-
-# Prepare and configure DSPy
-if (provider_key == "ollama" or api_key) and not st.session_state.dspy_configured:
+# Built once per (provider, model, retriever, url/path, k) for the whole process,
+# then a dictionary lookup on every rerun and for every other session
+engine, config_error = None, None
+if provider_key == "ollama" or api_key:
     try:
-        lm = ModelFactory.get_model(provider_key, model, api_key)
-        rm = ModelFactory.get_retriever(retriever_type, retriever_url, top_k)
-        dspy.settings.configure(lm=lm, rm=rm)
-        st.session_state.dspy_configured = True
-        st.session_state.config_error = None
-        st.session_state.config_hash = config_hash
-    except RuntimeError as e:
-        # If threading error, check if we can just update the hash
-        if "thread that initially configured" in str(e):
-            st.session_state.dspy_configured = True
-            st.session_state.config_error = None
-        else:
-            st.session_state.config_error = str(e)
+        engine = get_engine(provider_key, model, retriever_type, url=retriever_url, path=retriever_path,
+                            k=top_k, api_key=api_key)
     except Exception as e:
-        st.session_state.config_error = str(e)
+        config_error = str(e)
 
 # =============================================================================
 # Hero Section
@@ -368,106 +391,152 @@ with col2:
 # =============================================================================
 # Execution & Results
 # =============================================================================
+def section_header(title):
+    st.markdown(f"""
+    <div class="glass-card">
+        <div class="glass-card-title">{title}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_waterfall(spans):
+    """Per-request trace: one bar per span, offset and sized by time, nested by depth."""
+    rows = waterfall(spans)
+    if not rows:
+        return
+    total = max(r["offset_ms"] + r["duration_ms"] for r in rows) or 1.0
+    html = []
+    for r in rows:
+        attrs = r["attributes"]
+        details = [f"{r['duration_ms']:.0f} ms"]
+        if attrs.get("prompt_tokens") or attrs.get("completion_tokens"):
+            details.append(f"{attrs.get('prompt_tokens', 0)}→{attrs.get('completion_tokens', 0)} tok")
+        if "passages" in attrs:
+            details.append(f"{attrs['passages']} passages")
+        if attrs.get("cache_hit") or attrs.get("retrieval_cache_hit"):
+            details.append("cache hit")
+        if "error" in attrs:
+            details.append("error")
+        html.append(
+            f'<div style="display:flex;align-items:center;font-size:0.8rem;margin:2px 0;">'
+            f'<div style="width:30%;padding-left:{r["depth"] * 12}px;white-space:nowrap;overflow:hidden;">{r["name"]}</div>'
+            f'<div style="width:45%;"><div style="margin-left:{100 * r["offset_ms"] / total:.1f}%;'
+            f'width:{max(0.5, 100 * r["duration_ms"] / total):.1f}%;height:10px;border-radius:3px;'
+            f'background:linear-gradient(135deg, #6366f1, #a855f7);"></div></div>'
+            f'<div style="width:25%;padding-left:8px;color:var(--text-sub);">{" · ".join(details)}</div></div>'
+        )
+    with st.expander(f"⏱️ Request Trace ({total / 1000:.2f}s, {len(rows)} spans)", expanded=False):
+        st.markdown("".join(html), unsafe_allow_html=True)
+
+def render_stream(aura, inputs, query_slot=None, passage_slot=None, text_slot=None, passage_label="Passage"):
+    """
+    Render pipeline events as they arrive: search queries and passages
+    into their slots, then the final text token by token.
+    Returns the final prediction.
+    """
+    if show_trace:
+        with capture() as spans:
+            pred = _render_events(aura, inputs, query_slot, passage_slot, text_slot, passage_label)
+        render_waterfall(spans)
+        return pred
+    return _render_events(aura, inputs, query_slot, passage_slot, text_slot, passage_label)
+
+def _render_events(aura, inputs, query_slot, passage_slot, text_slot, passage_label):
+    text, pred, shown, queries = "", None, 0, []
+    for kind, payload in stream_events(aura, **inputs):
+        if kind == "search_query" and query_slot is not None:
+            hop = f" (hop {payload['hop']})" if payload["hop"] else ""
+            queries.append(f"**Generated Query{hop}:** {payload['query']}")
+            query_slot.info("  \n".join(queries))
+        elif kind == "passages" and passage_slot is not None:
+            with passage_slot:
+                for passage in payload["passages"][:top_k]:
+                    shown += 1
+                    with st.expander(f"{passage_label} {shown}", expanded=False):
+                        st.write(passage)
+        elif kind == "packing" and passage_slot is not None and payload["saved_tokens"]:
+            passage_slot.caption(
+                f"✂️ Context packed to {payload['packed_tokens']} / {payload['budget']} tokens "
+                f"({payload['saved_tokens']} saved, {payload['compressed']} compressed, {payload['dropped']} dropped)"
+            )
+        elif kind == "token" and text_slot is not None:
+            text += payload["text"]
+            text_slot.success(text + "▌")
+        elif kind == "prediction":
+            pred = payload
+    return pred
+
 if run_button:
     # Validation
     if provider_key != "ollama" and not api_key:
         st.error("⚠️ Please provide an API key for cloud providers.")
     elif not query:
         st.warning("Please enter a research goal.")
-    elif hasattr(st.session_state, 'config_error') and st.session_state.config_error:
-        st.error(f"⚠️ Configuration Error: {st.session_state.config_error}")
-    elif not st.session_state.get('dspy_configured', False):
-        st.error("⚠️ DSPy not configured. Please check your settings.")
+    elif config_error:
+        st.error(f"⚠️ Configuration Error: {config_error}")
+    elif engine is None:
+        st.error("⚠️ Engine not configured. Please check your settings.")
     else:
-        with st.spinner("🧠 Cognitive pipeline processing..."):
+        with st.spinner("🧠 Cognitive pipeline processing..."), engine.context():
             try:
-                # DSPy is already configured at module level
-                # Select architecture based on mode
-                if mode == "Standard RAG":
-                    aura = AuraArchitect(k=top_k)
-                    pred = aura(research_goal=query)
-                    
-                    # Display Results
+                # The engine's LM and retriever apply to this request only (and its worker threads)
+                # Select architecture based on mode; results render as the pipeline streams them
+                aura = engine.module(MODE_KEYS[mode], reranker_type)
+                if mode in ("Standard RAG", "Self-Reflecting Architect"):
                     st.markdown("---")
                     
                     # Step 1: Query Generation
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">🔍 Step 1: Query Generation</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    with st.expander("View Reasoning", expanded=False):
-                        st.write(pred.query_rationale)
-                    st.info(f"**Generated Query:** {pred.search_query}")
+                    section_header("🔍 Step 1: Query Generation")
+                    query_reasoning = st.container()
+                    query_slot = st.empty()
                     
                     # Step 2: Retrieved Context
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">📚 Step 2: Retrieved Context</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    for i, passage in enumerate(pred.context[:top_k]):
-                        with st.expander(f"Passage {i+1}", expanded=False):
-                            st.write(passage)
+                    section_header("📚 Step 2: Retrieved Context")
+                    passage_slot = st.container()
                     
                     # Step 3: Synthesized Insight
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">💡 Step 3: Synthesized Insight</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    with st.expander("View Reasoning", expanded=False):
+                    if mode == "Standard RAG":
+                        section_header("💡 Step 3: Synthesized Insight")
+                    else:
+                        section_header("🪞 Step 3: Reflected Insight (Best of 3)")
+                    synthesis_reasoning = st.container()
+                    insight_slot = st.empty()
+                    
+                    pred = render_stream(aura, {"research_goal": query}, query_slot, passage_slot, insight_slot)
+                    
+                    with query_reasoning.expander("View Reasoning", expanded=False):
+                        st.write(pred.query_rationale)
+                    with synthesis_reasoning.expander("View Reasoning", expanded=False):
                         st.write(pred.synthesis_rationale)
-                    st.success(pred.structured_insight)
+                    insight_slot.success(pred.structured_insight)
+                    if mode == "Self-Reflecting Architect":
+                        st.info("This insight was selected from 3 candidate generations using a critic model.")
                     
-                elif mode == "Multi-Hop Reasoning":
-                    aura = AuraMultiHop(max_hops=2, k=top_k)
-                    pred = aura(question=query)
+                elif mode in ("Multi-Hop Reasoning", "Multi-Hop Fan-Out"):
+                    if mode == "Multi-Hop Reasoning":
+                        section_title = "🔄 Multi-Hop Context (2 hops)"
+                    else:
+                        section_title = "🔀 Fan-Out Context (up to 3 hops, 3 queries each)"
                     
                     st.markdown("---")
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">🔄 Multi-Hop Context (2 hops)</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    for i, passage in enumerate(pred.context):
-                        with st.expander(f"Hop Result {i+1}", expanded=False):
-                            st.write(passage)
+                    section_header(section_title)
+                    query_slot = st.empty()
+                    passage_slot = st.container()
                     
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">💡 Final Answer</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.success(pred.answer)
+                    section_header("💡 Final Answer")
+                    answer_slot = st.empty()
                     
-                elif mode == "Autonomous ReAct Agent":
-                    aura = AuraAgent()
-                    pred = aura(question=query)
+                    pred = render_stream(aura, {"question": query}, query_slot, passage_slot, answer_slot,
+                                         passage_label="Hop Result")
+                    answer_slot.success(pred.answer)
                     
+                elif mode == "Autonomous ReAct Agent":
                     st.markdown("---")
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">🤖 Agent Answer</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.success(pred.answer)
-                    st.info("The agent dynamically used tools (retrieval, calculator) to solve this problem.")
-                    
-                elif mode == "Self-Reflecting Architect":
-                    aura = AuraArchitect(k=top_k)
-                    aura.synthesize = AuraReflector(n=3)
-                    pred = aura(research_goal=query)
+                    section_header("🤖 Agent Answer")
+                    answer_slot = st.empty()
                     
-                    st.markdown("---")
-                    st.markdown("""
-                    <div class="glass-card">
-                        <div class="glass-card-title">🪞 Reflected Insight (Best of 3)</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.success(pred.structured_insight)
-                    st.info("This insight was selected from 3 candidate generations using a critic model.")
+                    pred = render_stream(aura, {"question": query}, text_slot=answer_slot)
+                    answer_slot.success(pred.answer)
+                    st.info("The agent dynamically used tools (retrieval, calculator) to solve this problem.")
                     
             except Exception as e:
                 st.error(f"❌ Pipeline Error: {str(e)}")
-
@@ -0,0 +1,137 @@
+"""
+Scripted Fake LM
+================
+A deterministic, offline stand-in for a chat model.
+
+ScriptedLM reads the output fields a DSPy ChatAdapter prompt asks for
+and answers every one of them in the requested type, so every AURA
+module runs end to end without a provider. Answers depend only on the
+prompt (a hash seeds the choice of words), which keeps runs repeatable
+across commits. Text answers reuse words from the prompt, so generated
+search queries hit the benchmark corpus like real ones would.
+
+ReAct prompts get a fixed script: call retrieve_knowledge on the first
+step, then finish once the trajectory has an observation.
+
+Latency is simulated per call as `latency_ms + ms_per_token * completion_tokens`,
+with time.sleep on the sync path and asyncio.sleep on the async one.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import dspy
+from src.retrieval.context_store import estimate_tokens
+
+_FIELD = re.compile(r"`\[\[ ## (\w+) ## \]\]`(?: \(must be formatted as a valid Python ([^)]+)\))?")
+_WORD = re.compile(r"[a-z]{4,}")
+
+
+def _output_fields(prompt: str) -> list:
+    """(name, python type) of each output field the prompt asks for, in order."""
+    instructions = prompt.rsplit("Respond with the corresponding output fields", 1)[-1]
+    return [(name, hint or "str") for name, hint in _FIELD.findall(instructions) if name != "completed"]
+
+
+class ScriptedLM(dspy.BaseLM):
+    """
+    Args:
+        latency_ms: Fixed delay per call
+        ms_per_token: Extra delay per completion token (decode time)
+        words: Words per free-text answer
+        list_items: Items per list answer (e.g. fan-out search queries)
+    """
+
+    def __init__(self, latency_ms: float = 0.0, ms_per_token: float = 0.0, words: int = 24, list_items: int = 3):
+        super().__init__("scripted/fake", model_type="chat", temperature=0.0, max_tokens=1000, cache=False)
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.words = words
+        self.list_items = list_items
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    # --- Answers ---
+
+    def _value(self, name, hint, rng, vocab, prompt):
+        if hint.startswith("Literal["):
+            options = re.findall(r"'([^']*)'", hint)
+            if name == "next_tool_name" and options:
+                # ReAct: search first, finish once something was observed
+                if "observation_0" in prompt and "finish" in options:
+                    return "finish"
+                return next((o for o in options if "retrieve" in o), options[0])
+            return rng.choice(options) if options else ""
+        if name == "next_tool_args":
+            return json.dumps({} if "observation_0" in prompt else {"query": self._text(rng, vocab, 6)})
+        if hint == "bool":
+            return "True"
+        if hint in ("int", "float"):
+            return str(rng.randint(1, 5))
+        if hint.startswith("list[float]") or hint.startswith("list[int]"):
+            # Per-item scores: one per numbered item in the prompt, if any
+            count = len(re.findall(r"^\[\d+\]", prompt, re.MULTILINE)) or self.list_items
+            return json.dumps([rng.randint(1, 5) for _ in range(count)])
+        if hint.startswith("list"):
+            return json.dumps([self._text(rng, vocab, 5) for _ in range(self.list_items)])
+        if hint.startswith("dict"):
+            return "{}"
+        return self._text(rng, vocab, self.words)
+
+    @staticmethod
+    def _text(rng, vocab, n):
+        return " ".join(rng.choice(vocab) for _ in range(n))
+
+    def _completion(self, prompt: str, inputs: str, choice: int) -> str:
+        seed = int.from_bytes(hashlib.sha256(f"{choice}:{prompt}".encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        # Draw words from the inputs only, so queries stay on topic
+        vocab = _WORD.findall(inputs.rsplit("Respond with the corresponding output fields", 1)[0].lower()) or ["research"]
+        parts = [
+            f"[[ ## {name} ## ]]\n{self._value(name, hint, rng, vocab, prompt)}"
+            for name, hint in _output_fields(prompt)
+        ]
+        return "\n\n".join(parts + ["[[ ## completed ## ]]"])
+
+    def _respond(self, messages, kwargs):
+        prompt = "\n\n".join(str(m.get("content", "")) for m in messages or [])
+        n = kwargs.get("n", self.kwargs.get("n", 1)) or 1
+        inputs = str(messages[-1].get("content", "")) if messages else ""
+        texts = [self._completion(prompt, inputs, i) for i in range(n)]
+        completion_tokens = sum(estimate_tokens(t) for t in texts)
+        with self._lock:
+            self.calls += 1
+        response = SimpleNamespace(
+            choices=[
+                SimpleNamespace(message=SimpleNamespace(content=t, tool_calls=None), finish_reason="stop")
+                for t in texts
+            ],
+            usage={
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": completion_tokens,
+                "total_tokens": estimate_tokens(prompt) + completion_tokens,
+            },
+            model=self.model,
+        )
+        delay = (self.latency_ms + self.ms_per_token * completion_tokens) / 1000.0
+        return response, delay
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt}]
+        response, delay = self._respond(messages, kwargs)
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt}]
+        response, delay = self._respond(messages, kwargs)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return response
@@ -0,0 +1,289 @@
+"""
+Pipeline Benchmarks
+===================
+Runs the research modules against the scripted fake LM and a synthetic
+BM25 corpus, fully offline, and writes the results as JSON so runs can be
+compared between commits.
+
+Each configuration (module, k, hop count, concurrency) reports:
+    - throughput (requests/s) and p50/p99 request latency
+    - peak traced memory (tracemalloc, measured in a separate pass)
+    - per-stage mean time, the LM time inside it and the remaining overhead,
+      from the pipeline's tracing spans
+
+Usage:
+    python benchmarks/run.py                      # full matrix
+    python benchmarks/run.py --quick              # small smoke matrix
+    python benchmarks/run.py --compare artifacts/benchmarks/<baseline>.json
+"""
+
+import sys
+import os
+
+# Robust Path Fix: Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import contextvars
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+from config import Config
+from src.modules.rag import AuraArchitect
+from src.modules.multihop import AuraMultiHop
+from src.modules.agent import AuraAgent
+from src.modules.reflector import AuraReflector
+from src.utils.model_factory import ModelFactory
+from src.utils.tracing import capture
+from benchmarks.corpus import make_corpus, make_goals, make_retriever
+from benchmarks.fake_lm import ScriptedLM
+
+BENCHMARKS_DIR = os.path.join(Config.ARTIFACTS_DIR, "benchmarks")
+
+# Metrics where a higher value is a regression (everything else: lower is)
+LOWER_IS_BETTER = ("p50_ms", "p99_ms", "peak_memory_mb")
+
+
+def benchmark_matrix(quick: bool = False) -> list:
+    """Configurations to run: module x k x hops x concurrency."""
+    ks = (3,) if quick else (3, 10)
+    concurrencies = (1, 4) if quick else (1, 8)
+    hops = (2,) if quick else (1, 2, 3)
+    matrix = []
+    for k in ks:
+        for concurrency in concurrencies:
+            matrix.append({"module": "rag", "k": k, "hops": None, "concurrency": concurrency})
+            matrix.append({"module": "rag-spec", "k": k, "hops": None, "concurrency": concurrency})
+            matrix.append({"module": "reflector", "k": k, "hops": None, "concurrency": concurrency})
+            matrix.append({"module": "agent", "k": k, "hops": None, "concurrency": concurrency})
+            for h in hops:
+                matrix.append({"module": "multihop", "k": k, "hops": h, "concurrency": concurrency})
+    return matrix
+
+
+def config_name(config: dict) -> str:
+    hops = f"-h{config['hops']}" if config["hops"] else ""
+    return f"{config['module']}-k{config['k']}{hops}-c{config['concurrency']}"
+
+
+def build_program(config: dict):
+    """The module under test and the name of its input field."""
+    module, k = config["module"], config["k"]
+    if module == "rag":
+        return AuraArchitect(k=k), "research_goal"
+    if module == "rag-spec":
+        # Speculative retrieval on the raw goal alongside the rewrite
+        return AuraArchitect(k=k, speculative=True), "research_goal"
+    if module == "reflector":
+        program = AuraArchitect(k=k)
+        program.synthesize = AuraReflector(n=3)
+        return program, "research_goal"
+    if module == "multihop":
+        return AuraMultiHop(max_hops=config["hops"], k=k), "question"
+    if module == "agent":
+        program = AuraAgent()
+        program.retrieve_module.k = k
+        return program, "question"
+    raise ValueError(f"Unknown module: {module}")
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _run_requests(program, field, goals, concurrency):
+    """Run one request per goal, `concurrency` at a time; returns per-request latencies (ms)."""
+    def one(goal):
+        start = time.perf_counter()
+        program(**{field: goal})
+        return 1000 * (time.perf_counter() - start)
+
+    if concurrency == 1:
+        return [one(goal) for goal in goals]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # One context copy per request, so spans nest under the capture block
+        futures = [pool.submit(contextvars.copy_context().run, one, goal) for goal in goals]
+        return [f.result() for f in futures]
+
+
+def stage_breakdown(spans, num_requests: int) -> dict:
+    """
+    Per span name: calls per request, mean duration, mean LM time spent
+    inside it and the remainder (retrieval, parsing, packing, glue code).
+    """
+    lm_ms = defaultdict(float)
+    for s in spans:
+        if s.name != "lm.request":
+            continue
+        parent = s.parent
+        while parent is not None:
+            lm_ms[parent.span_id] += s.duration_ms
+            parent = parent.parent
+
+    totals = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "lm_ms": 0.0})
+    for s in spans:
+        stage = totals[s.name]
+        stage["count"] += 1
+        stage["total_ms"] += s.duration_ms
+        stage["lm_ms"] += s.duration_ms if s.name == "lm.request" else lm_ms[s.span_id]
+
+    return {
+        name: {
+            "calls_per_request": t["count"] / num_requests,
+            "mean_ms": t["total_ms"] / t["count"],
+            "lm_ms": t["lm_ms"] / t["count"],
+            "overhead_ms": (t["total_ms"] - t["lm_ms"]) / t["count"],
+        }
+        for name, t in sorted(totals.items())
+    }
+
+
+def run_config(config: dict, goals: list, lm) -> dict:
+    program, field = build_program(config)
+    concurrency = config["concurrency"]
+    _run_requests(program, field, goals[:1], 1)  # warm-up: imports, adapter caches
+
+    calls_before = lm.calls
+    with capture() as spans:
+        start = time.perf_counter()
+        latencies = _run_requests(program, field, goals, concurrency)
+        wall = time.perf_counter() - start
+    lm_calls = lm.calls - calls_before
+
+    # Memory in its own pass: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    _run_requests(program, field, goals, concurrency)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    request_spans = [s for s in spans if s.parent is None]
+    tokens = sum(s.attributes.get("prompt_tokens", 0) + s.attributes.get("completion_tokens", 0) for s in request_spans)
+    return {
+        "name": config_name(config),
+        **config,
+        "requests": len(goals),
+        "throughput_rps": len(goals) / wall,
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": statistics.fmean(latencies),
+        "peak_memory_mb": peak / (1024 * 1024),
+        "lm_calls_per_request": lm_calls / len(goals),
+        "tokens_per_request": tokens / len(goals),
+        "stages": stage_breakdown(spans, len(goals)),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """Print changes against a baseline file; returns the regressions."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n📊 Compared with {baseline_path} (threshold {threshold:.0%})")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None:
+            print(f"   {result['name']}: not in baseline")
+            continue
+        for metric in ("throughput_rps", *LOWER_IS_BETTER):
+            before, after = old[metric], result[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            if worse:
+                regressions.append({"name": result["name"], "metric": metric, "before": before, "after": after})
+                print(f"   ❌ {result['name']} {metric}: {before:.2f} -> {after:.2f} ({change:+.0%})")
+    if not regressions:
+        print("   ✅ No regressions")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the AURA research pipelines")
+    parser.add_argument("--quick", action="store_true", help="Small matrix and corpus (smoke test)")
+    parser.add_argument("--requests", type=int, default=None, help="Requests per configuration")
+    parser.add_argument("--passages", type=int, default=None, help="Synthetic corpus size")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake LM latency per call")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Fake LM latency per completion token")
+    parser.add_argument("--modules", nargs="+", choices=["rag", "rag-spec", "reflector", "multihop", "agent"],
+                        help="Only benchmark these modules")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None, help="Results file (JSON)")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    num_requests = args.requests or (8 if args.quick else 32)
+    num_passages = args.passages or (2000 if args.quick else 20000)
+
+    print(f"📚 Building synthetic corpus ({num_passages} passages)...")
+    start = time.perf_counter()
+    passages, topics = make_corpus(num_passages=num_passages, seed=args.seed)
+    goals = make_goals(topics, count=num_requests, seed=args.seed)
+    retriever = make_retriever(passages)
+    index_s = time.perf_counter() - start
+
+    # Same layering as production (rate limiter spans), minus the response cache
+    lm = ScriptedLM(latency_ms=args.latency_ms, ms_per_token=args.ms_per_token)
+    dspy.settings.configure(lm=ModelFactory.wrap_lm(lm, provider="scripted", cache=False), rm=retriever)
+
+    matrix = [c for c in benchmark_matrix(args.quick) if not args.modules or c["module"] in args.modules]
+    results = []
+    for config in matrix:
+        result = run_config(config, goals, lm)
+        results.append(result)
+        print(f"   {result['name']:<22} {result['throughput_rps']:7.2f} req/s  "
+              f"p50 {result['p50_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+              f"peak {result['peak_memory_mb']:6.1f} MB")
+
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "dspy": getattr(dspy, "__version__", None),
+            "platform": platform.platform(),
+            "settings": {
+                "requests": num_requests,
+                "passages": num_passages,
+                "latency_ms": args.latency_ms,
+                "ms_per_token": args.ms_per_token,
+                "seed": args.seed,
+                "quick": args.quick,
+            },
+            "index_build_s": index_s,
+        },
+        "results": results,
+    }
+
+    out = args.out or os.path.join(BENCHMARKS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['git_commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,80 @@ class Config:
     ARTIFACTS_DIR = "artifacts"
     COMPILED_PROGRAMS_DIR = os.path.join(ARTIFACTS_DIR, "compiled_programs")
     DISTILLED_MODELS_DIR = os.path.join(ARTIFACTS_DIR, "distilled_models")
+    CHECKPOINTS_DIR = os.path.join(ARTIFACTS_DIR, "checkpoints")  # resumable optimizer runs
+    LOCAL_CORPUS_PATH = os.environ.get("AURA_CORPUS_PATH", os.path.join(ARTIFACTS_DIR, "corpus.jsonl"))
+    LOCAL_INDEX_DIR = os.environ.get("AURA_INDEX_DIR", os.path.join(ARTIFACTS_DIR, "index"))
+    
+    # LM Response Cache (shared across runs and processes; AURA_LM_CACHE=0 disables)
+    LM_CACHE_ENABLED = os.environ.get("AURA_LM_CACHE", "1") != "0"
+    LM_CACHE_PATH = os.environ.get("AURA_LM_CACHE_PATH", os.path.join(ARTIFACTS_DIR, "cache", "lm_cache.sqlite"))
+    LM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+    
+    # Retrieval Result Cache (AURA_RETRIEVAL_CACHE=0 disables)
+    RETRIEVAL_CACHE_ENABLED = os.environ.get("AURA_RETRIEVAL_CACHE", "1") != "0"
+    RETRIEVAL_CACHE_PATH = os.path.join(ARTIFACTS_DIR, "cache", "retrieval_cache.sqlite")
+    RETRIEVAL_CACHE_TTL = 24 * 3600  # seconds
+    RETRIEVAL_CACHE_MAX_ENTRIES = 4096
+    
+    # Context Assembly (estimated tokens of passages per prompt; 0 = unlimited)
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get("AURA_CONTEXT_TOKEN_BUDGET", "0")) or None
+    JUDGE_CONTEXT_TOKEN_BUDGET = int(os.environ.get("AURA_JUDGE_CONTEXT_TOKEN_BUDGET", "0")) or None  # opt-in: truncation changes scores
+    
+    # Context Packing (fit synthesis passages to the model's context window). Opt-in with
+    # AURA_CONTEXT_PACKING=1: small windows (Ollama's 2048-4096) truncate the synthesis context
+    CONTEXT_PACKING_ENABLED = os.environ.get("AURA_CONTEXT_PACKING", "0") == "1"
+    CONTEXT_PACKING_BUDGET = int(os.environ.get("AURA_CONTEXT_PACKING_BUDGET", "0")) or None  # 0 = from model limit
+    CONTEXT_PACKING_FRACTION = 0.5  # share of the context window given to passages
+    
+    # Speculative Retrieval: retrieve on the raw goal while the query is rewritten, then fuse (rag/reflector)
+    SPECULATIVE_RETRIEVAL = os.environ.get("AURA_SPECULATIVE_RETRIEVAL", "0") == "1"
+    REWRITE_TIMEOUT = float(os.environ.get("AURA_REWRITE_TIMEOUT", "0")) or None  # seconds; then the goal's passages are used
+    
+    # Reranking ('none', 'lexical', 'dense' or 'lm'; see ModelFactory.RERANKERS)
+    RERANKER = os.environ.get("AURA_RERANKER", "none")
+    RERANK_FETCH_K = int(os.environ.get("AURA_RERANK_FETCH_K", "50"))
+    
+    # Judge Cascade (rule checks, then an optional cheaper judge, then the full judge). Opt-in
+    # with AURA_JUDGE_CASCADE=1: rule scores replace judge scores, which changes the metric
+    JUDGE_CASCADE_ENABLED = os.environ.get("AURA_JUDGE_CASCADE", "0") == "1"
+    JUDGE_MIN_INSIGHT_TERMS = 8  # below this many content words an insight always goes to a judge
+    JUDGE_LM_MODEL = os.environ.get("AURA_JUDGE_MODEL")  # cheaper first-tier judge for the optimizers (e.g. gpt-4o-mini)
+    
+    # Batched Judging (concurrent judgments share one LM call; 1 = one call per judgment). Opt-in:
+    # whether an item is judged in a batch depends on timing, so scores can vary between runs
+    JUDGE_BATCH_SIZE = int(os.environ.get("AURA_JUDGE_BATCH_SIZE", "1"))
+    JUDGE_BATCH_WAIT_MS = 20.0
+    
+    # HTTP Transport (pooled, retrying, circuit-broken; see src/utils/transport.py)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("AURA_HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.environ.get("AURA_HTTP_READ_TIMEOUT", "10"))  # retrievers
+    LM_TIMEOUT = float(os.environ.get("AURA_LM_TIMEOUT", "120"))  # one LM request (generation is slow)
+    HTTP_POOL_SIZE = 16  # keep-alive connections per host
+    HTTP_MAX_RETRIES = int(os.environ.get("AURA_HTTP_MAX_RETRIES", "3"))
+    HTTP_BACKOFF_BASE = 0.5  # seconds; full jitter, doubled per retry
+    HTTP_BACKOFF_MAX = 8.0
+    HTTP_RETRY_BUDGET = float(os.environ.get("AURA_HTTP_RETRY_BUDGET", "30"))  # seconds across all attempts
+    BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures before a backend is skipped
+    BREAKER_RESET_TIMEOUT = 30.0  # seconds before a trial request
+    RETRIEVER_FAILOVER = os.environ.get("AURA_RETRIEVER_FAILOVER", "1") != "0"  # ColBERT down -> local retriever
+    
+    # Rate Limits (see src/utils/rate_limit.py). AURA_RATE_LIMITS="openai=500/200000,deepseek:deepseek-chat=60"
+    # sets requests[/tokens] per minute for a provider or provider:model
+    RATE_LIMITS = os.environ.get("AURA_RATE_LIMITS", "")
+    RATE_LIMIT_HEADROOM = 0.95  # pace at this share of each limit
+    RATE_LIMIT_SHARED = os.environ.get("AURA_RATE_LIMIT_SHARED", "1") != "0"  # one budget across processes
+    RATE_LIMIT_STATE_DIR = os.path.join(ARTIFACTS_DIR, "rate_limits")
+    RATE_LIMIT_PAUSE = 2.0  # seconds all callers back off after a 429 without Retry-After
+    
+    # Model Routing (see src/utils/routing.py). AURA_MODEL_ROUTES="GenerateSearchQuery=ollama:phi,HopQueryGenerator=ollama:phi"
+    # runs those signatures on a cheaper model; the rest stay on the pipeline's LM
+    MODEL_ROUTES = os.environ.get("AURA_MODEL_ROUTES", "")
+    ROUTE_ESCALATION = os.environ.get("AURA_ROUTE_ESCALATION", "1") != "0"  # failed cheap answers -> pipeline's LM
+    ROUTE_MIN_ANSWER_TERMS = 8  # content words below which a routed insight or answer escalates
+    
+    # Tracing (AURA_TRACE=1 records spans for every request; see src/utils/tracing.py)
+    TRACING_ENABLED = os.environ.get("AURA_TRACE", "0") == "1"
+    TRACE_PATH = os.environ.get("AURA_TRACE_PATH", os.path.join(ARTIFACTS_DIR, "traces.jsonl"))
 
 def configure_dspy(api_key: str = None, model: str = Config.DEFAULT_LM_MODEL):
     """Configures DSPy global settings."""
@@ -30,7 +104,15 @@ def configure_dspy(api_key: str = None, model: str = Config.DEFAULT_LM_MODEL):
     if not key:
         print("⚠️ Warning: No API Key provided.")
     
-    lm = dspy.LM(f'openai/{model}', api_key=key)
-    rm = dspy.ColBERTv2(url=Config.COLBERT_URL)
+    # Imported here: model_factory itself imports Config
+    from src.utils.model_factory import ModelFactory
+    # No client-side retries: RateLimitedLM retries with backoff, the limiter and the breaker
+    lm = ModelFactory.wrap_lm(dspy.LM(f'openai/{model}', api_key=key, timeout=Config.LM_TIMEOUT, num_retries=0), "openai")
+    # Pooled, retrying ColBERT client, cached, failing over to the local retriever
+    rm = ModelFactory.get_retriever("colbert", Config.COLBERT_URL)
     dspy.settings.configure(lm=lm, rm=rm)
+    if Config.JUDGE_LM_MODEL:
+        from evaluation.metrics import set_judge_lm
+        judge_lm = dspy.LM(f'openai/{Config.JUDGE_LM_MODEL}', api_key=key, timeout=Config.LM_TIMEOUT, num_retries=0)
+        set_judge_lm(ModelFactory.wrap_lm(judge_lm, "openai"))
     return lm, rm
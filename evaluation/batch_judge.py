@@ -0,0 +1,203 @@
+"""
+Batched Judging
+===============
+Scores several (goal, context, insight) items in one judge LM call.
+
+Metric calls arrive one example at a time from many threads (the
+evaluation runner, dspy.Evaluate inside the optimizers). BatchJudge
+coalesces the calls that arrive within a short window, grouped by the
+caller's active LM, into prompts that fit that LM's context window, and
+scores each prompt's items together. A batch whose output does not parse
+into one in-range score per item, or a window holding a single item,
+answers None so the caller falls back to the single-item judge. The
+window closes early once every caller waiting to be scored has joined
+it, so sequential callers don't wait.
+
+A batch call's token usage is split evenly among its callers' usage
+trackers (dspy.track_usage), so per-example judge tokens stay comparable.
+
+Which items share a batch depends on timing, so batched scores can vary
+between runs; Config.JUDGE_BATCH_SIZE keeps batching off by default.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import dspy
+from src.retrieval.context_store import estimate_tokens
+
+try:
+    from dspy.utils.usage_tracker import UsageTracker
+except ImportError:  # DSPy versions without usage tracking
+    UsageTracker = None
+
+
+class AssessResearchQualityBatch(dspy.Signature):
+    """
+    AI Judge Signature: Assess the quality of several generated research insights at once.
+    Judge every numbered item on its own.
+    """
+    items = dspy.InputField(desc="Numbered items, each with a research goal, its retrieved passages and Aura's insight")
+    scores: list[float] = dspy.OutputField(desc="One quality score from 1-5 per item, in the same order")
+
+
+def format_items(items) -> str:
+    return "\n\n".join(
+        f"[{i + 1}]\nResearch goal: {goal}\nRetrieved passages: {context}\nGenerated insight: {insight}"
+        for i, (goal, context, insight) in enumerate(items)
+    )
+
+
+class BatchJudge:
+    """
+    Args:
+        batch_size: Most items scored per LM call
+        max_wait_ms: How long the dispatcher waits for a batch to fill
+        workers: Batches judged at once
+        prompt_fraction: Share of the LM's context window a batch prompt may use
+    """
+
+    def __init__(self, batch_size: int = 8, max_wait_ms: float = 20.0, workers: int = 4,
+                 prompt_fraction: float = 0.6):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.prompt_fraction = prompt_fraction
+        self.judge = dspy.ChainOfThought(AssessResearchQualityBatch)
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="judge")
+        self._dispatcher = None
+        self._waiting = 0  # callers blocked in score()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.calls = 0
+        self.items = 0
+        self.fallbacks = 0
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batch_calls": self.calls,
+                "batched_items": self.items,
+                "avg_batch_size": self.items / self.calls if self.calls else 0.0,
+                "fallbacks": self.fallbacks,
+            }
+
+    def judge_batch(self, items):
+        """Score items in one LM call; None if the output is inconsistent."""
+        try:
+            scores = [float(s) for s in self.judge(items=format_items(items)).scores]
+        except Exception as e:
+            print(f"⚠️ Batch judge failed ({type(e).__name__}); judging items one by one.")
+            scores = None
+        with self._stats_lock:
+            self.calls += 1
+            if scores is not None and len(scores) == len(items) and all(1.0 <= s <= 5.0 for s in scores):
+                self.items += len(items)
+                return scores
+            self.fallbacks += 1
+        return None
+
+    def score(self, research_goal: str, context: str, insight: str):
+        """Blocking score for one item, or None when the caller should judge it alone."""
+        self._ensure_dispatcher()
+        future = Future()
+        with self._stats_lock:
+            self._waiting += 1
+        try:
+            # The batch runs under the caller's context, so dspy.context(lm=...) overrides apply
+            self._queue.put((dspy.settings.lm, contextvars.copy_context(), (research_goal, context, str(insight)), future))
+            return future.result()
+        finally:
+            with self._stats_lock:
+                self._waiting -= 1
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is not None:
+            return
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, name="judge-batcher", daemon=True)
+                self._dispatcher.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            # Nobody else is waiting to be scored: no point holding the window open
+            while len(batch) < self._waiting:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _token_limit(self, lm) -> int:
+        # Imported here: model_factory imports modules that import the metrics
+        from src.utils.model_factory import ModelFactory
+        return int(ModelFactory.get_context_limit(getattr(lm, "model", None)) * self.prompt_fraction)
+
+    def _dispatch(self, batch):
+        groups = {}
+        for lm, ctx, item, future in batch:
+            groups.setdefault(id(lm), (lm, []))[1].append((ctx, item, future))
+
+        for lm, entries in groups.values():
+            limit = self._token_limit(lm)
+            chunk, tokens = [], 0
+            for entry in entries:
+                item_tokens = estimate_tokens(" ".join(entry[1]))
+                if chunk and (len(chunk) >= self.batch_size or tokens + item_tokens > limit):
+                    self._submit(chunk)
+                    chunk, tokens = [], 0
+                chunk.append(entry)
+                tokens += item_tokens
+            self._submit(chunk)
+
+    def _submit(self, chunk):
+        if len(chunk) == 1:
+            # Nothing to share the call with: the single-item judge does better
+            chunk[0][2].set_result(None)
+            return
+        self._pool.submit(self._answer, chunk)
+
+    def _answer(self, chunk):
+        ctx = chunk[0][0]
+        tracker = UsageTracker() if UsageTracker is not None else None
+        try:
+            scores = ctx.run(self._judge_tracked, [item for _, item, _ in chunk], tracker)
+        except Exception:
+            scores = None
+        if tracker is not None:
+            self._share_usage(tracker, [entry_ctx for entry_ctx, _, _ in chunk])
+        for i, (_, _, future) in enumerate(chunk):
+            future.set_result(None if scores is None else scores[i])
+
+    def _judge_tracked(self, items, tracker):
+        # Under the first caller's overrides, but usage goes to the batch's own tracker
+        if tracker is None:
+            return self.judge_batch(items)
+        with dspy.context(usage_tracker=tracker):
+            return self.judge_batch(items)
+
+    @staticmethod
+    def _share_usage(tracker, contexts):
+        """Add an even share of the batch's token counts to each caller's usage tracker."""
+        n = len(contexts)
+        for i, ctx in enumerate(contexts):
+            caller_tracker = ctx.run(lambda: dspy.settings.usage_tracker)
+            if caller_tracker is None:
+                continue
+            for lm, usage in tracker.get_total_tokens().items():
+                share = {
+                    key: value // n + (i < value % n)
+                    for key, value in usage.items()
+                    if isinstance(value, int) and not isinstance(value, bool)
+                }
+                caller_tracker.add_usage(lm, share)
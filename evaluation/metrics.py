@@ -2,9 +2,30 @@
 Metrics & Judges
 ================
 AI Judges and metric functions for evaluation.
+
+With Config.JUDGE_CASCADE_ENABLED, the metrics judge in tiers, cheapest first:
+    rules        deterministic checks settle the obvious failures (empty
+                 insights, echoing the goal, no overlap with the retrieved
+                 context) without an LM call
+    cheap_judge  an optional cheaper judge LM (set_judge_lm); its confident
+                 scores (<= 2 or 5) are accepted
+    judge        the full LM judge on the configured model
+judge_stats() reports the share of judgments each tier settled. Otherwise
+every insight goes to the full judge.
+
+LM tiers go through a shared BatchJudge (batch_judge.py) when
+Config.JUDGE_BATCH_SIZE > 1, so concurrent metric calls share judge calls.
 """
 
+import re
+import threading
+from collections import Counter
+
 import dspy
+from config import Config
+from src.retrieval.bm25 import tokenize
+from src.retrieval.context_store import ContextStore
+from .batch_judge import BatchJudge
 
 class AssessResearchQuality(dspy.Signature):
     """
@@ -30,17 +51,75 @@ class ResearchQualityJudge(dspy.Module):
             generated_insight=generated_insight
         )
 
-def validate_aura_insight(example, pred, trace=None) -> bool:
-    """Metric function returning boolean (True if score >= 4)."""
-    return _validate(example, pred, trace, return_bool=True)
+_judge = None
 
-def validate_aura_insight_with_score(example, pred, trace=None) -> float:
-    """Metric function returning float score."""
-    return _validate(example, pred, trace, return_bool=False)
+def get_judge():
+    """Shared judge instance (Predict modules are safe to call from many threads)."""
+    global _judge
+    if _judge is None:
+        _judge = ResearchQualityJudge()
+    return _judge
 
-def _validate(example, pred, trace, return_bool):
-    judge = ResearchQualityJudge()
+_batch_judge = None
+_batch_judge_lock = threading.Lock()
+
+def get_batch_judge():
+    """Shared BatchJudge, or None when batching is disabled."""
+    global _batch_judge
+    if Config.JUDGE_BATCH_SIZE <= 1:
+        return None
+    with _batch_judge_lock:
+        if _batch_judge is None:
+            _batch_judge = BatchJudge(Config.JUDGE_BATCH_SIZE, Config.JUDGE_BATCH_WAIT_MS)
+    return _batch_judge
+
+_judge_lm = None
+
+def set_judge_lm(lm=None):
+    """Use a cheaper LM as the first judge tier (None removes it)."""
+    global _judge_lm
+    _judge_lm = lm
+
+class JudgeStats:
+    """Thread-safe count of judgments settled by each tier."""
+    
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
     
+    def record(self, tier: str):
+        with self._lock:
+            self._counts[tier] += 1
+    
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                "judgments": total,
+                "tiers": {tier: count / total for tier, count in self._counts.items()} if total else {},
+            }
+
+_judge_stats = JudgeStats()
+
+def judge_stats() -> dict:
+    """Judgments so far, the fraction settled by each tier and batching counters."""
+    stats = _judge_stats.snapshot()
+    if _batch_judge is not None:
+        stats["batching"] = _batch_judge.stats()
+    return stats
+
+def reset_judge_stats():
+    _judge_stats.reset()
+
+def prediction_context(pred, token_budget=Config.JUDGE_CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Flatten a prediction's context (list or string) for the judge.
+    Lists are deduplicated and kept within token_budget, highest-ranked first.
+    """
     # Handle context types (list vs string)
     if hasattr(pred, 'context'):
         ctx = pred.context
@@ -49,36 +128,101 @@ def _validate(example, pred, trace, return_bool):
         ctx = "No context provided."
         
     if isinstance(ctx, list):
-        context_str = "\n".join([str(p) for p in ctx])
-    else:
-        context_str = str(ctx)
-        
+        store = ContextStore(token_budget=token_budget)
+        store.extend(ctx)
+        return store.text()
+    return str(ctx)
+
+def prediction_insight(pred) -> str:
+    """Pull the synthesized text out of any AURA module's prediction."""
     # Handle insight field name (standardizing on structured_insight, 
     # but checking answer/structured_report for compatibility)
     if hasattr(pred, 'structured_insight'):
-        insight = pred.structured_insight
+        return pred.structured_insight
     elif hasattr(pred, 'answer'):
-        insight = pred.answer
+        return pred.answer
     elif hasattr(pred, 'structured_report'):
-        insight = pred.structured_report
-    else:
-        insight = str(pred)
+        return pred.structured_report
+    return str(pred)
 
-    try:
-        assessment = judge(
-            context=context_str,
-            research_goal=example.research_goal,
-            generated_insight=insight
-        )
+def parse_score(raw) -> float:
+    """Extract a 1-5 score from the judge's free-text output (3.0 if none)."""
+    numbers = re.findall(r'[\d.]+', str(raw).strip())
+    score = float(numbers[0]) if numbers else 3.0
+    return max(1.0, min(5.0, score))
+
+def rule_score(research_goal: str, context: str, insight: str):
+    """
+    Deterministic first tier: a score for clear failures, None when the
+    insight needs a judge.
+    """
+    insight_terms = tokenize(insight or "")
+    if not insight_terms:
+        return 1.0  # empty
+    if len(insight_terms) < Config.JUDGE_MIN_INSIGHT_TERMS:
+        return None  # short answers can be right; too little text for the rules below
+
+    # Echo: (almost) nothing beyond the goal's own words
+    goal_terms = set(tokenize(research_goal))
+    novel = [t for t in insight_terms if t not in goal_terms]
+    if len(novel) < 0.1 * len(insight_terms):
+        return 1.0
+
+    # Ungrounded: not a single content word shared with the retrieved passages
+    context_terms = set(tokenize(context or ""))
+    if context and context != "No context provided." and context_terms and not context_terms.intersection(novel):
+        return 2.0
+    return None
+
+def _judge_once(research_goal, context, insight) -> float:
+    batch_judge = get_batch_judge()
+    if batch_judge is not None:
+        score = batch_judge.score(research_goal, context, insight)
+        if score is not None:
+            return max(1.0, min(5.0, score))
+    assessment = get_judge()(
+        context=context,
+        research_goal=research_goal,
+        generated_insight=insight
+    )
+    return parse_score(assessment.assessment_score)
+
+def judge_score(research_goal: str, context: str, insight: str):
+    """Score an insight through the judge tiers. Returns (score, tier)."""
+    if Config.JUDGE_CASCADE_ENABLED:
+        score = rule_score(research_goal, context, insight)
+        if score is not None:
+            _judge_stats.record("rules")
+            return score, "rules"
         
-        score_str = str(assessment.assessment_score).strip()
-        import re
-        numbers = re.findall(r'[\d.]+', score_str)
-        score = float(numbers[0]) if numbers else 3.0
-        score = max(1.0, min(5.0, score))
+        if _judge_lm is not None:
+            with dspy.context(lm=_judge_lm):
+                score = _judge_once(research_goal, context, insight)
+            if score <= 2.0 or score >= 5.0:
+                _judge_stats.record("cheap_judge")
+                return score, "cheap_judge"
+    
+    score = _judge_once(research_goal, context, insight)
+    _judge_stats.record("judge")
+    return score, "judge"
+
+def validate_aura_insight(example, pred, trace=None) -> bool:
+    """Metric function returning boolean (True if score >= 4)."""
+    return _validate(example, pred, trace, return_bool=True)
+
+def validate_aura_insight_with_score(example, pred, trace=None) -> float:
+    """Metric function returning float score."""
+    return _validate(example, pred, trace, return_bool=False)
+
+def _validate(example, pred, trace, return_bool):
+    context_str = prediction_context(pred)
+    insight = prediction_insight(pred)
+
+    try:
+        score, tier = judge_score(example.research_goal, context_str, insight)
         
         if trace is not None:
-            print(f"Goal: {example.research_goal[:30]}... | Score: {score}")
+            print(f"Goal: {example.research_goal[:30]}... | Score: {score} ({tier})")
 
         if return_bool:
             return score >= 4.0
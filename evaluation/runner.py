@@ -0,0 +1,137 @@
+"""
+Evaluation Runner
+=================
+Parallel evaluation of any AURA module over a devset.
+
+Each example (program call + judge call) runs on a bounded thread pool,
+so a full devset takes about as long as its slowest example. Provider
+rate limits are enforced underneath by RateLimitedLM, and every result
+is appended to a JSONL report as soon as it finishes.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import dspy
+from src.utils.model_factory import ModelFactory
+from src.utils.rate_limit import request_priority, set_rate_limit
+from src.utils.routing import reset_routing_stats, routing_stats
+from .metrics import judge_stats, reset_judge_stats, validate_aura_insight_with_score
+
+def _track_usage():
+    """Per-call token accounting (a no-op on DSPy versions without it)."""
+    track_usage = getattr(dspy, "track_usage", None)
+    return track_usage() if track_usage else contextlib.nullcontext()
+
+def _count_tokens(tracker) -> dict:
+    totals = {"prompt_tokens": 0, "completion_tokens": 0}
+    if tracker is None:
+        return totals
+    for usage in tracker.get_total_tokens().values():
+        for key in totals:
+            totals[key] += usage.get(key) or 0
+    return totals
+
+def evaluate_example(program, example, metric=validate_aura_insight_with_score, index=None) -> dict:
+    """Run one example through the program and the metric, timing both."""
+    record = {"index": index, "research_goal": example.research_goal}
+
+    with _track_usage() as tracker:
+        try:
+            # Step 1: Program
+            start = time.perf_counter()
+            pred = program(**ModelFactory.goal_inputs(program, example.research_goal))
+            record["program_latency_s"] = time.perf_counter() - start
+            program_tokens = _count_tokens(tracker)
+            if getattr(pred, "packing", None):
+                record["context_tokens_saved"] = pred.packing["saved_tokens"]
+
+            # Step 2: Judge
+            start = time.perf_counter()
+            record["score"] = float(metric(example, pred))
+            record["judge_latency_s"] = time.perf_counter() - start
+            total_tokens = _count_tokens(tracker)
+
+            record["program_tokens"] = program_tokens
+            record["judge_tokens"] = {k: total_tokens[k] - program_tokens[k] for k in total_tokens}
+        except Exception as e:
+            record["score"] = 0.0
+            record["error"] = f"{type(e).__name__}: {e}"
+
+    return record
+
+def evaluate(program, devset, metric=validate_aura_insight_with_score, num_threads: int = 8,
+             rate_limits: dict = None, output_path: str = None, threshold: float = 4.0):
+    """
+    Evaluate a module over a devset in parallel.
+
+    Args:
+        program: AURA module (AuraArchitect, AuraMultiHop, AuraAgent, reflector variant)
+        devset: dspy.Example list with a research_goal input
+        metric: (example, pred) -> score
+        num_threads: Maximum examples in flight at once
+        rate_limits: Optional {provider: requests_per_minute or (requests_per_minute, tokens_per_minute)}
+                     applied to all LMs; evaluation requests run at batch priority
+        output_path: JSONL file receiving one record per example as it completes
+        threshold: Score counted as a pass in the summary
+
+    Returns:
+        (summary dict, list of per-example records in devset order)
+    """
+    for provider, limit in (rate_limits or {}).items():
+        rpm, tpm = limit if isinstance(limit, (tuple, list)) else (limit, None)
+        set_rate_limit(provider, rpm, tokens_per_minute=tpm)
+
+    records = [None] * len(devset)
+    write_lock = threading.Lock()
+    out = None
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        out = open(output_path, "w", encoding="utf-8")
+
+    reset_judge_stats()
+    reset_routing_stats()
+    start = time.perf_counter()
+    try:
+        with request_priority("batch"), ThreadPoolExecutor(max_workers=max(1, num_threads)) as pool:
+            # Each task gets its own copy of the caller's context (dspy.context overrides, priority)
+            futures = {
+                pool.submit(contextvars.copy_context().run, evaluate_example, program, example, metric, i): i
+                for i, example in enumerate(devset)
+            }
+            for future in as_completed(futures):
+                record = future.result()
+                records[futures[future]] = record
+                if out is not None:
+                    with write_lock:
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+    finally:
+        if out is not None:
+            out.close()
+    wall = time.perf_counter() - start
+
+    scores = [r["score"] for r in records]
+    serial = sum(r.get("program_latency_s", 0.0) + r.get("judge_latency_s", 0.0) for r in records)
+    summary = {
+        "examples": len(records),
+        "mean_score": sum(scores) / len(scores) if scores else 0.0,
+        "pass_rate": sum(s >= threshold for s in scores) / len(scores) if scores else 0.0,
+        "errors": sum("error" in r for r in records),
+        "wall_s": wall,
+        "serial_s": serial,
+        "speedup": serial / wall if wall else 0.0,
+        "prompt_tokens": sum(r.get("program_tokens", {}).get("prompt_tokens", 0)
+                             + r.get("judge_tokens", {}).get("prompt_tokens", 0) for r in records),
+        "completion_tokens": sum(r.get("program_tokens", {}).get("completion_tokens", 0)
+                                 + r.get("judge_tokens", {}).get("completion_tokens", 0) for r in records),
+        "context_tokens_saved": sum(r.get("context_tokens_saved", 0) for r in records),
+        "judge": judge_stats(),
+        "routing": routing_stats(),
+    }
+    return summary, records
@@ -1,38 +1,155 @@
 import argparse
+import json
 import os
 import sys
 
 # Robust Path Fix: Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from pipelines import optimize_bootstrap, optimize_mipro, distill
+import dspy
+from config import Config
+from pipelines import optimize_bootstrap, optimize_mipro, distill, research
+import server
+from evaluation.data import create_gold_dataset
+from evaluation.runner import evaluate
+from evaluation.metrics import set_judge_lm
+from src.utils.model_factory import ModelFactory
+from src.utils.tracing import enable_tracing, tracer
+from src.retrieval.mmap_index import build_index
+from src.retrieval.dense import build_dense_index
 
 def main():
     parser = argparse.ArgumentParser(description="AURA CLI")
+    parser.add_argument("--trace", nargs="?", const=Config.TRACE_PATH, default=Config.TRACE_PATH if Config.TRACING_ENABLED else None,
+                        metavar="PATH", help="Record per-step spans to a JSONL file (default: Config.TRACE_PATH)")
     subparsers = parser.add_subparsers(dest="command")
     
     # Optimization
     opt_parser = subparsers.add_parser("optimize")
     opt_parser.add_argument("--method", choices=["bootstrap", "mipro"], required=True)
     opt_parser.add_argument("--api-key", required=True)
+    opt_parser.add_argument("--no-resume", action="store_true", help="Discard checkpoints from an earlier run and start over")
+    opt_parser.add_argument("--workers", type=int, default=None,
+                            help="Parallel evaluation: candidates at once (bootstrap) or threads per trial (mipro)")
+    opt_parser.add_argument("--rpm", type=float, default=None, help="Provider requests-per-minute limit shared by all workers")
+    opt_parser.add_argument("--tpm", type=float, default=None, help="Provider tokens-per-minute limit shared by all workers")
     
     # Distillation
     dist_parser = subparsers.add_parser("distill")
     dist_parser.add_argument("--api-key", required=True)
     
+    # Local Index Build
+    index_parser = subparsers.add_parser("build-index")
+    index_parser.add_argument("--corpus", required=True, help="JSONL passage file")
+    index_parser.add_argument("--out", default=Config.LOCAL_INDEX_DIR, help="Index directory")
+    index_parser.add_argument("--dense", action="store_true", help="Also embed passages for dense retrieval")
+    index_parser.add_argument("--nlist", type=int, default=0, help="IVF lists for dense retrieval (0 = exhaustive)")
+    index_parser.add_argument("--float16", action="store_true", help="Store embeddings as float16")
+    
+    # Parallel Evaluation
+    eval_parser = subparsers.add_parser("evaluate")
+    eval_parser.add_argument("--mode", choices=list(ModelFactory.MODES), default="rag")
+    eval_parser.add_argument("--provider", choices=list(ModelFactory.PROVIDERS), default="ollama")
+    eval_parser.add_argument("--model", default=None)
+    eval_parser.add_argument("--api-key", default=None)
+    eval_parser.add_argument("--retriever", default="mock", help="Retriever type for ModelFactory.get_retriever")
+    eval_parser.add_argument("--k", type=int, default=3)
+    eval_parser.add_argument("--program", default=None, help="Compiled program JSON to load")
+    eval_parser.add_argument("--threads", type=int, default=8)
+    eval_parser.add_argument("--rpm", type=float, default=None, help="Requests per minute for the provider")
+    eval_parser.add_argument("--tpm", type=float, default=None, help="Tokens per minute for the provider")
+    eval_parser.add_argument("--judge-model", default=None, help="Cheaper model (same provider) for the first LM judge tier (with AURA_JUDGE_CASCADE=1)")
+    eval_parser.add_argument("--out", default=os.path.join(Config.ARTIFACTS_DIR, "evaluation.jsonl"))
+    
+    # Batch Research
+    research_parser = subparsers.add_parser("research")
+    research_parser.add_argument("--input", default="-", help="JSONL goals file ('-' for stdin)")
+    research_parser.add_argument("--out", required=True, help="Output JSONL (appended; reruns resume)")
+    research_parser.add_argument("--mode", choices=list(ModelFactory.MODES), default="rag")
+    research_parser.add_argument("--provider", choices=list(ModelFactory.PROVIDERS), default="ollama")
+    research_parser.add_argument("--model", default=None)
+    research_parser.add_argument("--api-key", default=None)
+    research_parser.add_argument("--retriever", default="mock", help="Retriever type for ModelFactory.get_retriever")
+    research_parser.add_argument("--k", type=int, default=3)
+    research_parser.add_argument("--workers", type=int, default=8)
+    research_parser.add_argument("--program", default=None, help="Compiled program JSON to load")
+    
+    # HTTP Server
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--modes", nargs="+", choices=list(ModelFactory.MODES), default=list(ModelFactory.MODES))
+    serve_parser.add_argument("--provider", choices=list(ModelFactory.PROVIDERS), default="ollama")
+    serve_parser.add_argument("--model", default=None)
+    serve_parser.add_argument("--api-key", default=None)
+    serve_parser.add_argument("--retriever", default="mock", help="Retriever type for ModelFactory.get_retriever")
+    serve_parser.add_argument("--k", type=int, default=3)
+    serve_parser.add_argument("--program", action="append", default=[], metavar="MODE=PATH",
+                              help="Compiled program for a mode (repeatable)")
+    serve_parser.add_argument("--batch-window-ms", type=float, default=5.0, help="Retrieval micro-batching window (batched scoring for local retrievers; ColBERT only merges identical queries)")
+    serve_parser.add_argument("--max-concurrency", type=int, default=32)
+    
     args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
     
     if args.command == "optimize":
         if args.method == "bootstrap":
-            optimize_bootstrap.run(args.api_key)
+            optimize_bootstrap.run(args.api_key, resume=not args.no_resume, workers=args.workers,
+                                   rpm=args.rpm, tpm=args.tpm)
         elif args.method == "mipro":
-            optimize_mipro.run(args.api_key)
+            optimize_mipro.run(args.api_key, resume=not args.no_resume, workers=args.workers,
+                               rpm=args.rpm, tpm=args.tpm)
             
     elif args.command == "distill":
         distill.run(args.api_key, None) # None for teacher path default behavior
         
+    elif args.command == "build-index":
+        meta = build_index(args.corpus, args.out)
+        print(f"Indexed {meta['num_docs']} passages ({meta['num_terms']} terms) into {args.out}")
+        if args.dense:
+            dense_meta = build_dense_index(args.out, dtype="float16" if args.float16 else "float32", nlist=args.nlist)
+            print(f"Embedded {dense_meta['num_docs']} passages ({dense_meta['dim']}-d, {dense_meta['nlist']} IVF lists)")
+        
+    elif args.command == "evaluate":
+        dspy.settings.configure(
+            lm=ModelFactory.get_model(args.provider, args.model, args.api_key),
+            rm=ModelFactory.get_retriever(args.retriever, Config.COLBERT_URL, args.k)
+        )
+        if args.judge_model:
+            set_judge_lm(ModelFactory.get_model(args.provider, args.judge_model, args.api_key))
+        program = ModelFactory.get_module(args.mode, k=args.k, program_path=args.program, api_key=args.api_key)
+        _, devset = create_gold_dataset()
+        summary, _ = evaluate(
+            program, devset,
+            num_threads=args.threads,
+            rate_limits={args.provider: (args.rpm, args.tpm)} if args.rpm or args.tpm else None,
+            output_path=args.out
+        )
+        print(json.dumps(summary, indent=2))
+        
+    elif args.command == "research":
+        research.run(
+            args.input, args.out,
+            mode=args.mode, provider=args.provider, model=args.model, api_key=args.api_key,
+            retriever=args.retriever, k=args.k, workers=args.workers, program_path=args.program
+        )
+        
+    elif args.command == "serve":
+        server.run(
+            args.host, args.port, modes=args.modes,
+            provider=args.provider, model=args.model, api_key=args.api_key,
+            retriever=args.retriever, k=args.k,
+            program_paths=dict(spec.split("=", 1) for spec in args.program),
+            batch_window_ms=args.batch_window_ms, max_concurrency=args.max_concurrency
+        )
+        
     else:
         parser.print_help()
+    
+    if args.trace and tracer.summary():
+        print(f"Trace summary (spans in {args.trace}):")
+        print(json.dumps(tracer.summary(), indent=2))
 
 if __name__ == "__main__":
     main()
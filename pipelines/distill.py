@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import dspy
 from dspy.teleprompt import BootstrapFinetune
 from config import configure_dspy, Config
+from src.utils.rate_limit import set_default_priority
 from src.modules.rag import AuraArchitect
 from evaluation.data import create_gold_dataset
 from evaluation.metrics import validate_aura_insight
@@ -20,6 +21,8 @@ from evaluation.metrics import validate_aura_insight
 def run(api_key: str, teacher_path: str = None):
     print(">>> Distillation Starting...")
     configure_dspy(api_key, Config.TEACHER_LM_MODEL)
+    # Teacher runs yield to interactive requests sharing the key
+    set_default_priority("batch")
     
     trainset, _ = create_gold_dataset()
     
@@ -2,6 +2,13 @@
 Bootstrap Optimization Pipeline
 ===============================
 Optimizes AuraArchitect using BootstrapFewShotWithRandomSearch.
+
+Each candidate (one random-search seed) is compiled and scored on its own
+and checkpointed as soon as it finishes, so a rerun skips the finished
+candidates and continues with the rest. Candidates are independent, so
+--workers of them are bootstrapped and scored at once; every worker
+shares the process-wide provider rate limit (--rpm) and the LM and
+retrieval caches.
 """
 
 import sys
@@ -10,37 +17,117 @@ import os
 # Robust Path Fix: Add project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
 import dspy
 from dspy.teleprompt import BootstrapFewShotWithRandomSearch
 from config import configure_dspy, Config
+from src.utils.lm_cache import CachedLM
+from src.utils.checkpoint import OptimizerCheckpoint, run_fingerprint
+from src.utils.rate_limit import lm_provider, set_default_priority, set_rate_limit
 from src.modules.rag import AuraArchitect
 from evaluation.data import create_gold_dataset
-from evaluation.metrics import validate_aura_insight
+from evaluation.metrics import judge_stats, validate_aura_insight
+
+def _compile_candidate(make_teleprompter, student, trainset, devset, checkpoint, seed):
+    """Bootstrap and score one random-search seed, then checkpoint it."""
+    label = f"seed={seed}"
+    # compile() keeps its trainset/valset on the teleprompter, so threads can't share one
+    program = make_teleprompter().compile(student, trainset=trainset, valset=devset, restrict=[seed])
+    scored = program.candidate_programs[0]
+    record = checkpoint.record(
+        checkpoint.key(program, devset), program, scored["score"], scored["subscores"], label=label
+    )
+    print(f"💾 Candidate {label} checkpointed (score {record['score']:.2f})")
+    return record, program
+
+def compile_resumable(make_teleprompter, student, trainset, devset, checkpoint: OptimizerCheckpoint, workers: int = 1):
+    """
+    BootstrapFewShotWithRandomSearch.compile, one seed at a time: finished
+    seeds are loaded from the checkpoint instead of being bootstrapped and
+    evaluated again, and the rest run `workers` at a time (candidates are
+    independent), each on its own teleprompter from `make_teleprompter`.
+    Returns the best-scoring program.
+    """
+    seeds = list(range(-3, make_teleprompter().num_candidate_sets))
+    results = {}
+    pending = []
+    for seed in seeds:
+        record = checkpoint.find(f"seed={seed}")
+        if record is not None:
+            print(f"♻️ Candidate seed={seed} restored from checkpoint (score {record['score']:.2f})")
+            results[seed] = (record, checkpoint.load_program(record, student))
+        else:
+            pending.append(seed)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # One context copy per task so each thread sees the caller's dspy settings
+        futures = {
+            pool.submit(contextvars.copy_context().run, _compile_candidate,
+                        make_teleprompter, student, trainset, devset, checkpoint, seed): seed
+            for seed in pending
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    candidates = [
+        {"score": record["score"], "subscores": record["subscores"], "seed": seed, "program": program}
+        for seed, (record, program) in sorted(results.items())
+    ]
+
+    # Same tie-breaking as the teleprompter: the earliest seed wins
+    best = max(candidates, key=lambda c: c["score"])
+    best_program = best["program"]
+    best_program.candidate_programs = sorted(candidates, key=lambda c: c["score"], reverse=True)
+    print(f"Best score {best['score']:.2f} from seed {best['seed']}")
+    return best_program
 
-def run(api_key: str):
-    print(">>> MIPRO/Bootstrap Optimizer Starting...")
-    configure_dspy(api_key, Config.OPTIMIZER_LM_MODEL)
+def run(api_key: str, resume: bool = True, workers: int = None, rpm: float = None, tpm: float = None):
+    workers = workers or 1
+    print(f">>> MIPRO/Bootstrap Optimizer Starting ({workers} workers)...")
+    lm, _ = configure_dspy(api_key, Config.OPTIMIZER_LM_MODEL)
+    # Optimizer traffic yields to interactive requests sharing the key
+    set_default_priority("batch")
+    if rpm or tpm:
+        set_rate_limit(lm_provider(lm), rpm, tokens_per_minute=tpm)
     
     trainset, devset = create_gold_dataset()
     
-    teleprompter = BootstrapFewShotWithRandomSearch(
-        metric=validate_aura_insight,
+    settings = dict(
         max_bootstrapped_demos=4,
         max_labeled_demos=4,
         num_candidate_programs=5
     )
+    # One teleprompter per candidate (settings are bound now, before "model" is added below)
+    make_teleprompter = partial(BootstrapFewShotWithRandomSearch, metric=validate_aura_insight, **settings)
     
     student = AuraArchitect(k=3)
-    compiled_aura = teleprompter.compile(student, trainset=trainset, valset=devset)
+    settings["model"] = Config.OPTIMIZER_LM_MODEL
+    checkpoint = OptimizerCheckpoint(os.path.join(
+        Config.CHECKPOINTS_DIR, f"bootstrap-{run_fingerprint(trainset, devset, settings)}"
+    ))
+    if not resume:
+        checkpoint.clear()
+    print(f"Checkpoints: {checkpoint.run_dir} ({len(checkpoint)} candidates done)")
+    compiled_aura = compile_resumable(make_teleprompter, student, trainset, devset, checkpoint, workers=workers)
     
     save_path = os.path.join(Config.COMPILED_PROGRAMS_DIR, "aura_v1_bootstrap.json")
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     compiled_aura.save(save_path)
     print(f"saved to {save_path}")
+    print(f"Judge tiers: {judge_stats()}")
+    if isinstance(lm, CachedLM):
+        print(f"LM cache: {lm.response_cache.stats()}")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--api-key", type=str)
+    parser.add_argument("--no-resume", action="store_true", help="Discard checkpoints and start over")
+    parser.add_argument("--workers", type=int, default=1, help="Candidates bootstrapped and scored at once")
+    parser.add_argument("--rpm", type=float, help="Provider requests-per-minute limit shared by all workers")
+    parser.add_argument("--tpm", type=float, help="Provider tokens-per-minute limit shared by all workers")
     args = parser.parse_args()
-    run(args.api_key)
+    run(args.api_key, resume=not args.no_resume, workers=args.workers, rpm=args.rpm, tpm=args.tpm)
@@ -2,6 +2,16 @@
 MIPRO Optimization Pipeline
 ===========================
 Optimizes instructions and examples using MIPRO.
+
+With MIPROv2, every step is checkpointed as it completes: the bootstrapped
+demo sets, the proposed instructions and each evaluated candidate program
+with its scores. A rerun restores the finished steps, replays the trials
+already scored from the checkpoint and continues from the first new one.
+
+Trials are proposed one after another (each informs the next), so
+--workers parallelizes within a trial: the examples of every minibatch
+and full evaluation are scored on that many threads, all sharing the
+process-wide provider rate limit (--rpm) and the LM and retrieval caches.
 """
 
 import sys
@@ -17,41 +27,117 @@ except ImportError:
     from dspy.teleprompt import MIPRO
 
 from config import configure_dspy, Config
+from src.utils.lm_cache import CachedLM
+from src.utils.rate_limit import lm_provider, set_default_priority, set_rate_limit
+from src.utils.checkpoint import CheckpointedEvaluate, OptimizerCheckpoint, dump_example, load_example, run_fingerprint
 from src.modules.rag import AuraArchitect
 from evaluation.data import create_gold_dataset
-from evaluation.metrics import validate_aura_insight
+from evaluation.metrics import judge_stats, validate_aura_insight
 
-def run(api_key: str):
+class ResumableMIPRO(MIPRO):
+    """
+    MIPRO with checkpointed steps. The trial search itself is replayed on
+    resume: the seeded sampler proposes the same candidates, and the ones
+    already evaluated get their scores from the checkpoint.
+    """
+    
+    def __init__(self, *args, checkpoint: OptimizerCheckpoint = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkpoint = checkpoint
+    
+    def _resume_stage(self, name, compute, dump, load):
+        saved = self.checkpoint.load_stage(name)
+        if saved is not None:
+            # Later steps draw from the same RNG, so restore where the step left it
+            version, internal, gauss = saved["rng_state"]
+            self.rng.setstate((version, tuple(internal), gauss))
+            print(f"♻️ Restored {name} from checkpoint")
+            return load(saved["value"])
+        value = compute()
+        self.checkpoint.save_stage(name, {"value": dump(value), "rng_state": self.rng.getstate()})
+        return value
+    
+    def _bootstrap_fewshot_examples(self, *args, **kwargs):
+        compute = super()._bootstrap_fewshot_examples
+        return self._resume_stage(
+            "demo_candidates",
+            lambda: compute(*args, **kwargs),
+            lambda demos: None if demos is None else {
+                i: [[dump_example(d) for d in demo_set] for demo_set in sets] for i, sets in demos.items()
+            },
+            lambda data: None if data is None else {
+                int(i): [[load_example(d) for d in demo_set] for demo_set in sets] for i, sets in data.items()
+            },
+        )
+    
+    def _propose_instructions(self, *args, **kwargs):
+        compute = super()._propose_instructions
+        return self._resume_stage(
+            "instruction_candidates",
+            lambda: compute(*args, **kwargs),
+            lambda instructions: instructions,
+            lambda data: {int(i): candidates for i, candidates in data.items()},
+        )
+    
+    def _optimize_prompt_parameters(self, program, instruction_candidates, demo_candidates, evaluate, *args, **kwargs):
+        evaluate = CheckpointedEvaluate(evaluate, self.checkpoint, label="trial")
+        return super()._optimize_prompt_parameters(program, instruction_candidates, demo_candidates, evaluate, *args, **kwargs)
+
+def run(api_key: str, resume: bool = True, workers: int = None, rpm: float = None, tpm: float = None):
     print(">>> MIPRO Optimizer Starting...")
-    configure_dspy(api_key, Config.OPTIMIZER_LM_MODEL)
+    lm, _ = configure_dspy(api_key, Config.OPTIMIZER_LM_MODEL)
+    # Optimizer traffic yields to interactive requests sharing the key
+    set_default_priority("batch")
+    if rpm or tpm:
+        set_rate_limit(lm_provider(lm), rpm, tokens_per_minute=tpm)
     
     trainset, devset = create_gold_dataset()
     
-    teleprompter = MIPRO(
+    settings = {"model": Config.OPTIMIZER_LM_MODEL, "num_candidates": 7, "max_bootstrapped_demos": 3,
+                "max_labeled_demos": 3, "num_trials": 10}
+    checkpoint = OptimizerCheckpoint(os.path.join(
+        Config.CHECKPOINTS_DIR, f"mipro-{run_fingerprint(trainset, settings)}"
+    ))
+    if not resume:
+        checkpoint.clear()
+    print(f"Checkpoints: {checkpoint.run_dir} ({len(checkpoint)} candidates done)")
+    
+    teleprompter = ResumableMIPRO(
         metric=validate_aura_insight,
-        num_candidates=7,
+        num_candidates=settings["num_candidates"],
         init_temperature=1.0,
-        verbose=True
+        verbose=True,
+        num_threads=workers,  # None = DSPy's default
+        checkpoint=checkpoint
     )
     
     student = AuraArchitect(k=3)
     compiled_aura = teleprompter.compile(
         student=student,
         trainset=trainset,
-        max_bootstrapped_demos=3,
-        max_labeled_demos=3,
-        num_trials=10,
+        max_bootstrapped_demos=settings["max_bootstrapped_demos"],
+        max_labeled_demos=settings["max_labeled_demos"],
+        num_trials=settings["num_trials"],
         requires_permission_to_run=False
     )
+    if checkpoint.reused:
+        print(f"Reused {checkpoint.reused} checkpointed evaluations")
     
     save_path = os.path.join(Config.COMPILED_PROGRAMS_DIR, "aura_v2_mipro.json")
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     compiled_aura.save(save_path)
     print(f"saved to {save_path}")
+    print(f"Judge tiers: {judge_stats()}")
+    if isinstance(lm, CachedLM):
+        print(f"LM cache: {lm.response_cache.stats()}")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--api-key", type=str)
+    parser.add_argument("--no-resume", action="store_true", help="Discard checkpoints and start over")
+    parser.add_argument("--workers", type=int, help="Threads scoring each trial's examples")
+    parser.add_argument("--rpm", type=float, help="Provider requests-per-minute limit shared by all workers")
+    parser.add_argument("--tpm", type=float, help="Provider tokens-per-minute limit shared by all workers")
     args = parser.parse_args()
-    run(args.api_key)
+    run(args.api_key, resume=not args.no_resume, workers=args.workers, rpm=args.rpm, tpm=args.tpm)
@@ -0,0 +1,148 @@
+"""
+Batch Research Pipeline
+=======================
+Streams research goals from JSONL (or stdin) through an AURA module on a
+worker pool and appends each prediction to an output JSONL as soon as it
+finishes. Re-running with the same output file resumes: goals whose ids
+are already written are skipped.
+"""
+
+import sys
+import os
+
+# Robust Path Fix: Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import contextvars
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import dspy
+from config import Config
+from src.utils.model_factory import ModelFactory
+from src.utils.rate_limit import set_default_priority
+from evaluation.metrics import prediction_insight
+
+def read_goals(path: str):
+    """
+    Yield (id, research_goal) pairs lazily. Lines may be JSON objects with
+    'research_goal' / 'question' / 'goal' (and optional 'id'), JSON strings
+    or plain text. Ids default to the line number.
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = line
+            if isinstance(record, dict):
+                goal = record.get("research_goal") or record.get("question") or record.get("goal")
+                yield record.get("id", line_no), goal
+            else:
+                yield line_no, str(record)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def completed_ids(output_path: str) -> set:
+    """
+    Ids of goals that finished without an error. Failed goals (429s,
+    timeouts) are retried on resume; their error records stay in the file.
+    Unreadable lines are skipped, and a torn final line left by a crash is
+    truncated away so appending continues from a clean record.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        valid_bytes = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            valid_bytes += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "id" in record and "error" not in record:
+                done.add(record["id"])
+        f.truncate(valid_bytes)
+    return done
+
+def research_one(program, goal_id, goal: str) -> dict:
+    """Run a single goal and shape the prediction into an output record."""
+    record = {"id": goal_id, "research_goal": goal}
+    start = time.perf_counter()
+    try:
+        pred = program(**ModelFactory.goal_inputs(program, goal))
+        record["search_query"] = getattr(pred, "search_query", None)
+        record["context"] = list(getattr(pred, "context", []) or [])
+        record["insight"] = prediction_insight(pred)
+        if getattr(pred, "packing", None):
+            record["packing"] = pred.packing
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["timings"] = {"total_s": time.perf_counter() - start}
+    return record
+
+def run(input_path: str, output_path: str, mode: str = "rag", provider: str = "ollama",
+        model: str = None, api_key: str = None, retriever: str = "mock", k: int = 3,
+        workers: int = 8, program_path: str = None):
+    print(f">>> Batch Research Starting ({mode}, {workers} workers)...")
+    # Shared rate limits serve interactive sessions before this batch
+    set_default_priority("batch")
+    dspy.settings.configure(
+        lm=ModelFactory.get_model(provider, model, api_key),
+        rm=ModelFactory.get_retriever(retriever, Config.COLBERT_URL, k)
+    )
+    program = ModelFactory.get_module(mode, k=k, program_path=program_path, api_key=api_key)
+
+    done = completed_ids(output_path)
+    if done:
+        print(f"Resuming: {len(done)} goals already completed in {output_path}")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    written = errors = 0
+    start = time.perf_counter()
+
+    def flush(futures, out):
+        nonlocal written, errors
+        for future in futures:
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            written += 1
+            errors += "error" in record
+        out.flush()
+
+    # Only the main thread writes; at most 2x workers goals are held in memory
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(output_path, "a", encoding="utf-8") as out:
+        pending = set()
+        for goal_id, goal in read_goals(input_path):
+            if goal_id in done or not goal:
+                continue
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                flush(finished, out)
+            pending.add(pool.submit(contextvars.copy_context().run, research_one, program, goal_id, goal))
+        flush(wait(pending).done, out)
+
+    elapsed = time.perf_counter() - start
+    print(f"Completed {written} goals ({errors} errors) in {elapsed:.1f}s -> {output_path}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="-")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--mode", default="rag")
+    parser.add_argument("--provider", default="ollama")
+    parser.add_argument("--model", type=str)
+    parser.add_argument("--api-key", type=str)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    run(args.input, args.out, args.mode, args.provider, args.model, args.api_key, workers=args.workers)
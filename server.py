@@ -0,0 +1,242 @@
+"""
+AURA HTTP Server
+================
+Standalone JSON API in front of the AURA modules.
+
+Every mode (or a compiled program from Config.COMPILED_PROGRAMS_DIR) is
+built once at startup and shared by all request threads. Concurrent
+requests are micro-batched at the retriever, and live latency and queue
+depth are reported on /metrics. The local retrievers (mock, bm25, index,
+dense) score each batch in one pass; ColBERT has no batch endpoint, so
+there batching only merges identical queries.
+
+Endpoints:
+    POST /research/<mode>   {"research_goal": "..."} -> prediction record
+    GET  /health            loaded modes
+    GET  /metrics           per-mode p50/p95 latency, in-flight and queued requests
+                            (plus per-step span latency and tokens when tracing is on)
+"""
+
+import sys
+import os
+
+# Robust Path Fix: Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import dspy
+from config import Config
+from src.utils.model_factory import ModelFactory
+from src.utils.routing import routing_stats
+from src.retrieval.batching import BatchingRetriever
+from src.utils.tracing import tracer
+from pipelines.research import research_one
+
+# Checked in order when no program path is given for a mode
+COMPILED_PROGRAM_FILES = {
+    "rag": ["rag.json", "aura_v2_mipro.json", "aura_v1_bootstrap.json"],
+    "multihop": ["multihop.json"],
+    "fanout": ["fanout.json"],
+    "agent": ["agent.json"],
+    "reflector": ["reflector.json"],
+}
+
+
+class LatencyStats:
+    """Request counters plus a sliding window of recent latencies."""
+
+    def __init__(self, window: int = 1024):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.errors += error
+
+    @staticmethod
+    def _percentile(ordered, q):
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self.latencies)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "p50_ms": 1000 * self._percentile(ordered, 0.50),
+                "p95_ms": 1000 * self._percentile(ordered, 0.95),
+            }
+
+
+def load_programs(modes, k: int = 3, program_paths: dict = None, api_key: str = None) -> dict:
+    """Build each mode once, loading a compiled program when one is available."""
+    programs = {}
+    for mode in modes:
+        path = (program_paths or {}).get(mode)
+        if path is None:
+            for name in COMPILED_PROGRAM_FILES.get(mode, []):
+                candidate = os.path.join(Config.COMPILED_PROGRAMS_DIR, name)
+                if os.path.exists(candidate):
+                    path = candidate
+                    break
+        program = ModelFactory.get_module(mode, k=k, program_path=path, api_key=api_key)
+        if path:
+            print(f"Loaded compiled program for '{mode}' from {path}")
+        programs[mode] = program
+    return programs
+
+
+class AuraServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding the shared programs and metrics.
+    At most `max_concurrency` requests run at once; the rest queue.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, programs: dict, retriever=None, max_concurrency: int = 32):
+        super().__init__(address, AuraRequestHandler)
+        self.programs = programs
+        self.retriever = retriever
+        self.stats = {mode: LatencyStats() for mode in programs}
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._count_lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+
+    def run_program(self, mode: str, goal: str) -> dict:
+        with self._count_lock:
+            self.queued += 1
+        with self._slots:
+            with self._count_lock:
+                self.queued -= 1
+                self.in_flight += 1
+            try:
+                record = research_one(self.programs[mode], None, goal)
+            finally:
+                with self._count_lock:
+                    self.in_flight -= 1
+        self.stats[mode].record(record["timings"]["total_s"], error="error" in record)
+        return record
+
+    def metrics(self) -> dict:
+        with self._count_lock:
+            metrics = {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_concurrency": self.max_concurrency,
+            }
+        metrics["modes"] = {mode: stats.snapshot() for mode, stats in self.stats.items()}
+        # The batcher sits underneath the retrieval cache when both are on
+        for rm in (self.retriever, getattr(self.retriever, "retriever", None)):
+            if isinstance(rm, BatchingRetriever):
+                metrics["retrieval_batching"] = rm.stats()
+        cache = getattr(self.retriever, "cache", None)
+        if cache is not None:
+            metrics["retrieval_cache"] = cache.stats()
+        routing = routing_stats()
+        if routing:
+            metrics["routing"] = routing
+        if tracer.enabled:
+            metrics["tracing"] = tracer.summary()
+        return metrics
+
+
+class AuraRequestHandler(BaseHTTPRequestHandler):
+    server_version = "AURA/1.0"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "modes": list(self.server.programs)})
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.metrics())
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "research":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        mode = parts[1]
+        if mode not in self.server.programs:
+            self._send_json(404, {"error": f"Mode not loaded: {mode}. Available: {', '.join(self.server.programs)}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Request body must be JSON"})
+            return
+        goal = (payload.get("research_goal") or payload.get("question")) if isinstance(payload, dict) else None
+        if not goal:
+            self._send_json(400, {"error": "Missing 'research_goal'"})
+            return
+
+        record = self.server.run_program(mode, goal)
+        record.pop("id", None)
+        self._send_json(500 if "error" in record else 200, record)
+
+    def log_message(self, format, *args):
+        # Per-request logging is too noisy under load; /metrics has the numbers
+        pass
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8000, modes=None, k: int = 3,
+                  program_paths: dict = None, max_concurrency: int = 32, lm=None, rm=None,
+                  api_key: str = None) -> AuraServer:
+    """
+    Build a server around the LM and retriever (defaults to the globally
+    configured ones). Pass a fake LM and the mock retriever to run locally.
+    """
+    dspy.settings.configure(lm=lm or dspy.settings.lm, rm=rm or dspy.settings.rm)
+    programs = load_programs(modes or list(ModelFactory.MODES), k=k, program_paths=program_paths, api_key=api_key)
+    return AuraServer((host, port), programs, retriever=dspy.settings.rm, max_concurrency=max_concurrency)
+
+
+def run(host: str = "127.0.0.1", port: int = 8000, modes=None, provider: str = "ollama", model: str = None,
+        api_key: str = None, retriever: str = "mock", k: int = 3, program_paths: dict = None,
+        batch_window_ms: float = 5.0, max_concurrency: int = 32):
+    lm = ModelFactory.get_model(provider, model, api_key)
+    rm = ModelFactory.get_retriever(retriever, Config.COLBERT_URL, k, batch_window_ms=batch_window_ms)
+    server = create_server(host, port, modes, k, program_paths, max_concurrency, lm=lm, rm=rm, api_key=api_key)
+    print(f">>> AURA server listening on http://{host}:{port} (modes: {', '.join(server.programs)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--provider", default="ollama")
+    parser.add_argument("--model", type=str)
+    parser.add_argument("--api-key", type=str)
+    parser.add_argument("--retriever", default="mock")
+    args = parser.parse_args()
+    run(args.host, args.port, provider=args.provider, model=args.model, api_key=args.api_key, retriever=args.retriever)
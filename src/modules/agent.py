@@ -5,6 +5,7 @@ Autonomous agent using Reason+Act logic.
 """
 
 import dspy
+from ..utils.tracing import span, traced
 
 class AuraAgent(dspy.Module):
     """
@@ -19,7 +20,9 @@ class AuraAgent(dspy.Module):
         
         def retrieve_knowledge(query: str) -> str:
             """Search and retrieve information."""
-            result = self.retrieve_module(query)
+            with span("retrieve", query=query) as s:
+                result = self.retrieve_module(query)
+                s.set(passages=len(result.passages))
             return result.passages[0] if result.passages else "No info found."
         
         # Tool 2: Calculator
@@ -33,5 +36,6 @@ class AuraAgent(dspy.Module):
         self.tools = [retrieve_knowledge, calculator]
         self.react = dspy.ReAct("question -> answer", tools=self.tools, max_iters=5)
     
+    @traced("AuraAgent")
     def forward(self, question):
         return self.react(question=question)
@@ -2,10 +2,26 @@
 Multi-Hop Module (Baleen Pattern)
 =================================
 Iterative retrieval pipeline.
+
+With fanout > 1, each hop generates several diverse sub-queries, retrieves
+them in parallel and merges the results with reciprocal-rank fusion,
+keeping up to k passages per sub-query; the context store's dedup and
+token budget bound what accumulates. In that mode the loop also stops early
+once a hop adds no new passages; with fanout=1 it always runs max_hops.
 """
 
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
 import dspy
-from ..signatures.search import HopQueryGenerator
+from ..retrieval.aio import aretrieve
+from ..retrieval.fusion import reciprocal_rank_fusion
+from ..retrieval.context_store import ContextStore
+from ..retrieval.packing import synthesis_lm
+from ..utils.streaming import emit
+from ..utils.tracing import span, traced
+from ..signatures.search import HopQueryGenerator, HopQueriesGenerator
 from ..signatures.synthesis import FinalResearcher
 
 class AuraMultiHop(dspy.Module):
@@ -13,37 +29,147 @@ class AuraMultiHop(dspy.Module):
     AuraMultiHop implements the Baleen pattern for iterative retrieval.
     """
     
-    def __init__(self, max_hops=2, k=3):
+    def __init__(self, max_hops=2, k=3, fanout=1, token_budget=None, packer=None, reranker=None):
         super().__init__()
         self.max_hops = max_hops
+        self.fanout = fanout
+        self.token_budget = token_budget
+        self.packer = packer
+        self.reranker = reranker
         self.retrieve = dspy.Retrieve(k=k)
         self.generate_query = dspy.ChainOfThought(HopQueryGenerator)
+        if fanout > 1:
+            # Only present in fan-out mode, so single-query programs keep loading as before
+            self.generate_queries = dspy.ChainOfThought(HopQueriesGenerator)
         self.generate_answer = dspy.ChainOfThought(FinalResearcher)
     
+    def _hop_queries(self, query_pred, question):
+        """Distinct, non-empty sub-queries from a fan-out prediction (at most `fanout`)."""
+        queries = []
+        for q in query_pred.search_queries or []:
+            q = str(q).strip()
+            if q and q not in queries:
+                queries.append(q)
+        return queries[:self.fanout] or [question]
+    
+    def _final_context(self, context, question):
+        """Accumulated passages packed for the final answer: (passages, text, packing stats)."""
+        if self.packer is None:
+            return context.passages, context.text(), None
+        with span("assemble_context", passages=len(context)):
+            passages, packing = self.packer.pack(context.passages, question, lm=synthesis_lm(self.generate_answer))
+        emit("packing", **packing)
+        text = "\n".join(passages) if packing["saved_tokens"] else context.text()
+        return passages, text, packing
+    
+    def _retrieve_one(self, query):
+        """Retrieve k passages, over-fetching and reranking when a reranker is set."""
+        with span("retrieve", query=query) as s:
+            if self.reranker is None:
+                passages = self.retrieve(query).passages
+            else:
+                candidates = self.retrieve(query, k=self.reranker.fetch_k).passages
+                with span("rerank", candidates=len(candidates)):
+                    passages = self.reranker.rerank(query, candidates, self.retrieve.k)
+            s.set(passages=len(passages))
+            return passages
+    
+    async def _aretrieve_one(self, query):
+        if self.reranker is None:
+            return (await aretrieve(self.retrieve, query)).passages
+        candidates = (await aretrieve(self.retrieve, query, k=self.reranker.fetch_k)).passages
+        with span("rerank", candidates=len(candidates)):
+            return await self.reranker.arerank(query, candidates, self.retrieve.k)
+    
+    def _fuse(self, rankings):
+        """RRF of the sub-queries' rankings, up to k passages per sub-query (the context store bounds the total)."""
+        if len(rankings) == 1:
+            return rankings[0]
+        return reciprocal_rank_fusion(rankings)[:self.retrieve.k * len(rankings)]
+    
+    def _retrieve_all(self, queries):
+        """Retrieve every sub-query in parallel and fuse the rankings."""
+        if len(queries) == 1:
+            return self._retrieve_one(queries[0])
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            # One context copy per task so each thread sees the caller's dspy settings
+            futures = [pool.submit(contextvars.copy_context().run, self._retrieve_one, q) for q in queries]
+            rankings = [f.result() for f in futures]
+        return self._fuse(rankings)
+    
+    @traced("AuraMultiHop")
     def forward(self, question):
-        # Initialize context
-        context = []
+        # Initialize context (deduplicated, within the token budget)
+        context = ContextStore(token_budget=self.token_budget)
         
         # The Retrieval Loop
         for hop in range(self.max_hops):
-            context_str = "\n".join(context) if context else "No context yet."
-            
-            # Step 1: Generate query
-            query_pred = self.generate_query(context=context_str, question=question)
-            
-            # Step 2: Retrieve
-            retrieval_res = self.retrieve(query_pred.search_query)
-            
-            # Step 3: Accumulate
-            for p in retrieval_res.passages:
-                if p not in context:
-                    context.append(p)
+            context_str = context.text() if len(context) else "No context yet."
+            hop_span = span("hop", hop=hop + 1)
+            with hop_span:
+                # Step 1: Generate query (or several, in fan-out mode)
+                with span("generate_query"):
+                    if self.fanout > 1:
+                        queries = self._hop_queries(self.generate_queries(context=context_str, question=question), question)
+                    else:
+                        queries = [self.generate_query(context=context_str, question=question).search_query]
+                for q in queries:
+                    emit("search_query", query=q, hop=hop + 1)
+                
+                # Step 2: Retrieve
+                passages = self._retrieve_all(queries)
+                emit("passages", passages=passages, hop=hop + 1)
+                
+                # Step 3: Accumulate; in fan-out mode a hop that finds nothing new ends the loop
+                added = context.extend(passages)
+                hop_span.set(queries=len(queries), new_passages=added)
+            if self.fanout > 1 and not added:
+                break
         
         # Final Step: Synthesis
-        full_context_str = "\n".join(context)
-        answer_pred = self.generate_answer(context=full_context_str, question=question)
+        passages, full_context_str, packing = self._final_context(context, question)
+        with span("synthesize"):
+            answer_pred = self.generate_answer(context=full_context_str, question=question)
+        
+        return dspy.Prediction(
+            context=passages,
+            answer=answer_pred.answer,
+            packing=packing
+        )
+    
+    @traced("AuraMultiHop")
+    async def aforward(self, question):
+        # Same loop as forward; every LM and retrieval call is awaited
+        context = ContextStore(token_budget=self.token_budget)
+        
+        for hop in range(self.max_hops):
+            context_str = context.text() if len(context) else "No context yet."
+            hop_span = span("hop", hop=hop + 1)
+            with hop_span:
+                with span("generate_query"):
+                    if self.fanout > 1:
+                        query_pred = await self.generate_queries.acall(context=context_str, question=question)
+                        queries = self._hop_queries(query_pred, question)
+                    else:
+                        query_pred = await self.generate_query.acall(context=context_str, question=question)
+                        queries = [query_pred.search_query]
+                for q in queries:
+                    emit("search_query", query=q, hop=hop + 1)
+                
+                rankings = await asyncio.gather(*(self._aretrieve_one(q) for q in queries))
+                passages = self._fuse(rankings)
+                emit("passages", passages=passages, hop=hop + 1)
+                added = context.extend(passages)
+                hop_span.set(queries=len(queries), new_passages=added)
+            if self.fanout > 1 and not added:
+                break
+        
+        passages, full_context_str, packing = self._final_context(context, question)
+        with span("synthesize"):
+            answer_pred = await self.generate_answer.acall(context=full_context_str, question=question)
         
         return dspy.Prediction(
-            context=context,
-            answer=answer_pred.answer
+            context=passages,
+            answer=answer_pred.answer,
+            packing=packing
         )
@@ -2,47 +2,218 @@
 RAG Module (Classic AuraArchitect)
 ==================================
 The standard Rewrite-Retrieve-Read pipeline.
+
+With speculative=True, retrieval on the raw research goal runs while the
+query is being rewritten. The rewrite's results are fused with it (RRF),
+and if the rewrite comes back empty or exceeds rewrite_timeout, the goal's
+passages are used alone, so a slow provider never blocks retrieval. Other
+rewrite errors propagate, as in the sequential pipeline.
 """
 
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
 import dspy
+from ..retrieval.aio import aretrieve
+from ..retrieval.context_store import ContextStore
+from ..retrieval.fusion import reciprocal_rank_fusion
+from ..retrieval.packing import synthesis_lm
+from ..utils.streaming import emit
+from ..utils.tracing import span, traced
 from ..signatures.search import GenerateSearchQuery
 from ..signatures.synthesis import ResearchSynthesizer
 
+# Shared by every speculative request: threads start on demand and are reused
+_speculation_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="speculative")
+
 class AuraArchitect(dspy.Module):
     """
     The Aura Research Architect - A DSPy Module implementing a RAG pipeline
     with ChainOfThought reasoning for query generation and synthesis.
     """
     
-    def __init__(self, k=3):
+    def __init__(self, k=3, token_budget=None, packer=None, reranker=None, speculative=False, rewrite_timeout=None):
         super().__init__()
+        self.token_budget = token_budget
+        self.packer = packer
+        self.reranker = reranker
+        self.speculative = speculative
+        self.rewrite_timeout = rewrite_timeout  # seconds; speculative mode and aforward only
         self.retrieve = dspy.Retrieve(k=k)
         self.generate_query = dspy.ChainOfThought(GenerateSearchQuery)
         self.synthesize = dspy.ChainOfThought(ResearchSynthesizer)
     
+    def _fetch_k(self):
+        """Candidates to retrieve: over-fetch for the reranker, else the default k."""
+        return self.reranker.fetch_k if self.reranker is not None else None
+    
+    def _retrieve_passages(self, query):
+        with span("retrieve", query=query) as s:
+            passages = self.retrieve(query, k=self._fetch_k()).passages
+            s.set(passages=len(passages))
+        return passages
+    
+    def _fuse(self, rankings):
+        """RRF of the rewrite's and the goal's passages, cut to what one retrieval returns."""
+        with span("fuse", lists=len(rankings)):
+            return reciprocal_rank_fusion(rankings)[:self._fetch_k() or self.retrieve.k]
+    
+    def _rewrite(self, research_goal):
+        with span("generate_query"):
+            return self.generate_query(research_goal=research_goal)
+    
+    def _rewrite_timed_out(self):
+        print(f"⚠️ Query rewrite took over {self.rewrite_timeout}s; using the research goal's passages.")
+    
+    @staticmethod
+    def _search_query(query_result):
+        """The rewritten query, or "" when there is none (the goal is searched instead)."""
+        return (getattr(query_result, "search_query", None) or "").strip()
+    
+    def _speculative_retrieve(self, research_goal):
+        """
+        Retrieve on the goal while the rewrite runs, then on the rewrite,
+        and fuse both. Returns (query prediction or None, search query, passages).
+        """
+        # Each task gets a copy of the caller's context (dspy settings, current span).
+        # A rewrite that times out is left to finish in the pool; nothing waits on it.
+        speculative = _speculation_pool.submit(contextvars.copy_context().run, self._retrieve_passages, research_goal)
+        rewrite = _speculation_pool.submit(contextvars.copy_context().run, self._rewrite, research_goal)
+        try:
+            query_result = rewrite.result(timeout=self.rewrite_timeout)
+        except FutureTimeoutError:
+            self._rewrite_timed_out()
+            query_result = None
+        search_query = self._search_query(query_result)
+        if not search_query:
+            return query_result, research_goal, speculative.result()
+        # Rewrite first, so its passages win ties
+        return query_result, search_query, self._fuse([self._retrieve_passages(search_query), speculative.result()])
+    
+    def _context(self, passages, query):
+        """
+        Retrieved passages minus (near) duplicates, within the token budget,
+        then packed to the synthesizing model's context window. Returns (passages, packing stats).
+        """
+        store = ContextStore(token_budget=self.token_budget)
+        store.extend(passages)
+        if self.packer is None:
+            return store.passages, None
+        return self.packer.pack(store.passages, query, lm=synthesis_lm(self.synthesize))
+    
+    @traced("AuraArchitect")
     def forward(self, research_goal):
         """
         Execute the cognitive pipeline:
         1. Generate optimized search query (with reasoning)
-        2. Retrieve relevant passages
+        2. Retrieve relevant passages (speculatively on the goal as well, when enabled)
         3. Synthesize final insight (with reasoning)
         """
-        # Step 1: Query Generation
-        query_result = self.generate_query(research_goal=research_goal)
+        if self.speculative:
+            # Steps 1-2 overlap: the goal's retrieval hides behind the rewrite LM call
+            query_result, search_query, passages = self._speculative_retrieve(research_goal)
+            emit("search_query", query=search_query, hop=None)
+        else:
+            # Step 1: Query Generation (an empty rewrite searches the goal)
+            query_result = self._rewrite(research_goal)
+            search_query = self._search_query(query_result) or research_goal
+            emit("search_query", query=search_query, hop=None)
+            
+            # Step 2: Retrieval
+            passages = self._retrieve_passages(search_query)
         
-        # Step 2: Retrieval
-        retrieval_result = self.retrieve(query_result.search_query)
+        # Over-fetched candidates are reranked to k when a reranker is set
+        if self.reranker is not None:
+            with span("rerank", candidates=len(passages)):
+                passages = self.reranker.rerank(research_goal, passages, self.retrieve.k)
+        with span("assemble_context") as s:
+            context, packing = self._context(passages, f"{research_goal} {search_query}")
+            s.set(passages=len(context))
+        emit("passages", passages=context, hop=None)
+        if packing is not None:
+            emit("packing", **packing)
         
         # Step 3: Synthesis
-        synthesis_result = self.synthesize(
-            context=retrieval_result.passages,
-            research_goal=research_goal
-        )
+        with span("synthesize"):
+            synthesis_result = self.synthesize(
+                context=context,
+                research_goal=research_goal
+            )
         
         return dspy.Prediction(
             query_rationale=getattr(query_result, 'rationale', "No reasoning generated"),
-            search_query=query_result.search_query,
-            context=retrieval_result.passages,
+            search_query=search_query,
+            context=context,
+            synthesis_rationale=getattr(synthesis_result, 'rationale', "No reasoning generated"),
+            structured_insight=synthesis_result.structured_insight,
+            packing=packing
+        )
+
+    @traced("AuraArchitect")
+    async def aforward(self, research_goal):
+        """
+        Async pipeline with the same steps, outputs, events and failure
+        handling as forward. Each step needs the previous one's output, so
+        within a request they run in order (speculative mode overlaps the
+        goal's retrieval with the rewrite); awaiting every LM and retrieval
+        call lets concurrent requests on one event loop overlap instead.
+        An empty rewrite, or one that exceeds rewrite_timeout, falls back to
+        the goal's passages; other rewrite errors propagate.
+        """
+        speculative = None
+        if self.speculative:
+            speculative = asyncio.ensure_future(aretrieve(self.retrieve, research_goal, k=self._fetch_k()))
+
+        # Step 1: Query Generation
+        try:
+            with span("generate_query"):
+                query_result = await asyncio.wait_for(
+                    self.generate_query.acall(research_goal=research_goal), self.rewrite_timeout
+                )
+        except asyncio.TimeoutError:
+            self._rewrite_timed_out()
+            query_result = None
+        except BaseException:
+            if speculative is not None:
+                speculative.cancel()
+            raise
+        search_query = self._search_query(query_result)
+        emit("search_query", query=search_query or research_goal, hop=None)
+
+        # Step 2: Retrieval
+        if not search_query:
+            search_query = research_goal
+            passages = (await (speculative or aretrieve(self.retrieve, research_goal, k=self._fetch_k()))).passages
+        elif speculative is not None:
+            rewritten, on_goal = await asyncio.gather(
+                aretrieve(self.retrieve, search_query, k=self._fetch_k()), speculative
+            )
+            passages = self._fuse([rewritten.passages, on_goal.passages])
+        else:
+            passages = (await aretrieve(self.retrieve, search_query, k=self._fetch_k())).passages
+        if self.reranker is not None:
+            with span("rerank", candidates=len(passages)):
+                passages = await self.reranker.arerank(research_goal, passages, self.retrieve.k)
+        with span("assemble_context") as s:
+            context, packing = self._context(passages, f"{research_goal} {search_query}")
+            s.set(passages=len(context))
+        emit("passages", passages=context, hop=None)
+        if packing is not None:
+            emit("packing", **packing)
+
+        # Step 3: Synthesis
+        with span("synthesize"):
+            synthesis_result = await self.synthesize.acall(
+                context=context,
+                research_goal=research_goal
+            )
+
+        return dspy.Prediction(
+            query_rationale=getattr(query_result, 'rationale', "No reasoning generated"),
+            search_query=search_query,
+            context=context,
             synthesis_rationale=getattr(synthesis_result, 'rationale', "No reasoning generated"),
-            structured_insight=synthesis_result.structured_insight
+            structured_insight=synthesis_result.structured_insight,
+            packing=packing
         )
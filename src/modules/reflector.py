@@ -4,8 +4,11 @@ Reflector Module (Multi-Chain Comparison)
 Generate-and-Judge strategy.
 """
 
+import asyncio
+
 import dspy
 from ..signatures.synthesis import ResearchSynthesizer
+from ..utils.tracing import span, traced
 
 class AuraReflector(dspy.Module):
     """
@@ -18,18 +21,38 @@ class AuraReflector(dspy.Module):
         self.generator = dspy.ChainOfThought(ResearchSynthesizer, n=n)
         self.comparator = dspy.MultiChainComparison(ResearchSynthesizer, M=n)
     
+    @traced("AuraReflector")
     def forward(self, context, research_goal):
         # Step 1: Generate candidates
-        generations = self.generator(
-            context=context, 
-            research_goal=research_goal
-        )
+        with span("generate", candidates=self.n):
+            generations = self.generator(
+                context=context, 
+                research_goal=research_goal
+            )
         
         # Step 2: Compare and Select
-        final_prediction = self.comparator(
-            context=context,
-            research_goal=research_goal,
-            completions=generations.completions
-        )
+        with span("compare"):
+            final_prediction = self.comparator(
+                context=context,
+                research_goal=research_goal,
+                completions=generations.completions
+            )
         
         return final_prediction
+
+    @traced("AuraReflector")
+    async def aforward(self, context, research_goal):
+        with span("generate", candidates=self.n):
+            generations = await self.generator.acall(
+                context=context,
+                research_goal=research_goal
+            )
+
+        # MultiChainComparison has no async path; run its judge call off the loop
+        with span("compare"):
+            return await asyncio.to_thread(
+                self.comparator,
+                context=context,
+                research_goal=research_goal,
+                completions=generations.completions
+            )
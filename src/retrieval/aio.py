@@ -0,0 +1,30 @@
+"""
+Async Retrieval
+===============
+Awaitable retrieval for the async module paths (aforward).
+"""
+
+import asyncio
+
+import dspy
+
+from ..utils.tracing import span
+
+
+async def aretrieve(retrieve, query: str, k=None) -> dspy.Prediction:
+    """
+    Async counterpart of `retrieve(query, k)` for a dspy.Retrieve.
+    Retrievers exposing `acall(query, k=None)` (e.g. CachedRetriever) are
+    awaited on the loop; anything else runs on a worker thread so the
+    event loop never blocks on retrieval I/O.
+    """
+    with span("retrieve", query=query) as s:
+        rm = dspy.settings.rm
+        acall = getattr(rm, "acall", None)
+        if acall is None:
+            result = await asyncio.to_thread(retrieve, query, k)
+        else:
+            passages = await acall(query, k=k if k is not None else retrieve.k)
+            result = dspy.Prediction(passages=[p.long_text for p in passages])
+        s.set(passages=len(result.passages))
+        return result
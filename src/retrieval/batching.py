@@ -0,0 +1,136 @@
+"""
+Retrieval Micro-Batching
+========================
+Coalesces concurrent single-query retrieval calls into batches.
+
+Callers block on a future while a dispatcher thread gathers every query
+that arrives within a short window (or until the batch is full), then
+answers them together: retrievers with a `batch(queries, k)` method
+(DenseRetriever, BM25Retriever, MockRetriever) score the whole batch in
+one pass, others (ColBERTRetriever, which has no batch endpoint) are
+fanned out over a small thread pool, so for them batching only merges
+identical queries. Identical queries in a window are only retrieved once.
+
+Batches run in the context (dspy settings, current trace span) of their
+first caller.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class BatchingRetriever:
+    """
+    Wraps a retriever callable `(query, k=None) -> passages` so concurrent
+    callers share batched retrieval calls.
+    """
+
+    def __init__(self, retriever, max_batch: int = 32, max_wait_ms: float = 5.0, workers: int = 8):
+        self.retriever = retriever
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval")
+        self._dispatcher = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batches = 0
+        self.queries = 0
+
+    @property
+    def k(self):
+        return getattr(self.retriever, "k", None)
+
+    def pending(self) -> int:
+        """Queries waiting for the next batch."""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "queries": self.queries,
+                "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+                "pending": self.pending(),
+            }
+
+    def __call__(self, query, k=None, **kwargs):
+        # Batched queries and extra options go straight through
+        if not isinstance(query, str) or kwargs:
+            return self.retriever(query, k=k, **kwargs) if k is not None else self.retriever(query, **kwargs)
+
+        self._ensure_dispatcher()
+        future = Future()
+        self._queue.put((query, k, future, contextvars.copy_context()))
+        return future.result()
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is not None:
+            return
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+                self._dispatcher.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        with self._stats_lock:
+            self.batches += 1
+            self.queries += len(batch)
+
+        # Group by k, then by query text, remembering each group's first caller's context
+        groups, contexts = {}, {}
+        for query, k, future, context in batch:
+            waiting = groups.setdefault(k, {})
+            if query not in waiting:
+                contexts[(k, query)] = context
+            waiting.setdefault(query, []).append(future)
+
+        batch_fn = getattr(self.retriever, "batch", None)
+        for k, waiting in groups.items():
+            if batch_fn is not None:
+                context = contexts[(k, next(iter(waiting)))]
+                self._pool.submit(context.run, self._answer_batch, batch_fn, k, waiting)
+            else:
+                for query, futures in waiting.items():
+                    self._pool.submit(contexts[(k, query)].run, self._answer_one, query, k, futures)
+
+    def _answer_batch(self, batch_fn, k, waiting):
+        queries = list(waiting)
+        try:
+            results = batch_fn(queries, k=k)
+        except Exception as e:
+            for futures in waiting.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        for query, passages in zip(queries, results):
+            for future in waiting[query]:
+                future.set_result(passages)
+
+    def _answer_one(self, query, k, futures):
+        try:
+            passages = self.retriever(query, k=k) if k is not None else self.retriever(query)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future in futures:
+            future.set_result(passages)
@@ -0,0 +1,236 @@
+"""
+BM25 Lexical Index
+==================
+Precomputed inverted index with Okapi BM25 scoring for local retrieval.
+Passages are tokenized once at build time and postings are kept as
+compact CSR-style NumPy arrays, so a query only touches the postings
+of its own terms.
+"""
+
+import array
+import json
+import re
+from collections import Counter
+from itertools import repeat
+
+import dspy
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how in is it its of on or
+that the their them these they this to was what when where which who why will with
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercase, split on non-alphanumerics and drop stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def normalize_passage(record) -> dict:
+    """
+    Map a corpus record onto the passage format used by MockRetriever:
+    `long_text` holds the passage body and `text` holds its title.
+    Accepts plain strings and the common JSONL layouts
+    ({"long_text", "text"}, {"title", "text"}, {"title", "contents"}).
+    """
+    if isinstance(record, str):
+        return {"long_text": record, "text": ""}
+    if "long_text" in record:
+        body = record["long_text"]
+        title = record.get("text") or record.get("title") or ""
+    else:
+        body = record.get("contents") or record.get("text") or ""
+        title = record.get("title") or ""
+    return {"long_text": str(body), "text": str(title)}
+
+
+def load_passages(path: str):
+    """Stream normalized passages from a JSONL file, one record per line."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield normalize_passage(json.loads(line))
+
+
+def _as_numpy(values: array.array, dtype) -> np.ndarray:
+    return np.frombuffer(values, dtype=np.dtype(values.typecode)).astype(dtype, copy=False)
+
+
+def build_postings(passages):
+    """
+    Tokenize normalized passages once and lay their postings out term by term.
+
+    Term ids follow the lexicographic order of the vocabulary, so the same
+    arrays can be written to disk and searched by binary search (see
+    mmap_index). Returns (vocab, term_offsets, postings_docs, postings_tf,
+    doc_lengths).
+    """
+    vocab = {}
+    term_ids = array.array("I")
+    doc_ids = array.array("I")
+    tfs = array.array("I")
+    doc_lengths = array.array("I")
+
+    for doc_id, passage in enumerate(passages):
+        tokens = tokenize(f"{passage['text']} {passage['long_text']}")
+        doc_lengths.append(len(tokens))
+        counts = Counter(tokens)
+        for term in counts:
+            if term not in vocab:
+                vocab[term] = len(vocab)
+        term_ids.extend(map(vocab.__getitem__, counts))
+        doc_ids.extend(repeat(doc_id, len(counts)))
+        tfs.extend(counts.values())
+
+    # Renumber terms in sorted order
+    sorted_terms = sorted(vocab)
+    remap = np.empty(len(vocab), dtype=np.uint32)
+    remap[[vocab[t] for t in sorted_terms]] = np.arange(len(vocab), dtype=np.uint32)
+    term_ids = remap[_as_numpy(term_ids, np.uint32)]
+
+    # Stable sort keeps doc ids ascending inside each posting list
+    order = np.argsort(term_ids, kind="stable")
+    term_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=term_offsets[1:])
+
+    return (
+        {term: term_id for term_id, term in enumerate(sorted_terms)},
+        term_offsets,
+        _as_numpy(doc_ids, np.uint32)[order],
+        np.minimum(_as_numpy(tfs, np.uint32), 0xFFFF).astype(np.uint16)[order],
+        _as_numpy(doc_lengths, np.uint32),
+    )
+
+
+class BM25Index:
+    """
+    Inverted index over a passage collection.
+
+    Postings for term `t` live in `postings_docs[term_offsets[t]:term_offsets[t + 1]]`
+    (doc ids, ascending) with matching term frequencies in `postings_tf`.
+    `vocab` only needs `.get(term)` and `passages` only needs indexing, so
+    both can be backed by memory-mapped files.
+    """
+
+    def __init__(self, vocab, term_offsets, postings_docs, postings_tf, doc_lengths,
+                 passages, k1=1.5, b=0.75, idf=None, length_norm=None):
+        self.vocab = vocab
+        self.term_offsets = term_offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.doc_lengths = doc_lengths
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(doc_lengths)
+
+        # Everything that does not depend on the query is computed once here
+        if idf is None:
+            doc_freq = np.diff(term_offsets).astype(np.float32)
+            idf = np.log1p((self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        if length_norm is None:
+            avgdl = float(doc_lengths.mean()) if self.num_docs else 0.0
+            length_norm = (k1 * (1.0 - b + b * doc_lengths / max(avgdl, 1.0))).astype(np.float32)
+        self.idf = idf
+        self.length_norm = length_norm
+
+    @classmethod
+    def build(cls, passages, k1=1.5, b=0.75):
+        """Build an in-memory index, keeping the normalized passages alongside."""
+        stored = []
+
+        def keep(records):
+            for record in records:
+                passage = normalize_passage(record)
+                stored.append(passage)
+                yield passage
+
+        vocab, term_offsets, postings_docs, postings_tf, doc_lengths = build_postings(keep(passages))
+        return cls(vocab, term_offsets, postings_docs, postings_tf, doc_lengths, stored, k1=k1, b=b)
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs):
+        return cls.build(load_passages(path), **kwargs)
+
+    def _term_ids(self, query: str) -> list:
+        term_ids = [self.vocab.get(t) for t in dict.fromkeys(tokenize(query))]
+        return [t for t in term_ids if t is not None]
+
+    def _term_weights(self, term_id):
+        """(doc ids, BM25 contributions) of one term's posting list."""
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        docs = self.postings_docs[start:end]
+        tf = self.postings_tf[start:end].astype(np.float32)
+        return docs, self.idf[term_id] * tf * (self.k1 + 1.0) / (tf + self.length_norm[docs])
+
+    @staticmethod
+    def _top_k(scores, k: int) -> list:
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = sorted(candidates.tolist(), key=lambda d: (-scores[d], d))
+        return [(doc_id, float(scores[doc_id])) for doc_id in ranked]
+
+    def search(self, query: str, k: int = 3) -> list:
+        """Return up to k (doc_id, score) pairs, best first."""
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries, k: int = 3) -> list:
+        """
+        search() for several queries at once. Each distinct term's posting
+        list is read and weighted once per batch, however many queries share it.
+        """
+        weights = {}
+        results = []
+        for query in queries:
+            term_ids = self._term_ids(query)
+            if not term_ids or k <= 0:
+                results.append([])
+                continue
+            scores = np.zeros(self.num_docs, dtype=np.float32)
+            for term_id in term_ids:
+                if term_id not in weights:
+                    weights[term_id] = self._term_weights(term_id)
+                docs, contribution = weights[term_id]
+                # Doc ids are unique within a posting list, so fancy-index += is safe
+                scores[docs] += contribution
+            results.append(self._top_k(scores, k))
+        return results
+
+
+class BM25Retriever:
+    """
+    Local BM25 Retriever - Query-aware drop-in for MockRetriever and ColBERTv2.
+    """
+
+    def __init__(self, index: BM25Index, k=3):
+        self.index = index
+        self.k = k
+
+    @classmethod
+    def from_jsonl(cls, path: str, k=3):
+        return cls(BM25Index.from_jsonl(path), k=k)
+
+    def _examples(self, hits) -> list:
+        return [
+            dspy.Example(
+                long_text=self.index.passages[doc_id]["long_text"],
+                text=self.index.passages[doc_id]["text"],
+                pid=doc_id,
+                score=score
+            )
+            for doc_id, score in hits
+        ]
+
+    def __call__(self, query, k=None):
+        num_passages = k if k is not None else self.k
+        return self._examples(self.index.search(query, num_passages))
+
+    def batch(self, queries, k=None):
+        """Retrieve for several queries at once (used by BatchingRetriever)."""
+        num_passages = k if k is not None else self.k
+        return [self._examples(hits) for hits in self.index.search_batch(queries, num_passages)]
@@ -0,0 +1,186 @@
+"""
+Retrieval Result Cache
+======================
+Caching wrapper for any retriever returned by ModelFactory.get_retriever.
+
+Results are keyed on (retriever id, normalized query, k) and expire after
+a TTL. Lookups go to an in-process LRU tier first and then to an optional
+on-disk tier (the SQLite store from lm_cache), so repeated hops, ReAct
+tool calls and Streamlit reruns stop hitting remote ColBERT servers.
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import dspy
+
+from ..utils.lm_cache import LMCache
+from ..utils.tracing import annotate
+
+_EDGE_PUNCTUATION = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and trim punctuation at the edges."""
+    return _EDGE_PUNCTUATION.sub("", " ".join(str(query).lower().split()))
+
+
+def _to_record(passage) -> dict:
+    if isinstance(passage, dict):
+        return dict(passage)
+    if hasattr(passage, "toDict"):
+        return passage.toDict()
+    return {"long_text": str(passage)}
+
+
+class RetrievalCache:
+    """
+    Two-tier TTL cache with hit/miss/latency counters.
+    Safe to share between threads and between CachedRetriever instances.
+    """
+
+    def __init__(self, ttl: float = 24 * 3600, max_entries: int = 4096, disk: LMCache = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk = disk
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def make_key(retriever_id: str, query: str, k) -> str:
+        raw = f"{retriever_id}\x1f{normalize_query(query)}\x1f{k}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None and stored[0] > now:
+                self._remember(key, stored)
+                with self._lock:
+                    self.disk_hits += 1
+                return stored[1]
+        return None
+
+    def put(self, key: str, records: list):
+        entry = (time.time() + self.ttl, records)
+        self._remember(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def record(self, hit: bool, seconds: float):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_hit_ms": 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+                "avg_miss_ms": 1000 * avg_miss,
+                # Each hit would otherwise have cost an average miss
+                "saved_seconds": self.hits * avg_miss,
+                "entries": len(self._memory),
+            }
+
+
+class CachedRetriever:
+    """
+    Wraps a retriever callable `(query, k=None) -> passages` with a RetrievalCache.
+    """
+
+    def __init__(self, retriever, retriever_id: str, cache: RetrievalCache):
+        self.retriever = retriever
+        self.retriever_id = retriever_id
+        self.cache = cache
+
+    @property
+    def k(self):
+        return getattr(self.retriever, "k", None)
+
+    def _call_retriever(self, query, k):
+        return self.retriever(query, k=k) if k is not None else self.retriever(query)
+
+    def __call__(self, query, k=None, **kwargs):
+        # Batched queries and extra options go straight through
+        if not isinstance(query, str) or kwargs:
+            return self.retriever(query, k=k, **kwargs) if k is not None else self.retriever(query, **kwargs)
+
+        start = time.perf_counter()
+        key = self.cache.make_key(self.retriever_id, query, k if k is not None else self.k)
+        records = self.cache.get(key)
+        hit = records is not None
+        if not hit:
+            records = [_to_record(p) for p in self._call_retriever(query, k)]
+            self.cache.put(key, records)
+        self.cache.record(hit, time.perf_counter() - start)
+        annotate(retrieval_cache_hit=hit)
+
+        # Fresh objects per call so callers can't mutate cached results
+        return [dspy.Example(**record) for record in records]
+
+    async def acall(self, query, k=None):
+        """Async lookup: hits are answered on the loop, misses go to the retriever."""
+        start = time.perf_counter()
+        key = self.cache.make_key(self.retriever_id, query, k if k is not None else self.k)
+        records = self.cache.get(key)
+        hit = records is not None
+        if not hit:
+            acall = getattr(self.retriever, "acall", None)
+            if acall is not None:
+                passages = await acall(query, k=k)
+            else:
+                passages = await asyncio.to_thread(self._call_retriever, query, k)
+            records = [_to_record(p) for p in passages]
+            self.cache.put(key, records)
+        self.cache.record(hit, time.perf_counter() - start)
+        annotate(retrieval_cache_hit=hit)
+        return [dspy.Example(**record) for record in records]
+
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def get_retrieval_cache(path: str = None, ttl: float = 24 * 3600, max_entries: int = 4096) -> RetrievalCache:
+    """Return the process-wide RetrievalCache (with a disk tier at `path`, if given)."""
+    with _shared_lock:
+        if path not in _shared_caches:
+            disk = LMCache(path) if path else None
+            _shared_caches[path] = RetrievalCache(ttl=ttl, max_entries=max_entries, disk=disk)
+        return _shared_caches[path]
@@ -0,0 +1,204 @@
+"""
+Context Store
+=============
+Incremental passage accumulator for synthesis and judge prompts.
+
+Exact duplicates are caught with a hash set and near duplicates with
+MinHash signatures over word shingles, bucketed by LSH bands so a new
+passage is only compared against likely matches. The joined context is
+written to a buffer as passages arrive (text() only snapshots it, and
+only after a change), and an optional token budget evicts the
+lowest-scored passages first (ties: the most recently added); the buffer
+is rewritten once after evictions.
+"""
+
+import hashlib
+import heapq
+import io
+import zlib
+
+import numpy as np
+
+from .bm25 import tokenize
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word n-gram shingles. Shingles are hashed with
+    CRC32, so signatures (and which passages count as near duplicates) are
+    the same in every process and run.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Multiply-add hashing mod 2^32; odd multipliers keep it a permutation
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> set:
+        tokens = tokenize(text)
+        n = self.shingle_size
+        if len(tokens) < n:
+            return {" ".join(tokens)}
+        return {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text)
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (hashes[:, None] * self.a + self.b) & np.uint64(0xFFFFFFFF)
+        return permuted.min(axis=0)
+
+
+class ContextStore:
+    """
+    Deduplicating, budgeted passage accumulator.
+
+    Args:
+        token_budget: Maximum estimated tokens kept (None = unlimited)
+        near_duplicate_threshold: Estimated Jaccard similarity above which a
+            passage counts as a near duplicate (None disables the check)
+        separator: Joins passages in text()
+        num_perm, bands: MinHash signature length and LSH band count
+    """
+
+    def __init__(self, token_budget: int = None, near_duplicate_threshold: float = 0.8,
+                 separator: str = "\n", num_perm: int = 64, bands: int = 16):
+        self.token_budget = token_budget
+        self.threshold = near_duplicate_threshold
+        self.separator = separator
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm) if near_duplicate_threshold else None
+
+        self._entries = {}      # seq -> passage, in insertion order
+        self._tokens = {}       # seq -> estimated tokens
+        self._heap = []         # (score, -seq) for budget eviction
+        self._seen = set()      # exact-match digests, including evicted passages
+        self._buckets = {}      # (band, band hash) -> [signature]
+        self._buffer = io.StringIO()  # kept passages joined by the separator
+        self._buffer_valid = True     # False after evictions, until the buffer is rewritten
+        self._text = ""               # last snapshot of the buffer; None once it changed
+        self._seq = 0
+
+        self.total_tokens = 0
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
+
+    def __contains__(self, passage):
+        return self._digest(passage) in self._seen
+
+    @property
+    def passages(self) -> list:
+        return list(self._entries.values())
+
+    @staticmethod
+    def _digest(passage: str) -> bytes:
+        normalized = " ".join(str(passage).lower().split())
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, chunk.tobytes()
+
+    def _is_near_duplicate(self, signature) -> bool:
+        checked = set()
+        for key in self._band_keys(signature):
+            for other in self._buckets.get(key, ()):
+                if id(other) in checked:
+                    continue
+                checked.add(id(other))
+                if np.mean(other == signature) >= self.threshold:
+                    return True
+        return False
+
+    def add(self, passage, score: float = 0.0) -> bool:
+        """Add a passage; returns False if it was an exact or near duplicate."""
+        passage = str(passage)
+        digest = self._digest(passage)
+        if digest in self._seen:
+            self.duplicates += 1
+            return False
+
+        if self.hasher is not None:
+            signature = self.hasher.signature(passage)
+            if self._is_near_duplicate(signature):
+                self.near_duplicates += 1
+                return False
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, []).append(signature)
+        self._seen.add(digest)
+
+        seq = self._seq
+        self._seq += 1
+        tokens = estimate_tokens(passage)
+        self._entries[seq] = passage
+        self._tokens[seq] = tokens
+        self.total_tokens += tokens
+        heapq.heappush(self._heap, (score, -seq))
+
+        if self._buffer_valid:
+            if self._buffer.tell():
+                self._buffer.write(self.separator)
+            self._buffer.write(passage)
+        self._text = None
+        self._enforce_budget()
+        return True
+
+    def extend(self, passages, scores=None) -> int:
+        """
+        Add passages in ranked order; returns how many were new. Without
+        explicit scores, each passage scores 1 / rank within this batch.
+        """
+        if scores is None:
+            scores = [1.0 / rank for rank in range(1, len(passages) + 1)]
+        return sum(self.add(p, s) for p, s in zip(passages, scores))
+
+    def _enforce_budget(self):
+        if self.token_budget is None:
+            return
+        # Always keep at least one passage, even if it alone exceeds the budget
+        while self.total_tokens > self.token_budget and len(self._entries) > 1:
+            _, neg_seq = heapq.heappop(self._heap)
+            seq = -neg_seq
+            del self._entries[seq]
+            self.total_tokens -= self._tokens.pop(seq)
+            self.evicted += 1
+            self._buffer_valid = False
+            self._text = None
+
+    def text(self) -> str:
+        """
+        The kept passages joined by the separator. Unchanged since the last
+        call: the same string. After additions: a snapshot of the buffer
+        they were appended to. After evictions: the buffer is rewritten.
+        """
+        if not self._buffer_valid:
+            self._buffer = io.StringIO()
+            self._buffer.write(self.separator.join(self._entries.values()))
+            self._buffer_valid = True
+        if self._text is None:
+            self._text = self._buffer.getvalue()
+        return self._text
+
+    def stats(self) -> dict:
+        return {
+            "passages": len(self._entries),
+            "tokens": self.total_tokens,
+            "duplicates": self.duplicates,
+            "near_duplicates": self.near_duplicates,
+            "evicted": self.evicted,
+        }
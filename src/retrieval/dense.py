@@ -0,0 +1,311 @@
+"""
+Dense Vector Retrieval
+======================
+Embedding-matrix retriever with batched NumPy scoring and optional IVF
+(inverted file) partitioning.
+
+Passage embeddings are stored as one float32 or float16 matrix. A batch of
+queries is scored with a single matrix product and the top-k is selected
+with argpartition. With IVF enabled, passages are grouped around coarse
+k-means centroids and a query only scans its `nprobe` nearest lists.
+float16 halves the matrix size but is upcast chunk by chunk at query time,
+so pair it with IVF on large corpora.
+
+Any callable mapping a list of strings to an (n, dim) array can serve as
+the embedder (e.g. dspy.Embedder); HashingEmbedder is a deterministic,
+offline default.
+"""
+
+import json
+import os
+import zlib
+
+import dspy
+import numpy as np
+
+from .bm25 import normalize_passage, tokenize
+from .mmap_index import open_passages
+
+DENSE_FORMAT_VERSION = 1
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """
+    Deterministic hashing-trick embedder over unigrams and bigrams.
+    Stable across processes and machines (CRC32, not Python's salted hash).
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # Low bits pick the bucket, one high bit picks the sign
+                vectors[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        return _normalize_rows(vectors)
+
+
+def train_kmeans(x: np.ndarray, nlist: int, iters=10, sample_size=None, seed=0) -> np.ndarray:
+    """Spherical k-means on (a sample of) x; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(x))
+    sample_size = sample_size or nlist * 256
+    if len(x) > sample_size:
+        x = x[np.sort(rng.choice(len(x), sample_size, replace=False))]
+    x = np.asarray(x, dtype=np.float32)
+
+    centroids = x[rng.choice(len(x), nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=nlist)
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = sums[filled]
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+class DenseIndex:
+    """
+    Embedding matrix plus optional IVF lists.
+
+    IVF lists are stored CSR-style: the passages of list `c` are
+    `list_ids[list_offsets[c]:list_offsets[c + 1]]`.
+    """
+
+    # Rows scored per matrix product when scanning the full matrix
+    CHUNK_ROWS = 65536
+
+    def __init__(self, embeddings, passages, embedder, centroids=None, list_offsets=None, list_ids=None):
+        self.embeddings = embeddings
+        self.passages = passages
+        self.embedder = embedder
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.num_docs = len(embeddings)
+
+    @property
+    def nlist(self):
+        return 0 if self.centroids is None else len(self.centroids)
+
+    @staticmethod
+    def build_lists(embeddings, centroids, batch_size=65536):
+        """Assign every row to its nearest centroid and return (list_offsets, list_ids)."""
+        assign = np.empty(len(embeddings), dtype=np.int32)
+        for start in range(0, len(embeddings), batch_size):
+            block = np.asarray(embeddings[start:start + batch_size], dtype=np.float32)
+            assign[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+        list_ids = np.argsort(assign, kind="stable").astype(np.uint32)
+        list_offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=list_offsets[1:])
+        return list_offsets, list_ids
+
+    @classmethod
+    def build(cls, passages, embedder=None, dtype=np.float32, nlist=0, batch_size=1024):
+        """Build an in-memory index over passage records."""
+        embedder = embedder or HashingEmbedder()
+        passages = [normalize_passage(p) for p in passages]
+        texts = [f"{p['text']} {p['long_text']}" for p in passages]
+        embeddings = np.concatenate([
+            _normalize_rows(np.asarray(embedder(texts[i:i + batch_size]), dtype=np.float32))
+            for i in range(0, len(texts), batch_size)
+        ]).astype(dtype)
+
+        centroids = list_offsets = list_ids = None
+        if nlist:
+            centroids = train_kmeans(embeddings, nlist)
+            list_offsets, list_ids = cls.build_lists(embeddings, centroids)
+        return cls(embeddings, passages, embedder, centroids, list_offsets, list_ids)
+
+    def _scan(self, queries, ids=None):
+        """Score queries (m, dim) against all n rows, or only the n `ids`; returns (m, n) float32."""
+        if ids is not None:
+            return queries @ np.asarray(self.embeddings[ids], dtype=np.float32).T
+        if self.num_docs <= self.CHUNK_ROWS:
+            return (np.asarray(self.embeddings, dtype=np.float32) @ queries.T).T
+        # Chunking bounds the float32 copy when the matrix is float16 or mapped
+        return np.concatenate([
+            np.asarray(self.embeddings[start:start + self.CHUNK_ROWS], dtype=np.float32) @ queries.T
+            for start in range(0, self.num_docs, self.CHUNK_ROWS)
+        ]).T
+
+    @staticmethod
+    def _top_k(scores, k):
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def search_batch(self, queries, k=3, nprobe=None) -> list:
+        """Return, for each query, up to k (doc_id, score) pairs, best first."""
+        if not queries or k <= 0 or self.num_docs == 0:
+            return [[] for _ in queries]
+        q = _normalize_rows(np.asarray(self.embedder(list(queries)), dtype=np.float32))
+
+        if not self.nlist or (nprobe or self.nlist) >= self.nlist:
+            # Exhaustive: one matrix product for the whole batch
+            scores = self._scan(q)
+            results = []
+            for row in scores:
+                top = self._top_k(row, k)
+                results.append([(int(d), float(row[d])) for d in top])
+            return results
+
+        # IVF: each query only scans the lists of its nprobe nearest centroids
+        probes = np.argpartition(-(q @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        results = []
+        for query_vec, lists in zip(q, probes):
+            ids = np.concatenate([
+                self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in lists
+            ])
+            if not len(ids):
+                results.append([])
+                continue
+            scores = self._scan(query_vec[None, :], ids)[0]
+            top = self._top_k(scores, k)
+            results.append([(int(ids[i]), float(scores[i])) for i in top])
+        return results
+
+    def search(self, query: str, k=3, nprobe=None) -> list:
+        return self.search_batch([query], k=k, nprobe=nprobe)[0]
+
+
+def build_dense_index(index_dir: str, embedder=None, dtype=np.float32, nlist=0, batch_size=1024) -> dict:
+    """
+    Add dense vectors to a compiled index directory (see mmap_index.build_index).
+    The passage blob is shared with the BM25 files; embeddings are streamed
+    to disk batch by batch, so memory stays bounded by the batch size.
+    """
+    embedder = embedder or HashingEmbedder()
+    passages = open_passages(index_dir)
+    build_id = _build_id(index_dir)
+    num_docs = len(passages)
+
+    embeddings = None
+    for start in range(0, num_docs, batch_size):
+        batch = [passages[i] for i in range(start, min(start + batch_size, num_docs))]
+        vectors = _normalize_rows(np.asarray(embedder([f"{p['text']} {p['long_text']}" for p in batch]), dtype=np.float32))
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(index_dir, "embeddings.npy"), mode="w+", dtype=dtype, shape=(num_docs, vectors.shape[1])
+            )
+        embeddings[start:start + len(batch)] = vectors
+    if embeddings is None:
+        raise ValueError(f"Index at {index_dir} has no passages to embed")
+    embeddings.flush()
+
+    if nlist:
+        centroids = train_kmeans(embeddings, nlist)
+        list_offsets, list_ids = DenseIndex.build_lists(embeddings, centroids)
+        np.save(os.path.join(index_dir, "centroids.npy"), centroids)
+        np.save(os.path.join(index_dir, "list_offsets.npy"), list_offsets)
+        np.save(os.path.join(index_dir, "list_ids.npy"), list_ids)
+
+    meta = {
+        "format_version": DENSE_FORMAT_VERSION,
+        "num_docs": num_docs,
+        "dim": int(embeddings.shape[1]),
+        "dtype": np.dtype(dtype).name,
+        "embedder": getattr(embedder, "name", type(embedder).__name__),
+        "nlist": nlist,
+        "build_id": build_id,
+    }
+    with open(os.path.join(index_dir, "dense_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _build_id(index_dir: str):
+    """Build id of the compiled index the passages belong to (see mmap_index.build_index)."""
+    with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+        return json.load(f).get("build_id")
+
+
+def open_dense_index(index_dir: str, embedder=None) -> DenseIndex:
+    """Open the dense part of a compiled index directory, memory-mapped."""
+    meta_path = os.path.join(index_dir, "dense_meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No dense index at {index_dir} (missing dense_meta.json)")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != DENSE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported dense index format {meta.get('format_version')} in {index_dir}")
+    if meta.get("build_id") != _build_id(index_dir):
+        # build-index without --dense rewrote the passages and left these vectors behind
+        raise ValueError(f"Dense index at {index_dir} is from an earlier build; rerun build-index with --dense")
+
+    if embedder is None:
+        embedder = HashingEmbedder(dim=meta["dim"])
+    if getattr(embedder, "name", meta["embedder"]) != meta["embedder"]:
+        print(f"⚠️ Warning: index was embedded with {meta['embedder']}, querying with {embedder.name}")
+
+    centroids = list_offsets = list_ids = None
+    if meta["nlist"]:
+        centroids = np.load(os.path.join(index_dir, "centroids.npy"))
+        list_offsets = np.load(os.path.join(index_dir, "list_offsets.npy"), mmap_mode="r")
+        list_ids = np.load(os.path.join(index_dir, "list_ids.npy"), mmap_mode="r")
+
+    return DenseIndex(
+        np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r"),
+        open_passages(index_dir),
+        embedder,
+        centroids,
+        list_offsets,
+        list_ids,
+    )
+
+
+class DenseRetriever:
+    """
+    Local Dense Retriever - Embedding similarity search, optionally IVF-partitioned.
+    """
+
+    def __init__(self, index: DenseIndex, k=3, nprobe=8):
+        self.index = index
+        self.k = k
+        self.nprobe = nprobe
+
+    def __call__(self, query, k=None):
+        num_passages = k if k is not None else self.k
+        return [
+            dspy.Example(
+                long_text=self.index.passages[doc_id]["long_text"],
+                text=self.index.passages[doc_id]["text"],
+                pid=doc_id,
+                score=score
+            )
+            for doc_id, score in self.index.search(query, num_passages, nprobe=self.nprobe)
+        ]
+
+    def batch(self, queries, k=None):
+        """Retrieve for several queries at once (used by BatchingRetriever)."""
+        num_passages = k if k is not None else self.k
+        return [
+            [
+                dspy.Example(
+                    long_text=self.index.passages[doc_id]["long_text"],
+                    text=self.index.passages[doc_id]["text"],
+                    pid=doc_id,
+                    score=score
+                )
+                for doc_id, score in hits
+            ]
+            for hits in self.index.search_batch(queries, num_passages, nprobe=self.nprobe)
+        ]
@@ -0,0 +1,26 @@
+"""
+Rank Fusion
+===========
+Merges ranked result lists from several queries or retrievers.
+"""
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60, key=None) -> list:
+    """
+    Reciprocal-rank fusion: each item scores sum(1 / (k + rank)) over the
+    lists it appears in (rank starting at 1). Returns the distinct items,
+    best first; ties keep first-seen order.
+
+    Args:
+        rankings: Iterable of ranked lists
+        k: Damping constant (60 is the usual choice)
+        key: Maps an item to its identity (defaults to the item itself)
+    """
+    scores = {}
+    items = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            item_id = key(item) if key else item
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+            items.setdefault(item_id, item)
+    return [items[item_id] for item_id in sorted(scores, key=lambda i: -scores[i])]
@@ -0,0 +1,189 @@
+"""
+Memory-Mapped Corpus Index
+==========================
+Compiles a JSONL passage file into a directory of flat binary files and
+opens it with mmap, so every process shares one page-cached copy and
+opening an index costs the same for ten passages or ten million.
+
+Layout of an index directory:
+    meta.json               format version, corpus size, BM25 parameters and a
+                            build id (dense files record the build they embed)
+    passages.bin            packed UTF-8 text; passage i has its title at
+                            [offsets[2i], offsets[2i+1]) and its body at
+                            [offsets[2i+1], offsets[2i+2])
+    passage_offsets.npy     int64 offsets table into passages.bin
+    terms.bin               sorted vocabulary, packed UTF-8
+    term_string_offsets.npy int64 offsets table into terms.bin
+    term_offsets.npy        int64 CSR offsets into the postings arrays
+    postings_docs.npy       uint32 doc ids
+    postings_tf.npy         uint16 term frequencies
+    doc_lengths.npy         uint32 tokens per passage
+    idf.npy, length_norm.npy  precomputed BM25 factors (float32)
+"""
+
+import array
+import json
+import mmap
+import os
+import uuid
+
+import numpy as np
+
+from .bm25 import BM25Index, build_postings, load_passages
+
+FORMAT_VERSION = 1
+
+ARRAY_FILES = (
+    "passage_offsets", "term_string_offsets", "term_offsets",
+    "postings_docs", "postings_tf", "doc_lengths", "idf", "length_norm",
+)
+
+
+def _open_blob(path: str):
+    """Map a file read-only; empty files cannot be mapped, so use bytes."""
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PassageStore:
+    """Read-only passage sequence over a packed UTF-8 blob."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return (len(self.offsets) - 1) // 2
+
+    def __getitem__(self, i):
+        start, middle, end = (int(o) for o in self.offsets[2 * i:2 * i + 3])
+        return {
+            "text": self.blob[start:middle].decode("utf-8"),
+            "long_text": self.blob[middle:end].decode("utf-8"),
+        }
+
+
+class TermTable:
+    """Sorted on-disk vocabulary; term lookup by binary search."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _term(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+    def get(self, term, default=None):
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._term(lo) == key:
+            return lo
+        return default
+
+
+def build_index(corpus_path: str, index_dir: str, k1=1.5, b=0.75) -> dict:
+    """
+    Compile a JSONL corpus into an index directory.
+    Passage text is streamed straight to disk; only the postings are held
+    in memory while building.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    passage_offsets = array.array("q", [0])
+
+    with open(os.path.join(index_dir, "passages.bin"), "wb") as blob:
+        def spill(passages):
+            for passage in passages:
+                for field in ("text", "long_text"):
+                    data = passage[field].encode("utf-8")
+                    blob.write(data)
+                    passage_offsets.append(passage_offsets[-1] + len(data))
+                yield passage
+
+        vocab, term_offsets, postings_docs, postings_tf, doc_lengths = build_postings(
+            spill(load_passages(corpus_path))
+        )
+
+    # Reuse BM25Index to derive the query-independent factors once
+    index = BM25Index(vocab, term_offsets, postings_docs, postings_tf, doc_lengths, None, k1=k1, b=b)
+
+    # vocab is already in id order (sorted), so the table is a straight join
+    term_bytes = [term.encode("utf-8") for term in vocab]
+    term_string_offsets = np.zeros(len(term_bytes) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in term_bytes], out=term_string_offsets[1:])
+    with open(os.path.join(index_dir, "terms.bin"), "wb") as f:
+        f.write(b"".join(term_bytes))
+
+    arrays = {
+        "passage_offsets": np.frombuffer(passage_offsets, dtype=np.int64),
+        "term_string_offsets": term_string_offsets,
+        "term_offsets": term_offsets,
+        "postings_docs": postings_docs,
+        "postings_tf": postings_tf,
+        "doc_lengths": doc_lengths,
+        "idf": index.idf,
+        "length_norm": index.length_norm,
+    }
+    for name in ARRAY_FILES:
+        np.save(os.path.join(index_dir, f"{name}.npy"), arrays[name])
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "num_docs": index.num_docs,
+        "num_terms": len(vocab),
+        "num_postings": int(len(postings_docs)),
+        "k1": k1,
+        "b": b,
+        "build_id": uuid.uuid4().hex,
+    }
+    # Written last: a directory without meta.json is an incomplete build
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def open_passages(index_dir: str) -> PassageStore:
+    """Map just the passage text of a compiled index (shared by other index kinds)."""
+    offsets = np.load(os.path.join(index_dir, "passage_offsets.npy"), mmap_mode="r")
+    return PassageStore(_open_blob(os.path.join(index_dir, "passages.bin")), offsets)
+
+
+def open_index(index_dir: str) -> BM25Index:
+    """Open a compiled index directory; all arrays stay on disk, mapped."""
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No compiled index at {index_dir} (missing meta.json)")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format {meta.get('format_version')} in {index_dir}")
+
+    arrays = {
+        name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+        for name in ARRAY_FILES
+    }
+    passages = open_passages(index_dir)
+    vocab = TermTable(_open_blob(os.path.join(index_dir, "terms.bin")), arrays["term_string_offsets"])
+
+    return BM25Index(
+        vocab,
+        arrays["term_offsets"],
+        arrays["postings_docs"],
+        arrays["postings_tf"],
+        arrays["doc_lengths"],
+        passages,
+        k1=meta["k1"],
+        b=meta["b"],
+        idf=arrays["idf"],
+        length_norm=arrays["length_norm"],
+    )
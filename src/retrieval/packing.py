@@ -0,0 +1,117 @@
+"""
+Context Packing
+===============
+Fits retrieved passages into a synthesis prompt's token budget.
+
+The budget is either fixed or derived from the context window
+(ModelFactory.CONTEXT_LIMITS) of the LM that runs synthesis: the
+synthesizer predictor's own LM when one is set (a model route), else the
+active LM. Packing is opt-in (Config.CONTEXT_PACKING_ENABLED). When the passages already fit they are
+passed through untouched. Otherwise they are ranked by query-term overlap
+(retrieval rank breaks ties) and packed greedily; a passage that does not
+fit whole is compressed to its sentences with the highest query overlap.
+"""
+
+import re
+
+import dspy
+
+from .bm25 import tokenize
+from .context_store import estimate_tokens
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def _trim(text: str, max_chars: int) -> str:
+    """Cut text to at most max_chars, at the last whitespace (never mid-word)."""
+    if len(text) <= max_chars:
+        return text
+    if text[max_chars].isspace():
+        return text[:max_chars].rstrip()
+    head, _, _ = text[:max_chars].rpartition(" ")
+    return head.rstrip()
+
+
+def synthesis_lm(module):
+    """The LM pinned on a module's predictor (e.g. a routed model), or None to use dspy.settings.lm."""
+    for _, predictor in module.named_predictors():
+        return predictor.lm
+    return None
+
+
+class ContextPacker:
+    """
+    Args:
+        token_budget: Fixed passage budget in estimated tokens (None = derive
+            from the active LM's context window)
+        context_fraction: Share of the context window given to passages when
+            deriving the budget; the rest is left for instructions, demos and output
+        min_fragment_tokens: Smallest remaining budget worth compressing a passage into
+    """
+
+    def __init__(self, token_budget: int = None, context_fraction: float = 0.5, min_fragment_tokens: int = 32):
+        self.token_budget = token_budget
+        self.context_fraction = context_fraction
+        self.min_fragment_tokens = min_fragment_tokens
+
+    def budget(self, lm=None) -> int:
+        if self.token_budget:
+            return self.token_budget
+        # Imported here: model_factory imports the modules that use the packer
+        from ..utils.model_factory import ModelFactory
+        lm = lm or dspy.settings.lm
+        return int(ModelFactory.get_context_limit(getattr(lm, "model", None)) * self.context_fraction)
+
+    @staticmethod
+    def _overlap(text, query_terms) -> int:
+        return len(query_terms.intersection(tokenize(text)))
+
+    def compress(self, passage: str, query_terms: set, max_tokens: int) -> str:
+        """Keep the sentences with the most query overlap that fit in max_tokens, in original order."""
+        sentences = _SENTENCE_BOUNDARY.split(passage)
+        ranked = sorted(range(len(sentences)), key=lambda i: -self._overlap(sentences[i], query_terms))
+        chosen, used = [], 0
+        for i in ranked:
+            tokens = estimate_tokens(sentences[i])
+            if used + tokens <= max_tokens:
+                chosen.append(i)
+                used += tokens
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+    def pack(self, passages, query: str, lm=None):
+        """
+        Returns (packed passages, stats). Stats report the budget, tokens
+        before and after packing, tokens saved and passages compressed/dropped.
+        """
+        passages = [str(p) for p in passages]
+        budget = self.budget(lm)
+        original = sum(estimate_tokens(p) for p in passages)
+        stats = {"budget": budget, "original_tokens": original, "packed_tokens": original,
+                 "saved_tokens": 0, "compressed": 0, "dropped": 0}
+        if original <= budget:
+            return passages, stats
+
+        query_terms = set(tokenize(query))
+        ranked = sorted(range(len(passages)), key=lambda i: (-self._overlap(passages[i], query_terms), i))
+
+        packed, remaining = [], budget
+        for i in ranked:
+            tokens = estimate_tokens(passages[i])
+            if tokens <= remaining:
+                packed.append(passages[i])
+                remaining -= tokens
+                continue
+            fragment = self.compress(passages[i], query_terms, remaining) if remaining >= self.min_fragment_tokens else ""
+            if fragment and estimate_tokens(fragment) > remaining:
+                # Joining sentences can round the estimate past the remaining budget
+                fragment = _trim(fragment, remaining * 4)
+            if fragment:
+                packed.append(fragment)
+                remaining -= estimate_tokens(fragment)
+                stats["compressed"] += 1
+            else:
+                stats["dropped"] += 1
+
+        stats["packed_tokens"] = sum(estimate_tokens(p) for p in packed)
+        stats["saved_tokens"] = original - stats["packed_tokens"]
+        return packed, stats
@@ -0,0 +1,109 @@
+"""
+Remote Retrieval
+================
+ColBERTv2 server client over the shared HTTP transport, and automatic
+failover to a local retriever.
+
+ColBERTRetriever speaks the same API as dspy.ColBERTv2 (GET/POST with
+`query` and `k`, answers under `topk`), but goes through HTTPTransport:
+pooled keep-alive connections, timeouts, backoff on 429/5xx and the
+host's circuit breaker. FailoverRetriever answers from a local retriever
+whenever the remote one fails or its breaker is open, so requests keep
+getting passages while the public server is down.
+"""
+
+import asyncio
+
+from dspy.dsp.utils import dotdict
+
+from ..utils.tracing import annotate
+from ..utils.transport import CircuitOpenError, get_transport
+
+# Open circuits, transport errors (requests' exceptions are OSErrors) and bad server answers
+FAILOVER_ERRORS = (CircuitOpenError, OSError, ValueError)
+
+
+class ColBERTRetriever:
+    """
+    Drop-in for dspy.ColBERTv2 (passages carry `long_text`, `text`, `pid`, `score`).
+    """
+
+    def __init__(self, url: str, k: int = 3, transport=None, post_requests: bool = False):
+        self.url = url
+        self.k = k
+        self.transport = transport or get_transport()
+        self.post_requests = post_requests
+
+    def __call__(self, query, k=None, simplify=False):
+        k = k if k is not None else self.k
+        payload = {"query": query, "k": k}
+        if self.post_requests:
+            response = self.transport.post(self.url, json=payload, headers={"Content-Type": "application/json; charset=utf-8"})
+        else:
+            response = self.transport.get(self.url, params=payload)
+        response.raise_for_status()
+
+        data = response.json()
+        if data.get("error"):
+            raise ValueError(f"ColBERTv2 server returned an error: {data.get('message', 'Unknown error')}")
+        if "topk" not in data:
+            raise ValueError(f"ColBERTv2 server returned an unexpected response: {data}")
+
+        topk = [{**d, "long_text": d["text"]} for d in data["topk"][:k]]
+        if simplify:
+            return [p["long_text"] for p in topk]
+        return [dotdict(p) for p in topk]
+
+
+class FailoverRetriever:
+    """
+    Wraps a remote retriever `(query, k=None) -> passages`: transport
+    failures and open circuits are answered by `fallback` instead. Sits
+    outside any result cache, so fallback passages are never cached as
+    the remote retriever's answer.
+    """
+
+    def __init__(self, primary, fallback, name: str = "remote retriever"):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = name
+        self.failovers = 0
+        self._announced = False
+
+    @property
+    def k(self):
+        return getattr(self.primary, "k", None)
+
+    @staticmethod
+    def _call(retriever, query, k, kwargs):
+        return retriever(query, k=k, **kwargs) if k is not None else retriever(query, **kwargs)
+
+    def _fail_over(self, error):
+        self.failovers += 1
+        annotate(retriever_failover=True)
+        # Announce once per outage, not once per query
+        if not self._announced:
+            print(f"⚠️ {self.name} unavailable ({type(error).__name__}); using the local retriever.")
+            self._announced = True
+
+    def __call__(self, query, k=None, **kwargs):
+        try:
+            passages = self._call(self.primary, query, k, kwargs)
+        except FAILOVER_ERRORS as e:
+            self._fail_over(e)
+            return self._call(self.fallback, query, k, kwargs)
+        self._announced = False
+        return passages
+
+    async def acall(self, query, k=None):
+        acall = getattr(self.primary, "acall", None)
+        try:
+            if acall is not None:
+                passages = await acall(query, k=k)
+            else:
+                passages = await asyncio.to_thread(self._call, self.primary, query, k, {})
+        except FAILOVER_ERRORS as e:
+            self._fail_over(e)
+            return await asyncio.to_thread(self._call, self.fallback, query, k, {})
+        self._announced = False
+        return passages
@@ -0,0 +1,111 @@
+"""
+Reranking
+=========
+Optional stage between retrieval and synthesis: over-fetch candidates
+cheaply, then rerank them to the final k with a pluggable scorer.
+
+A scorer is any callable `(query, passages) -> scores` that scores a whole
+candidate list at once, so each rerank costs as few scorer calls as
+possible:
+    LexicalScorer - BM25 over the candidate set (no model, sub-millisecond)
+    DenseScorer   - cosine similarity from any batch embedder (e.g. a small
+                    local model via dspy.Embedder, or HashingEmbedder)
+    LMScorer      - LM relevance judgments, `batch_size` passages per call
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+import numpy as np
+
+from .bm25 import BM25Index
+from .dense import HashingEmbedder, _normalize_rows
+from ..signatures.search import ScorePassageRelevance
+
+
+class LexicalScorer:
+    """BM25 scores of the query against the candidate passages."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+    def __call__(self, query, passages) -> list:
+        index = BM25Index.build([{"long_text": p, "text": ""} for p in passages], k1=self.k1, b=self.b)
+        scores = [0.0] * len(passages)
+        for doc_id, score in index.search(query, k=len(passages)):
+            scores[doc_id] = score
+        return scores
+
+
+class DenseScorer:
+    """Cosine similarity between query and passage embeddings, one embedder call per rerank."""
+
+    def __init__(self, embedder=None):
+        self.embedder = embedder or HashingEmbedder()
+
+    def __call__(self, query, passages) -> list:
+        vectors = _normalize_rows(np.asarray(self.embedder([query] + list(passages)), dtype=np.float32))
+        return (vectors[1:] @ vectors[0]).tolist()
+
+
+class LMScorer:
+    """
+    LM relevance judgments (0-10). Passages are sent `batch_size` at a time
+    and the batches run concurrently. A batch whose scores don't parse
+    falls back to lexical scores rescaled to the same range.
+    """
+
+    def __init__(self, batch_size=10, max_workers=4):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.judge = dspy.Predict(ScorePassageRelevance)
+        self.fallback = LexicalScorer()
+
+    def _score_batch(self, query, passages) -> list:
+        numbered = "\n".join(f"[{i + 1}] {p}" for i, p in enumerate(passages))
+        try:
+            scores = [float(s) for s in self.judge(query=query, passages=numbered).scores]
+            if len(scores) == len(passages):
+                return scores
+        except Exception as e:
+            print(f"⚠️ LM rerank batch failed ({type(e).__name__}); using lexical scores.")
+        lexical = self.fallback(query, passages)
+        top = max(lexical) or 1.0
+        return [10.0 * s / top for s in lexical]
+
+    def __call__(self, query, passages) -> list:
+        batches = [passages[i:i + self.batch_size] for i in range(0, len(passages), self.batch_size)]
+        if len(batches) == 1:
+            return self._score_batch(query, batches[0])
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, self._score_batch, query, b) for b in batches]
+            return [score for f in futures for score in f.result()]
+
+
+class Reranker:
+    """
+    Reorders over-fetched candidates with a scorer and keeps the top k.
+    Ties keep retrieval order.
+
+    Args:
+        scorer: (query, passages) -> scores
+        fetch_k: Candidates to retrieve before reranking
+    """
+
+    def __init__(self, scorer, fetch_k=50):
+        self.scorer = scorer
+        self.fetch_k = fetch_k
+
+    def rerank(self, query, passages, k) -> list:
+        passages = list(passages)
+        if len(passages) <= 1:
+            return passages[:k]
+        scores = self.scorer(query, passages)
+        order = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+        return [passages[i] for i in order[:k]]
+
+    async def arerank(self, query, passages, k) -> list:
+        return await asyncio.to_thread(self.rerank, query, passages, k)
@@ -16,3 +16,15 @@ class HopQueryGenerator(dspy.Signature):
     context = dspy.InputField(desc="The accumulated knowledge from previous retrieval hops")
     question = dspy.InputField(desc="The original complex research question")
     search_query = dspy.OutputField(desc="A targeted search query to fill information gaps")
+
+class HopQueriesGenerator(dspy.Signature):
+    """Generate several diverse search queries, each covering a different gap in what we already know (context)."""
+    context = dspy.InputField(desc="The accumulated knowledge from previous retrieval hops")
+    question = dspy.InputField(desc="The original complex research question")
+    search_queries: list[str] = dspy.OutputField(desc="Distinct, targeted search queries, one per information gap")
+
+class ScorePassageRelevance(dspy.Signature):
+    """Rate how relevant each numbered passage is to the query, from 0 (irrelevant) to 10 (directly answers it)."""
+    query = dspy.InputField(desc="The search query or research question")
+    passages = dspy.InputField(desc="Numbered candidate passages")
+    scores: list[float] = dspy.OutputField(desc="One relevance score per passage, in the same order")
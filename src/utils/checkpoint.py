@@ -0,0 +1,190 @@
+"""
+Optimizer Checkpoints
+=====================
+Persists optimizer progress so an interrupted compile can resume.
+
+A run directory holds:
+    candidates.jsonl      one line per evaluated candidate (key, label, score, per-example scores)
+    programs/<key>.json   the candidate program, with its instructions and demos (Module.save)
+    stages/<name>.json    intermediate optimizer outputs, e.g. MIPRO demo sets and instructions
+
+Candidates are keyed on a hash of the program state plus the examples
+it was scored on, so a rerun looks up everything already evaluated and
+only pays for the rest.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import dspy
+
+try:
+    from dspy.evaluate.evaluate import EvaluationResult
+except ImportError:  # older DSPy: Evaluate returned plain scores
+    EvaluationResult = None
+
+
+def _digest(obj) -> str:
+    payload = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def dump_example(example) -> dict:
+    """JSON form of a dspy.Example, keeping its input keys."""
+    if isinstance(example, dict):
+        return {"fields": dict(example), "inputs": None}
+    inputs = getattr(example, "_input_keys", None)
+    return {"fields": example.toDict(), "inputs": sorted(inputs) if inputs else None}
+
+
+def load_example(data: dict):
+    example = dspy.Example(**data["fields"])
+    return example.with_inputs(*data["inputs"]) if data["inputs"] else example
+
+
+def run_fingerprint(*parts) -> str:
+    """Short hash identifying an optimizer run (datasets plus settings)."""
+    normalized = [[dump_example(x) for x in p] if isinstance(p, (list, tuple)) else p for p in parts]
+    return _digest(normalized)[:12]
+
+
+class OptimizerCheckpoint:
+    """
+    Checkpoint directory for one optimizer run. Safe to share between
+    the threads of a single process.
+    """
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._records = {}
+        self._load()
+
+    @property
+    def _candidates_path(self):
+        return os.path.join(self.run_dir, "candidates.jsonl")
+
+    def _load(self):
+        os.makedirs(os.path.join(self.run_dir, "programs"), exist_ok=True)
+        os.makedirs(os.path.join(self.run_dir, "stages"), exist_ok=True)
+        if not os.path.exists(self._candidates_path):
+            return
+        with open(self._candidates_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                self._records[record["key"]] = record
+
+    def clear(self):
+        """Forget everything checkpointed for this run."""
+        with self._lock:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+            self._records = {}
+            self._load()
+
+    def __len__(self):
+        return len(self._records)
+
+    # --- Candidates ---
+
+    @staticmethod
+    def key(program, devset) -> str:
+        # Predictor state (instructions and demos) is what optimizers change
+        state = {name: predictor.dump_state() for name, predictor in program.named_predictors()}
+        return _digest({"program": state, "devset": [dump_example(x) for x in devset]})
+
+    def get(self, key: str):
+        return self._records.get(key)
+
+    def find(self, label: str):
+        """Most recent record with the given label."""
+        matches = [r for r in self._records.values() if r.get("label") == label]
+        return matches[-1] if matches else None
+
+    def records(self) -> list:
+        return list(self._records.values())
+
+    def record(self, key: str, program, score: float, subscores, label: str = None) -> dict:
+        """Save a candidate program and its scores; returns the record."""
+        path = os.path.join(self.run_dir, "programs", f"{key}.json")
+        program.save(path)
+        record = {
+            "key": key,
+            "label": label,
+            "score": float(score),
+            "subscores": [float(s) for s in subscores],
+            "num_demos": sum(len(p.demos) for p in program.predictors()),
+            "program_path": path,
+            "time": time.time(),
+        }
+        with self._lock:
+            with open(self._candidates_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._records[key] = record
+        return record
+
+    def load_program(self, record: dict, student):
+        program = student.deepcopy()
+        program.load(record["program_path"])
+        return program
+
+    # --- Stages ---
+
+    def _stage_path(self, name):
+        return os.path.join(self.run_dir, "stages", f"{name}.json")
+
+    def load_stage(self, name: str):
+        path = self._stage_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_stage(self, name: str, value):
+        path = self._stage_path(name)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp, path)
+
+
+class CheckpointedEvaluate:
+    """
+    Wraps a dspy.Evaluate: scores for a (program, devset) pair already in
+    the checkpoint are returned without running the program, and every new
+    evaluation is checkpointed as soon as it finishes.
+    """
+
+    def __init__(self, evaluate, checkpoint: OptimizerCheckpoint, label: str = None):
+        self.evaluate = evaluate
+        self.checkpoint = checkpoint
+        self.label = label
+
+    def __getattr__(self, name):
+        return getattr(self.evaluate, name)
+
+    def __call__(self, program, devset=None, **kwargs):
+        devset = self.evaluate.devset if devset is None else devset
+        key = self.checkpoint.key(program, devset)
+        record = self.checkpoint.get(key)
+        if record is not None:
+            self.checkpoint.reused += 1
+            print(f"♻️ Reusing checkpointed score {record['score']:.2f} ({key[:8]})")
+            results = [(ex, dspy.Prediction(), s) for ex, s in zip(devset, record["subscores"])]
+            if EvaluationResult is not None:
+                return EvaluationResult(score=record["score"], results=results)
+            return record["score"]
+
+        result = self.evaluate(program, devset=devset, **kwargs)
+        if hasattr(result, "results"):
+            self.checkpoint.record(key, program, result.score, [r[2] for r in result.results], label=self.label)
+        return result
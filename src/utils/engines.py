@@ -0,0 +1,141 @@
+"""
+Engine Registry
+===============
+Process-wide, thread-safe cache of configured engines.
+
+An engine is the LM client and retriever for one (provider, model,
+retriever, url/path, k) choice. Each one is built once through
+ModelFactory and shared by every session and thread asking for the same
+choice, so LM clients keep their connection pools warm, local indexes load
+once, and module instances are built once per (mode, reranker).
+
+Requests never touch the global dspy settings: they run inside
+engine.context(), a scoped dspy.context override that worker threads
+started through copied contexts (e.g. stream_events) inherit.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import dspy
+from .model_factory import ModelFactory
+
+# Retriever types that read a local corpus or index path / a remote URL
+PATH_RETRIEVERS = ("bm25", "index", "dense")
+URL_RETRIEVERS = ("colbert",)
+
+
+def engine_key(provider: str, model: str, retriever_type: str, url: str = None, path: str = None,
+               k: int = 3, api_key: str = None) -> tuple:
+    """
+    Registry key for an engine. Settings a retriever type ignores are left
+    out, and the API key is only kept as a hash (sessions with different
+    keys never share a client).
+    """
+    return (
+        provider.lower(),
+        model,
+        retriever_type,
+        url if retriever_type in URL_RETRIEVERS else None,
+        path if retriever_type in PATH_RETRIEVERS else None,
+        k,
+        hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None,
+    )
+
+
+class Engine:
+    """A configured LM + retriever pair and the modules built on it."""
+
+    def __init__(self, key: tuple, lm, rm, k: int, api_key: str = None):
+        self.key = key
+        self.lm = lm
+        self.rm = rm
+        self.k = k
+        self._api_key = api_key  # for routed cloud models (Config.MODEL_ROUTES)
+        self._modules = {}
+        self._lock = threading.Lock()
+
+    def context(self, **overrides):
+        """Scoped dspy settings for one request: `with engine.context(): program(...)`."""
+        return dspy.context(lm=self.lm, rm=self.rm, **overrides)
+
+    def module(self, mode: str, reranker_type: str = None):
+        """
+        The shared module instance for a mode (see ModelFactory.get_module).
+        Modules hold no per-request state, so concurrent requests can share one.
+        """
+        key = (mode, reranker_type)
+        with self._lock:
+            if key not in self._modules:
+                self._modules[key] = ModelFactory.get_module(mode, k=self.k, reranker_type=reranker_type,
+                                                               api_key=self._api_key)
+            return self._modules[key]
+
+
+class EngineRegistry:
+    """
+    Engines by key, least recently used evicted beyond `max_engines`.
+    Concurrent requests for the same new key build it once; builds of
+    different keys don't wait on each other.
+    """
+
+    def __init__(self, max_engines: int = 16):
+        self.max_engines = max_engines
+        self._engines = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def __len__(self):
+        return len(self._engines)
+
+    def _lookup(self, key):
+        engine = self._engines.get(key)
+        if engine is not None:
+            self._engines.move_to_end(key)
+        return engine
+
+    def get(self, provider: str, model: str = None, retriever_type: str = "mock", url: str = None,
+            path: str = None, k: int = 3, api_key: str = None) -> Engine:
+        """The engine for these settings, building it on first use (errors propagate, nothing is cached)."""
+        key = engine_key(provider, model, retriever_type, url=url, path=path, k=k, api_key=api_key)
+        with self._lock:
+            engine = self._lookup(key)
+            if engine is not None:
+                return engine
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                engine = self._lookup(key)
+            if engine is not None:
+                return engine  # built while this thread waited
+            try:
+                lm = ModelFactory.get_model(provider, model, api_key)
+                rm = ModelFactory.get_retriever(retriever_type, url, k, path=path)
+                engine = Engine(key, lm, rm, k, api_key=api_key)
+                with self._lock:
+                    self._engines[key] = engine
+                    self.builds += 1
+                    while len(self._engines) > self.max_engines:
+                        self._engines.popitem(last=False)
+            finally:
+                # Also after a failed build, so its lock doesn't linger; waiters retry the build
+                with self._lock:
+                    if self._building.get(key) is build_lock:
+                        del self._building[key]
+        return engine
+
+    def clear(self):
+        with self._lock:
+            self._engines.clear()
+
+
+_registry = EngineRegistry()
+
+
+def get_engine(provider: str, model: str = None, retriever_type: str = "mock", url: str = None,
+               path: str = None, k: int = 3, api_key: str = None) -> Engine:
+    """Return the process-wide engine for these settings, building it on first use."""
+    return _registry.get(provider, model, retriever_type, url=url, path=path, k=k, api_key=api_key)
@@ -0,0 +1,237 @@
+"""
+LM Response Cache
+=================
+Persistent, content-addressed cache for LM responses shared across runs
+and processes.
+
+Entries are keyed on a SHA-256 of (provider, model, rendered prompt or
+messages, sampling params) and stored in a SQLite file in WAL mode, so
+concurrent optimizer workers, the CLI and Streamlit sessions can all
+read and write the same cache. The file is kept under a size budget by
+evicting least-recently-used entries.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import dspy
+
+from .tracing import span
+
+# Request params that change how a call is sent, not what it returns
+_NON_SEMANTIC_PARAMS = {"api_key", "api_base", "base_url", "timeout", "num_retries", "headers"}
+
+ACCESS_RESOLUTION = 60.0  # seconds; hits refresh an entry's LRU time at most this often
+RESYNC_EVERY = 256  # puts between exact size totals (other processes write too)
+
+
+class LMCache:
+    """
+    SQLite-backed key/value store with size-bounded LRU eviction.
+    Each thread gets its own connection; SQLite's locking makes the file
+    safe to share between processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._size = None  # running estimate of the table size in bytes
+        self._puts = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __getstate__(self):
+        # Connections and locks stay with the process that opened them
+        state = self.__dict__.copy()
+        del state["_local"], state["_stats_lock"]
+        state["_size"] = None  # re-counted in the new process
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str):
+        conn = self._connect()
+        row = conn.execute("SELECT value, last_access FROM responses WHERE key = ?", (key,)).fetchone()
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        now = time.time()
+        # LRU order only needs coarse times, so most hits don't write
+        if now - row[1] > ACCESS_RESOLUTION:
+            with conn:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            with self._stats_lock:
+                self._puts += 1
+                # Exact total on first use, every RESYNC_EVERY puts and before evicting
+                resync = self._size is None or self._puts % RESYNC_EVERY == 0
+                if self._size is not None:
+                    self._size += len(blob)
+                if not resync and self._size <= self.max_bytes:
+                    return
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        with self._stats_lock:
+            self._size = total
+        if total <= self.max_bytes:
+            return
+        # Free down to 90% of the budget so eviction doesn't run on every put
+        excess = total - int(self.max_bytes * 0.9)
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        with self._stats_lock:
+            self._size = int(self.max_bytes * 0.9) + excess
+
+    def stats(self) -> dict:
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def get_lm_cache(path: str, max_bytes: int = 512 * 1024 * 1024) -> LMCache:
+    """Return the process-wide LMCache for a file, creating it on first use."""
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = LMCache(path, max_bytes=max_bytes)
+        return _shared_caches[path]
+
+
+class CachedLM(dspy.BaseLM):
+    """
+    Wraps a dspy.LM so identical requests are answered from an LMCache.
+    Behaves like the wrapped LM everywhere else (model name, kwargs,
+    capabilities), so it can be passed to dspy.settings.configure as is.
+    """
+
+    def __init__(self, lm, provider: str, cache: LMCache):
+        super().__init__(
+            model=lm.model,
+            model_type=lm.model_type,
+            cache=False,
+            num_retries=getattr(lm, "num_retries", 3),
+            **dict(lm.kwargs)
+        )
+        self.lm = lm
+        self.provider = provider
+        self.response_cache = cache
+
+    @property
+    def supports_function_calling(self) -> bool:
+        return self.lm.supports_function_calling
+
+    @property
+    def supports_reasoning(self) -> bool:
+        return self.lm.supports_reasoning
+
+    @property
+    def supports_response_schema(self) -> bool:
+        return self.lm.supports_response_schema
+
+    @property
+    def supported_params(self) -> set:
+        return self.lm.supported_params
+
+    def cache_key(self, prompt, messages, params) -> str:
+        request = {
+            "provider": self.provider,
+            "model": self.model,
+            "prompt": prompt,
+            "messages": messages,
+            "params": {k: v for k, v in params.items() if k not in _NON_SEMANTIC_PARAMS},
+        }
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key):
+        response = self.response_cache.get(key)
+        if response is not None:
+            try:
+                # Tells dspy not to count the stored usage as new spend
+                response.cache_hit = True
+            except AttributeError:
+                pass
+        return response
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        with span("lm", model=self.model) as s:
+            params = {**self.kwargs, **kwargs}
+            key = self.cache_key(prompt, messages, params)
+            response = self._lookup(key)
+            s.set(cache_hit=response is not None)
+            if response is None:
+                response = self.lm.forward(prompt=prompt, messages=messages, **params)
+                self.response_cache.put(key, response)
+            return response
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        with span("lm", model=self.model) as s:
+            params = {**self.kwargs, **kwargs}
+            key = self.cache_key(prompt, messages, params)
+            # SQLite I/O runs off the event loop
+            response = await asyncio.to_thread(self._lookup, key)
+            s.set(cache_hit=response is not None)
+            if response is None:
+                response = await self.lm.aforward(prompt=prompt, messages=messages, **params)
+                await asyncio.to_thread(self.response_cache.put, key, response)
+            return response
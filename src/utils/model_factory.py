@@ -6,11 +6,30 @@ Default: Ollama (FREE, runs locally)
 Also provides retrieval alternatives when ColBERT servers are unavailable.
 """
 
+import inspect
+import os
+
 import dspy
+from config import Config
+from ..retrieval.bm25 import BM25Index, BM25Retriever
+from ..retrieval.mmap_index import open_index
+from ..retrieval.dense import DenseRetriever, open_dense_index
+from ..retrieval.cache import CachedRetriever, get_retrieval_cache
+from ..retrieval.batching import BatchingRetriever
+from ..retrieval.packing import ContextPacker
+from ..retrieval.remote import ColBERTRetriever, FailoverRetriever
+from ..retrieval.rerank import DenseScorer, LexicalScorer, LMScorer, Reranker
+from .lm_cache import CachedLM, get_lm_cache
+from .rate_limit import RateLimitedLM
+from .routing import parse_routes, route_module
+from ..modules.rag import AuraArchitect
+from ..modules.multihop import AuraMultiHop
+from ..modules.agent import AuraAgent
+from ..modules.reflector import AuraReflector
 
 class MockRetriever:
     """
-    Local Mock Retriever - Returns hardcoded knowledge passages.
+    Local Mock Retriever - Ranks hardcoded knowledge passages with BM25.
     Replaces the unstable public ColBERTv2 server with reliable local data.
     """
     
@@ -38,16 +57,37 @@ class MockRetriever:
         }
     ]
     
+    # Shared across instances; built on first use
+    _index = None
+    
     def __init__(self, k=3):
         self.k = k
     
+    @classmethod
+    def get_index(cls):
+        if cls._index is None:
+            cls._index = BM25Index.build(cls.KNOWLEDGE_BASE)
+        return cls._index
+    
     def __call__(self, query, k=None):
         """
         Return relevant passages from the local knowledge base.
-        For simplicity, returns the first k passages regardless of query.
+        Passages are ranked by BM25 against the query; when fewer than k
+        passages match, the rest are filled in knowledge base order so the
+        pipelines always receive k passages.
         """
         num_passages = k if k is not None else self.k
-        passages = self.KNOWLEDGE_BASE[:num_passages]
+        return self._fill(self.get_index().search(query, num_passages), num_passages)
+    
+    def batch(self, queries, k=None):
+        """Retrieve for several queries at once (used by BatchingRetriever)."""
+        num_passages = k if k is not None else self.k
+        return [self._fill(hits, num_passages) for hits in self.get_index().search_batch(queries, num_passages)]
+    
+    def _fill(self, hits, num_passages):
+        ranked = [doc_id for doc_id, _ in hits]
+        ranked += [i for i in range(len(self.KNOWLEDGE_BASE)) if i not in ranked]
+        passages = [self.KNOWLEDGE_BASE[i] for i in ranked[:num_passages]]
         
         # Return as dspy.Example objects (DSPy-compatible format)
         return [
@@ -79,14 +119,65 @@ class ModelFactory:
         "openai": ["gpt-3.5-turbo", "gpt-4o-mini", "gpt-4o", "gpt-4-turbo"]
     }
     
+    # Usable context window (tokens) per model, used to budget synthesis prompts.
+    # Ollama models use the server's default num_ctx, not the model maximum.
+    CONTEXT_LIMITS = {
+        "llama3": 4096,
+        "mistral": 4096,
+        "llama2": 4096,
+        "codellama": 4096,
+        "phi": 2048,
+        "deepseek-chat": 65536,
+        "deepseek-coder": 16384,
+        "gpt-3.5-turbo": 16385,
+        "gpt-4o-mini": 128000,
+        "gpt-4o": 128000,
+        "gpt-4-turbo": 128000,
+    }
+    DEFAULT_CONTEXT_LIMIT = 4096
+    
+    # List prices (USD per 1M prompt / completion tokens) for routing savings estimates.
+    # Local and unknown models count as free.
+    MODEL_PRICES = {
+        "deepseek-chat": (0.27, 1.10),
+        "deepseek-coder": (0.27, 1.10),
+        "gpt-3.5-turbo": (0.50, 1.50),
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4-turbo": (10.00, 30.00),
+    }
+    
     # Retrieval options
     RETRIEVAL_OPTIONS = {
         "none": "No Retrieval (LLM Only)",
         "colbert": "ColBERTv2 (Wikipedia)",
+        "bm25": "BM25 (Local JSONL Corpus)",
+        "index": "BM25 (Compiled mmap Index)",
+        "dense": "Dense Vectors (Compiled mmap Index)",
+    }
+    
+    # Rerank stages (over-fetch, then rescore to the final k)
+    RERANKERS = {
+        "none": "No Reranking",
+        "lexical": "Lexical Overlap (BM25)",
+        "dense": "Embedding Similarity",
+        "lm": "LM Relevance Judge",
+    }
+    
+    # Local indexes are expensive to build, so keep one per corpus path
+    _local_indexes = {}
+    
+    # Cognitive architectures, keyed by CLI/API name
+    MODES = {
+        "rag": "Standard RAG",
+        "multihop": "Multi-Hop Reasoning",
+        "fanout": "Multi-Hop Fan-Out",
+        "agent": "Autonomous ReAct Agent",
+        "reflector": "Self-Reflecting Architect",
     }
     
     @staticmethod
-    def get_model(provider: str, model_name: str = None, api_key: str = None):
+    def get_model(provider: str, model_name: str = None, api_key: str = None, cache: bool = None):
         """
         Get a configured LM instance based on the provider.
         
@@ -94,9 +185,11 @@ class ModelFactory:
             provider: 'ollama', 'deepseek', or 'openai'
             model_name: Specific model name (uses default if None)
             api_key: API key (required for cloud providers, ignored for Ollama)
+            cache: Wrap the LM in the persistent response cache
+                   (defaults to Config.LM_CACHE_ENABLED)
         
         Returns:
-            Configured dspy.LM instance
+            Configured dspy.LM instance (see wrap_lm)
         """
         provider = provider.lower()
         
@@ -104,10 +197,12 @@ class ModelFactory:
             # FREE - Local Ollama instance
             # No API key required, runs on localhost
             model = model_name or "llama3"
-            return dspy.LM(
+            lm = dspy.LM(
                 f"ollama_chat/{model}",
                 api_base="http://localhost:11434",
-                api_key=""  # No key needed
+                api_key="",  # No key needed
+                timeout=Config.LM_TIMEOUT,
+                num_retries=0  # retried with backoff by RateLimitedLM (see wrap_lm)
             )
         
         elif provider == "deepseek":
@@ -115,10 +210,12 @@ class ModelFactory:
             if not api_key:
                 raise ValueError("DeepSeek requires an API key")
             model = model_name or "deepseek-chat"
-            return dspy.LM(
+            lm = dspy.LM(
                 f"openai/{model}",
                 api_base="https://api.deepseek.com/v1",
-                api_key=api_key
+                api_key=api_key,
+                timeout=Config.LM_TIMEOUT,
+                num_retries=0
             )
         
         elif provider == "openai":
@@ -126,37 +223,228 @@ class ModelFactory:
             if not api_key:
                 raise ValueError("OpenAI requires an API key")
             model = model_name or "gpt-3.5-turbo"
-            return dspy.LM(
+            lm = dspy.LM(
                 f"openai/{model}",
-                api_key=api_key
+                api_key=api_key,
+                timeout=Config.LM_TIMEOUT,
+                num_retries=0
             )
         
         else:
             raise ValueError(f"Unknown provider: {provider}. Use 'ollama', 'deepseek', or 'openai'.")
+        
+        return ModelFactory.wrap_lm(lm, provider, cache=cache)
     
     @staticmethod
-    def get_retriever(retriever_type: str, url: str = None, k: int = 3):
+    def wrap_lm(lm, provider: str, cache: bool = None):
+        """
+        Layer AURA's shared infrastructure around a raw dspy.LM:
+        provider rate limits, retries with backoff and the provider's
+        circuit breaker first, then the response cache on top, so cache
+        hits never spend rate-limit budget.
+        """
+        lm = RateLimitedLM(lm, provider=provider)
+        if cache if cache is not None else Config.LM_CACHE_ENABLED:
+            # Shared SQLite cache: identical prompts are free across runs and processes
+            lm = CachedLM(lm, provider=provider, cache=get_lm_cache(Config.LM_CACHE_PATH, Config.LM_CACHE_MAX_BYTES))
+        return lm
+    
+    @staticmethod
+    def get_retriever(retriever_type: str, url: str = None, k: int = 3, path: str = None, embedder=None,
+                      cache: bool = None, batch_window_ms: float = None, failover: bool = None):
         """
         Get a retriever instance.
         
         Args:
             retriever_type: 'mock' for local knowledge base (RECOMMENDED), 
-                           'colbert' for ColBERTv2 (may be unstable)
+                           'colbert' for ColBERTv2 (may be unstable),
+                           'bm25' for a BM25 index over a local JSONL corpus,
+                           'index' for a compiled, memory-mapped index directory,
+                           'dense' for the embedding vectors of a compiled index
             url: URL for ColBERTv2 server (only used for 'colbert')
             k: Number of passages to retrieve
+            path: Corpus file ('bm25') or index directory ('index', 'dense') for
+                  local retrievers (defaults to Config.LOCAL_CORPUS_PATH / LOCAL_INDEX_DIR)
+            embedder: Query embedder for 'dense' (defaults to the hashing embedder
+                      the index was built with)
+            cache: Wrap the retriever in the shared retrieval result cache
+                   (defaults to on for 'colbert' when Config.RETRIEVAL_CACHE_ENABLED)
+            batch_window_ms: Coalesce concurrent queries arriving within this window
+                             into batched calls (for servers; cache hits skip the batcher)
+            failover: Answer from the best local retriever while the remote one fails
+                      or its circuit breaker is open (defaults to on for 'colbert'
+                      when Config.RETRIEVER_FAILOVER)
         
         Returns:
-            Retriever instance (MockRetriever or ColBERTv2)
+            Retriever instance (MockRetriever, BM25Retriever, DenseRetriever or ColBERTRetriever),
+            wrapped in BatchingRetriever / CachedRetriever / FailoverRetriever when enabled
         """
         if retriever_type == "mock" or retriever_type == "none":
             # Default: Use local mock retriever with hardcoded knowledge
-            return MockRetriever(k=k)
+            rm = MockRetriever(k=k)
         elif retriever_type == "colbert":
-            # External: ColBERTv2 server (may be unstable)
-            return dspy.ColBERTv2(url=url)
+            # External: ColBERTv2 server (may be unstable) over the pooled, retrying transport
+            url = url or Config.COLBERT_URL
+            rm = ColBERTRetriever(url, k=k)
+        elif retriever_type == "bm25":
+            # Local: BM25 over a JSONL corpus, built once per process
+            path = path or Config.LOCAL_CORPUS_PATH
+            if path not in ModelFactory._local_indexes:
+                ModelFactory._local_indexes[path] = BM25Index.from_jsonl(path)
+            rm = BM25Retriever(ModelFactory._local_indexes[path], k=k)
+        elif retriever_type == "index":
+            # Local: compiled index, mapped from disk and shared via the page cache
+            path = path or Config.LOCAL_INDEX_DIR
+            if path not in ModelFactory._local_indexes:
+                ModelFactory._local_indexes[path] = open_index(path)
+            rm = BM25Retriever(ModelFactory._local_indexes[path], k=k)
+        elif retriever_type == "dense":
+            # Local: embedding matrix (optionally IVF-partitioned) of a compiled index
+            path = path or Config.LOCAL_INDEX_DIR
+            cache_key = ("dense", path, getattr(embedder, "name", id(embedder)))
+            if cache_key not in ModelFactory._local_indexes:
+                ModelFactory._local_indexes[cache_key] = open_dense_index(path, embedder)
+            rm = DenseRetriever(ModelFactory._local_indexes[cache_key], k=k)
         else:
             # Fallback to mock retriever
-            return MockRetriever(k=k)
+            rm = MockRetriever(k=k)
+        
+        if batch_window_ms:
+            rm = BatchingRetriever(rm, max_wait_ms=batch_window_ms)
+        
+        if cache is None:
+            # Local retrievers answer in milliseconds; remote ones are worth caching
+            cache = Config.RETRIEVAL_CACHE_ENABLED and retriever_type == "colbert"
+        if cache:
+            # Keyed on the endpoint or corpus actually used, defaults resolved above
+            retriever_id = f"{retriever_type}:{url if retriever_type == 'colbert' else path}"
+            rm = CachedRetriever(rm, retriever_id, get_retrieval_cache(
+                Config.RETRIEVAL_CACHE_PATH, Config.RETRIEVAL_CACHE_TTL, Config.RETRIEVAL_CACHE_MAX_ENTRIES
+            ))
+        
+        if failover is None:
+            failover = Config.RETRIEVER_FAILOVER and retriever_type == "colbert"
+        if failover:
+            # Outside the cache, so fallback passages are never cached as the server's answer
+            rm = FailoverRetriever(rm, ModelFactory.get_local_retriever(k), name=f"{retriever_type} retriever")
+        return rm
+    
+    @staticmethod
+    def get_local_retriever(k: int = 3):
+        """Best local retriever available: the compiled index, the JSONL corpus, else the built-in knowledge base."""
+        if os.path.isdir(Config.LOCAL_INDEX_DIR):
+            return ModelFactory.get_retriever("index", k=k, path=Config.LOCAL_INDEX_DIR, cache=False, failover=False)
+        if os.path.isfile(Config.LOCAL_CORPUS_PATH):
+            return ModelFactory.get_retriever("bm25", k=k, path=Config.LOCAL_CORPUS_PATH, cache=False, failover=False)
+        return MockRetriever(k=k)
+    
+    @staticmethod
+    def get_reranker(reranker_type: str = None, fetch_k: int = None, embedder=None):
+        """
+        Get a rerank stage, or None for 'none'.
+        
+        Args:
+            reranker_type: 'lexical', 'dense', 'lm' or 'none' (defaults to Config.RERANKER)
+            fetch_k: Candidates to over-fetch (defaults to Config.RERANK_FETCH_K)
+            embedder: Batch embedder for 'dense' (defaults to the hashing embedder)
+        """
+        reranker_type = reranker_type or Config.RERANKER
+        if reranker_type == "lexical":
+            scorer = LexicalScorer()
+        elif reranker_type == "dense":
+            scorer = DenseScorer(embedder)
+        elif reranker_type == "lm":
+            scorer = LMScorer()
+        else:
+            return None
+        return Reranker(scorer, fetch_k=fetch_k or Config.RERANK_FETCH_K)
+    
+    @staticmethod
+    def get_module(mode: str, k: int = 3, reranker_type: str = None, program_path: str = None,
+                   api_key: str = None):
+        """
+        Build the AURA module for a cognitive architecture.
+        
+        Args:
+            mode: 'rag', 'multihop', 'fanout', 'agent' or 'reflector'
+            k: Number of passages to retrieve per query
+            reranker_type: Rerank stage (see get_reranker; defaults to Config.RERANKER)
+            program_path: Compiled program JSON to load
+            api_key: Key for cloud models in Config.MODEL_ROUTES
+        
+        Returns:
+            dspy.Module instance, with Config.MODEL_ROUTES applied (see route_module)
+        """
+        budget = Config.CONTEXT_TOKEN_BUDGET
+        packer = ModelFactory.get_packer()
+        reranker = ModelFactory.get_reranker(reranker_type)
+        # Rewrite-Retrieve-Read options: speculative retrieval on the raw goal
+        rag_options = {"speculative": Config.SPECULATIVE_RETRIEVAL, "rewrite_timeout": Config.REWRITE_TIMEOUT}
+        if mode == "rag":
+            module = AuraArchitect(k=k, token_budget=budget, packer=packer, reranker=reranker, **rag_options)
+        elif mode == "multihop":
+            module = AuraMultiHop(max_hops=2, k=k, token_budget=budget, packer=packer, reranker=reranker)
+        elif mode == "fanout":
+            # Several parallel sub-queries per hop, fused with RRF
+            module = AuraMultiHop(max_hops=3, k=k, fanout=3, token_budget=budget, packer=packer, reranker=reranker)
+        elif mode == "agent":
+            module = AuraAgent()
+        elif mode == "reflector":
+            # Standard RAG with Generate & Judge synthesis
+            module = AuraArchitect(k=k, token_budget=budget, packer=packer, reranker=reranker, **rag_options)
+            module.synthesize = AuraReflector(n=3)
+        else:
+            raise ValueError(f"Unknown mode: {mode}. Use one of {', '.join(ModelFactory.MODES)}.")
+        
+        if program_path:
+            module.load(program_path)
+        if Config.MODEL_ROUTES:
+            # After loading: loading a program resets predictor LMs
+            ModelFactory.route_module(module, api_key=api_key)
+        return module
+    
+    @staticmethod
+    def route_module(module, routes: str = None, api_key: str = None) -> int:
+        """
+        Run the signatures named in `routes` (defaults to Config.MODEL_ROUTES,
+        e.g. 'GenerateSearchQuery=ollama:phi') on their own models, escalating
+        to the pipeline's LM when Config.ROUTE_ESCALATION is on.
+        Cloud routes use `api_key`. Returns the number of predictors routed.
+        """
+        lms = {}
+        for name, (provider, model) in parse_routes(routes or Config.MODEL_ROUTES).items():
+            try:
+                lms[name] = ModelFactory.get_model(provider, model, api_key)
+            except ValueError as e:
+                print(f"⚠️ Route for {name} skipped: {e}")
+        return route_module(module, lms, escalate=Config.ROUTE_ESCALATION, price=ModelFactory.get_price)
+    
+    @staticmethod
+    def goal_inputs(module, research_goal: str) -> dict:
+        """Map a research goal onto the module's input field ('research_goal' or 'question')."""
+        params = inspect.signature(type(module).forward).parameters
+        if "research_goal" in params:
+            return {"research_goal": research_goal}
+        return {"question": research_goal}
+    
+    @staticmethod
+    def get_context_limit(model_name: str) -> int:
+        """Context window of a model; accepts LM names like 'ollama_chat/llama3:8b'."""
+        name = (model_name or "").split("/")[-1].split(":")[0]
+        return ModelFactory.CONTEXT_LIMITS.get(name, ModelFactory.DEFAULT_CONTEXT_LIMIT)
+    
+    @staticmethod
+    def get_price(model_name: str) -> tuple:
+        """(USD per 1M prompt tokens, per 1M completion tokens) of a model; accepts LM names like 'openai/gpt-4o'."""
+        name = (model_name or "").split("/")[-1].split(":")[0]
+        return ModelFactory.MODEL_PRICES.get(name, (0.0, 0.0))
+    
+    @staticmethod
+    def get_packer():
+        """The synthesis-context packer configured in Config (None when disabled)."""
+        if not Config.CONTEXT_PACKING_ENABLED:
+            return None
+        return ContextPacker(token_budget=Config.CONTEXT_PACKING_BUDGET, context_fraction=Config.CONTEXT_PACKING_FRACTION)
     
     @staticmethod
     def get_available_models(provider: str) -> list:
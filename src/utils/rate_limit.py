@@ -0,0 +1,402 @@
+"""
+Provider Rate Limits
+====================
+Per-provider request and token pacing shared by every LM built through ModelFactory.
+
+Limits live in a process-wide registry keyed by (provider, model, API
+key), so the evaluation runner, optimizers and UI all draw from the same
+budget no matter how many LM objects or threads they use. A request is
+paced by the most specific limit that matches it. Limits come from
+set_rate_limit() (e.g. the --rpm/--tpm flags) and AURA_RATE_LIMITS.
+
+Each limit is a pair of token buckets, requests per minute and LM tokens
+per minute, refilled at a little under the provider's limit
+(Config.RATE_LIMIT_HEADROOM) so throughput stays just below it. Token
+use is reserved from an estimate before the call and settled against the
+reported usage afterwards. A 429 pauses every caller sharing the budget
+instead of letting them all run into it.
+
+Priorities: interactive requests (the UI, the server) go first. While one
+waits for budget, batch requests (optimizers, evaluation, batch research)
+stand back until it has gone out.
+
+With Config.RATE_LIMIT_SHARED, bucket state lives in a small lock-protected
+file under Config.RATE_LIMIT_STATE_DIR, so separate processes on the same
+machine (UI, optimizer, server) share one budget per key.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import dspy
+
+from config import Config
+from ..retrieval.context_store import estimate_tokens
+from .tracing import record_usage, span
+from .transport import acall_with_retries, call_with_retries, classify_error, get_breaker, is_throttled
+
+try:
+    import fcntl
+except ImportError:  # Windows: budgets are shared between threads only
+    fcntl = None
+
+INTERACTIVE, BATCH = 0, 1
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+
+MAX_POLL = 1.0  # longest sleep between budget checks, so holds and pauses are noticed
+HOLD_SLACK = 0.05  # seconds batch callers keep standing back after an interactive request's turn
+DEFAULT_COMPLETION_TOKENS = 512  # reserved for the answer when max_tokens is unset
+
+
+# --- Bucket state ---
+
+class LocalState:
+    """Bucket state shared by the threads of this process."""
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, fn):
+        with self._lock:
+            return fn(self._state)
+
+
+class FileState:
+    """Bucket state in a JSON file, shared by every process that locks it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def update(self, fn):
+        with self._lock, open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                result = fn(state)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and LM tokens per minute (either may be None).
+
+    Args:
+        requests_per_minute: Request budget
+        burst: Requests that may go out back to back
+        tokens_per_minute: Prompt + completion token budget
+        burst_seconds: Seconds of token budget that may be spent at once
+        headroom: Share of each budget actually used
+        state: LocalState (default) or FileState holding the buckets
+    """
+
+    def __init__(self, requests_per_minute: float = None, burst: int = 1, tokens_per_minute: float = None,
+                 burst_seconds: float = 10.0, headroom: float = 1.0, state=None):
+        self.request_rate = requests_per_minute * headroom / 60.0 if requests_per_minute else None
+        self.token_rate = tokens_per_minute * headroom / 60.0 if tokens_per_minute else None
+        self.burst = burst
+        self.token_capacity = self.token_rate * burst_seconds if self.token_rate else None
+        self.state = state or LocalState()
+
+    # All times are wall-clock, so buckets stay valid across processes
+    def _refill(self, state, now):
+        elapsed = max(0.0, now - state.get("updated", now))
+        state["updated"] = now
+        if self.request_rate:
+            state["requests"] = min(self.burst, state.get("requests", self.burst) + elapsed * self.request_rate)
+        if self.token_rate:
+            state["tokens"] = min(self.token_capacity,
+                                  state.get("tokens", self.token_capacity) + elapsed * self.token_rate)
+
+    def _take(self, state, now, tokens, priority):
+        """Take budget for one request (returns 0.0) or return the seconds to wait."""
+        self._refill(state, now)
+        wait = state.get("paused_until", 0.0) - now
+        if priority > INTERACTIVE:
+            wait = max(wait, state.get("held_until", 0.0) - now)
+        if self.request_rate:
+            wait = max(wait, (1.0 - state["requests"]) / self.request_rate)
+        if self.token_rate:
+            # A request larger than the whole bucket only waits for a full one
+            wait = max(wait, (min(tokens, self.token_capacity) - state["tokens"]) / self.token_rate)
+        if wait <= 0:
+            if self.request_rate:
+                state["requests"] -= 1.0
+            if self.token_rate:
+                state["tokens"] -= tokens
+            return 0.0
+        if priority == INTERACTIVE:
+            state["held_until"] = max(state.get("held_until", 0.0), now + wait + HOLD_SLACK)
+        return wait
+
+    def acquire(self, tokens: int = 0, priority: int = None) -> float:
+        """Block until the request may be sent; returns the seconds waited."""
+        priority = current_priority() if priority is None else priority
+        start = time.perf_counter()
+        while True:
+            wait = self.state.update(lambda s: self._take(s, time.time(), tokens, priority))
+            if wait <= 0:
+                return time.perf_counter() - start
+            time.sleep(min(wait, MAX_POLL))
+
+    async def aacquire(self, tokens: int = 0, priority: int = None) -> float:
+        priority = current_priority() if priority is None else priority
+        start = time.perf_counter()
+        while True:
+            wait = self.state.update(lambda s: self._take(s, time.time(), tokens, priority))
+            if wait <= 0:
+                return time.perf_counter() - start
+            await asyncio.sleep(min(wait, MAX_POLL))
+
+    def settle(self, reserved: int, used: int):
+        """Correct a token reservation with the tokens the request actually used."""
+        if self.token_rate and used is not None:
+            def correct(state):
+                self._refill(state, time.time())
+                state["tokens"] = min(self.token_capacity, state["tokens"] + reserved - used)
+            self.state.update(correct)
+
+    def pause(self, seconds: float):
+        """Hold every caller sharing this budget (after a 429)."""
+        def hold(state):
+            state["paused_until"] = max(state.get("paused_until", 0.0), time.time() + seconds)
+        self.state.update(hold)
+
+
+# --- Priorities ---
+
+_priority = contextvars.ContextVar("aura_request_priority", default=None)
+_default_priority = INTERACTIVE
+
+
+def set_default_priority(priority: str):
+    """Priority of this process's requests outside request_priority() ('interactive' or 'batch')."""
+    global _default_priority
+    _default_priority = PRIORITIES[priority]
+
+
+@contextmanager
+def request_priority(priority: str):
+    """Run the enclosed LM calls (and threads started with copied contexts) at `priority`."""
+    token = _priority.set(PRIORITIES[priority])
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    priority = _priority.get()
+    return _default_priority if priority is None else priority
+
+
+# --- Registry ---
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_config_loaded = False
+
+
+def _scope(provider: str, model: str = None, api_key: str = None) -> tuple:
+    # 'openai/gpt-4o-mini' and 'gpt-4o-mini' name the same model; keys are only kept hashed
+    model = model.split("/")[-1] if model else None
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+    return provider.lower(), model, key
+
+
+def _state_for(scope):
+    if not Config.RATE_LIMIT_SHARED or fcntl is None:
+        return LocalState()
+    name = hashlib.sha256(json.dumps(scope).encode("utf-8")).hexdigest()[:16]
+    return FileState(os.path.join(Config.RATE_LIMIT_STATE_DIR, f"{name}.json"))
+
+
+def set_rate_limit(provider: str, requests_per_minute: float = None, burst: int = 1,
+                   tokens_per_minute: float = None, model: str = None, api_key: str = None):
+    """
+    Set (or with no budgets, clear) the limit for a provider, optionally
+    narrowed to one model and/or API key.
+    """
+    scope = _scope(provider, model, api_key)
+    with _limiters_lock:
+        if requests_per_minute or tokens_per_minute:
+            _limiters[scope] = RateLimiter(requests_per_minute, burst, tokens_per_minute,
+                                           headroom=Config.RATE_LIMIT_HEADROOM, state=_state_for(scope))
+        else:
+            _limiters.pop(scope, None)
+
+
+def lm_provider(lm) -> str:
+    """Provider an LM's requests are limited under: the wrapper's provider, else its 'provider/model' prefix."""
+    provider = getattr(lm, "provider", None)
+    if isinstance(provider, str) and provider:  # dspy.LM.provider is a Provider object
+        return provider
+    model = getattr(lm, "model", "") or ""
+    return model.split("/")[0] if "/" in model else "openai"
+
+
+def parse_rate_limits(spec: str) -> list:
+    """
+    'openai=500/200000,deepseek:deepseek-chat=60' ->
+    [(provider, model, requests_per_minute, tokens_per_minute)]; empty budgets are None.
+    """
+    limits = []
+    for entry in filter(None, (e.strip() for e in (spec or "").split(","))):
+        target, _, budgets = entry.partition("=")
+        provider, _, model = target.partition(":")
+        rpm, _, tpm = budgets.partition("/")
+        limits.append((provider.strip(), model.strip() or None, float(rpm) if rpm else None, float(tpm) if tpm else None))
+    return limits
+
+
+def _load_config_limits():
+    global _config_loaded
+    if _config_loaded:
+        return
+    _config_loaded = True
+    for provider, model, rpm, tpm in parse_rate_limits(Config.RATE_LIMITS):
+        set_rate_limit(provider, rpm, tokens_per_minute=tpm, model=model)
+
+
+def get_rate_limiter(provider: str, model: str = None, api_key: str = None):
+    """Return the most specific RateLimiter matching the request, or None when it is unlimited."""
+    _load_config_limits()
+    provider, model, key = _scope(provider, model, api_key)
+    for scope in ((provider, model, key), (provider, None, key), (provider, model, None), (provider, None, None)):
+        limiter = _limiters.get(scope)
+        if limiter is not None:
+            return limiter
+    return None
+
+
+def _used_tokens(response):
+    usage = getattr(response, "usage", None) or {}
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    total = get("total_tokens")
+    if total is None and get("prompt_tokens") is not None:
+        total = get("prompt_tokens") + (get("completion_tokens") or 0)
+    return total
+
+
+class RateLimitedLM(dspy.BaseLM):
+    """
+    Wraps a dspy.LM so every request first waits on its limiter, looked up
+    per call by (provider, model, API key), so limits can change at runtime.
+    Transient provider errors (429, 5xx, timeouts) are retried with jittered
+    backoff, and the provider's circuit breaker fails requests fast while
+    the provider is down (see src/utils/transport.py).
+    """
+
+    def __init__(self, lm, provider: str):
+        super().__init__(
+            model=lm.model,
+            model_type=lm.model_type,
+            cache=False,
+            num_retries=getattr(lm, "num_retries", 3),
+            **dict(lm.kwargs)
+        )
+        self.lm = lm
+        self.provider = provider
+
+    @property
+    def supports_function_calling(self) -> bool:
+        return self.lm.supports_function_calling
+
+    @property
+    def supports_reasoning(self) -> bool:
+        return self.lm.supports_reasoning
+
+    @property
+    def supports_response_schema(self) -> bool:
+        return self.lm.supports_response_schema
+
+    @property
+    def supported_params(self) -> set:
+        return self.lm.supported_params
+
+    def _breaker(self):
+        return get_breaker(f"lm:{self.provider}")
+
+    def _limiter(self):
+        return get_rate_limiter(self.provider, self.model, self.kwargs.get("api_key"))
+
+    def _reserve(self, limiter, prompt, messages, params) -> int:
+        """Token estimate for a request: its prompt plus the largest answer it may get."""
+        if limiter is None or not limiter.token_rate:
+            return 0
+        text = prompt or " ".join(str(m.get("content", "")) for m in messages or [])
+        return estimate_tokens(text) + (params.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+    def _settle(self, limiter, reserved, response=None, error=None):
+        if limiter is None:
+            return
+        if error is not None and is_throttled(error):
+            # Everyone sharing the budget backs off, not just this caller
+            limiter.pause(classify_error(error)[1] or Config.RATE_LIMIT_PAUSE)
+        if reserved:
+            limiter.settle(reserved, _used_tokens(response) if response is not None else 0)
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        with span("lm.request", model=self.model, provider=self.provider) as s:
+            params = {**self.kwargs, **kwargs}
+            waited = []
+
+            def attempt():
+                # Every attempt, retries included, waits its turn under the limit
+                limiter = self._limiter()
+                reserved = self._reserve(limiter, prompt, messages, params)
+                if limiter is not None:
+                    waited.append(limiter.acquire(reserved))
+                    s.set(rate_limit_wait_ms=1000 * sum(waited))
+                try:
+                    response = self.lm.forward(prompt=prompt, messages=messages, **params)
+                except Exception as e:
+                    self._settle(limiter, reserved, error=e)
+                    raise
+                self._settle(limiter, reserved, response)
+                return response
+
+            response = call_with_retries(attempt, breaker=self._breaker())
+            record_usage(response)
+            return response
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        with span("lm.request", model=self.model, provider=self.provider) as s:
+            params = {**self.kwargs, **kwargs}
+            waited = []
+
+            async def attempt():
+                limiter = self._limiter()
+                reserved = self._reserve(limiter, prompt, messages, params)
+                if limiter is not None:
+                    waited.append(await limiter.aacquire(reserved))
+                    s.set(rate_limit_wait_ms=1000 * sum(waited))
+                try:
+                    response = await self.lm.aforward(prompt=prompt, messages=messages, **params)
+                except Exception as e:
+                    self._settle(limiter, reserved, error=e)
+                    raise
+                self._settle(limiter, reserved, response)
+                return response
+
+            response = await acall_with_retries(attempt, breaker=self._breaker())
+            record_usage(response)
+            return response
@@ -0,0 +1,305 @@
+"""
+Model Routing
+=============
+Per-signature model routing with escalation on failed validation.
+
+Easy steps (query rewriting) run well on a small local model, while
+synthesis may need a frontier one. A route points every predictor of one
+signature at its own LM, e.g.
+
+    AURA_MODEL_ROUTES="GenerateSearchQuery=ollama:phi,HopQueryGenerator=ollama:phi"
+
+Predictors without a route keep using the pipeline's LM (dspy.settings.lm).
+Routed predictors call the cheap model first; when every answer it gives
+fails to parse or validate (an empty query, an insight that is too short),
+or the call itself fails, the request is escalated to the pipeline's LM.
+
+Predictors are matched by their input/output field names rather than
+their instructions, so compiled programs (rewritten instructions, CoT
+reasoning fields) are routed too, as is the LM reranker's relevance judge
+(ScorePassageRelevance). Every routed call opens a "route" span,
+and routing_stats() reports escalation rates and estimated savings per
+signature.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+import dspy
+
+from config import Config
+from ..retrieval.bm25 import tokenize
+from ..signatures.search import GenerateSearchQuery, HopQueriesGenerator, HopQueryGenerator, ScorePassageRelevance
+from ..signatures.synthesis import FinalResearcher, ResearchSynthesizer
+from .tracing import span
+
+ROUTABLE_SIGNATURES = {
+    cls.__name__: cls
+    for cls in (GenerateSearchQuery, HopQueryGenerator, HopQueriesGenerator, ScorePassageRelevance,
+                ResearchSynthesizer, FinalResearcher)
+}
+
+# Output fields added by modules (ChainOfThought) rather than the signature itself
+_MODULE_FIELDS = {"reasoning", "rationale"}
+
+
+def _fields(signature) -> tuple:
+    outputs = frozenset(signature.output_fields) - _MODULE_FIELDS
+    return frozenset(signature.input_fields), outputs
+
+
+_BY_FIELDS = {_fields(cls): name for name, cls in ROUTABLE_SIGNATURES.items()}
+
+
+def signature_name(signature):
+    """Name of the routable signature a predictor's signature was built from, or None."""
+    return _BY_FIELDS.get(_fields(signature))
+
+
+# --- Validation ---
+
+def _has_terms(text, minimum: int = 1) -> bool:
+    return len(tokenize(str(text or ""))) >= minimum
+
+
+def _valid_query(outputs) -> bool:
+    return _has_terms(outputs.get("search_query"))
+
+
+def _valid_queries(outputs) -> bool:
+    return any(_has_terms(q) for q in outputs.get("search_queries") or [])
+
+
+def _valid_scores(outputs) -> bool:
+    return bool(outputs.get("scores"))
+
+
+def _valid_long_text(field):
+    def validate(outputs) -> bool:
+        return _has_terms(outputs.get(field), Config.ROUTE_MIN_ANSWER_TERMS)
+    return validate
+
+
+VALIDATORS = {
+    "GenerateSearchQuery": _valid_query,
+    "HopQueryGenerator": _valid_query,
+    "HopQueriesGenerator": _valid_queries,
+    "ScorePassageRelevance": _valid_scores,
+    "ResearchSynthesizer": _valid_long_text("structured_insight"),
+    "FinalResearcher": _valid_long_text("answer"),
+}
+
+
+def parse_routes(spec: str) -> dict:
+    """'GenerateSearchQuery=ollama:phi,ResearchSynthesizer=openai:gpt-4o' -> {signature: (provider, model)}."""
+    routes = {}
+    for entry in filter(None, (e.strip() for e in (spec or "").split(","))):
+        name, _, target = entry.partition("=")
+        provider, _, model = target.partition(":")
+        name = name.strip()
+        if name not in ROUTABLE_SIGNATURES:
+            raise ValueError(f"Unknown signature in route '{entry}'. Use one of {', '.join(ROUTABLE_SIGNATURES)}.")
+        routes[name] = (provider.strip(), model.strip() or None)
+    return routes
+
+
+# --- Stats ---
+
+def _usage(response) -> tuple:
+    usage = getattr(response, "usage", None) or {}
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    return get("prompt_tokens") or 0, get("completion_tokens") or 0
+
+
+def _cost(price, model, usage) -> float:
+    if price is None:
+        return 0.0
+    prompt_price, completion_price = price(model)
+    return (usage[0] * prompt_price + usage[1] * completion_price) / 1e6
+
+
+class RoutingStats:
+    """Thread-safe per-signature count of routed calls, escalations and estimated savings."""
+
+    def __init__(self):
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "escalated": 0, "errors": 0, "routed_tokens": 0,
+            "escalation_overhead_ms": 0.0, "saved_usd": 0.0,
+        })
+        self._lock = threading.Lock()
+
+    def record(self, signature: str, tokens: int, saved_usd: float, escalated: bool = False,
+               error: bool = False, overhead_ms: float = 0.0):
+        with self._lock:
+            stats = self._stats[signature]
+            stats["calls"] += 1
+            stats["escalated"] += escalated
+            stats["errors"] += error
+            stats["routed_tokens"] += tokens
+            stats["escalation_overhead_ms"] += overhead_ms
+            stats["saved_usd"] += saved_usd
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {**stats, "escalation_rate": stats["escalated"] / stats["calls"]}
+                for name, stats in self._stats.items()
+            }
+
+
+_routing_stats = RoutingStats()
+
+
+def routing_stats() -> dict:
+    """Per routed signature: calls, escalations (rate, time spent on rejected answers) and USD saved."""
+    return _routing_stats.snapshot()
+
+
+def reset_routing_stats():
+    _routing_stats.reset()
+
+
+# --- Routed LM ---
+
+class RoutedLM(dspy.BaseLM):
+    """
+    Serves one predictor from a cheaper LM, escalating to the pipeline's LM
+    (dspy.settings.lm at call time) when the cheap answer fails to parse or
+    validate, or the call fails.
+
+    Args:
+        lm: The cheap LM (built through ModelFactory)
+        name: Routed signature name (see ROUTABLE_SIGNATURES)
+        signature: The predictor's signature, used to parse answers
+        escalate: Retry failed answers on the pipeline's LM
+        price: model name -> (USD per 1M prompt tokens, per 1M completion tokens)
+    """
+
+    def __init__(self, lm, name: str, signature, escalate: bool = True, price=None):
+        super().__init__(
+            model=lm.model,
+            model_type=lm.model_type,
+            cache=False,
+            num_retries=getattr(lm, "num_retries", 3),
+            **dict(lm.kwargs)
+        )
+        self.lm = lm
+        self.name = name
+        self.signature = signature
+        self.escalate = escalate
+        self.price = price
+        self.validate = VALIDATORS.get(name, lambda outputs: True)
+
+    @property
+    def supports_function_calling(self) -> bool:
+        return self.lm.supports_function_calling
+
+    @property
+    def supports_reasoning(self) -> bool:
+        return self.lm.supports_reasoning
+
+    @property
+    def supports_response_schema(self) -> bool:
+        return self.lm.supports_response_schema
+
+    @property
+    def supported_params(self) -> set:
+        return self.lm.supported_params
+
+    def _fallback(self):
+        """The pipeline's LM, unless it is this route's model."""
+        lm = dspy.settings.lm
+        if not self.escalate or lm is None or lm is self or lm.model == self.model:
+            return None
+        return lm
+
+    def accepts(self, response) -> bool:
+        """True when at least one choice parses and passes the signature's validator."""
+        adapter = dspy.settings.adapter or dspy.ChatAdapter()
+        for choice in getattr(response, "choices", None) or []:
+            try:
+                outputs = adapter.parse(self.signature, choice.message.content or "")
+            except Exception:
+                continue
+            if self.validate(outputs):
+                return True
+        return False
+
+    def _record(self, response, fallback, escalated, error=None, started=None):
+        usage = _usage(response) if response is not None else (0, 0)
+        cost = _cost(self.price, self.model, usage)
+        if escalated:
+            saved = -cost  # the rejected answer was paid for on top
+        elif fallback is not None:
+            saved = _cost(self.price, fallback.model, usage) - cost
+        else:
+            saved = 0.0
+        overhead_ms = 1000 * (time.perf_counter() - started) if escalated else 0.0
+        _routing_stats.record(self.name, sum(usage), saved, escalated=escalated, error=error is not None,
+                              overhead_ms=overhead_ms)
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        with span("route", signature=self.name, model=self.model) as s:
+            fallback = self._fallback()
+            started = time.perf_counter()
+            response = error = None
+            try:
+                response = self.lm.forward(prompt=prompt, messages=messages, **kwargs)
+            except Exception as e:
+                if fallback is None:
+                    raise
+                error = e
+            escalated = fallback is not None and (error is not None or not self.accepts(response))
+            self._record(response, fallback, escalated, error, started)
+            if not escalated:
+                return response
+            s.set(escalated=True, escalated_to=fallback.model, reason="error" if error else "validation")
+            return fallback.forward(prompt=prompt, messages=messages, **kwargs)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        with span("route", signature=self.name, model=self.model) as s:
+            fallback = self._fallback()
+            started = time.perf_counter()
+            response = error = None
+            try:
+                response = await self.lm.aforward(prompt=prompt, messages=messages, **kwargs)
+            except Exception as e:
+                if fallback is None:
+                    raise
+                error = e
+            escalated = fallback is not None and (error is not None or not self.accepts(response))
+            self._record(response, fallback, escalated, error, started)
+            if not escalated:
+                return response
+            s.set(escalated=True, escalated_to=fallback.model, reason="error" if error else "validation")
+            return await fallback.aforward(prompt=prompt, messages=messages, **kwargs)
+
+
+def _predictors(module) -> list:
+    """The module's predictors plus its rerank stage's LM judge, which named_predictors() can't reach."""
+    predictors = [predictor for _, predictor in module.named_predictors()]
+    judge = getattr(getattr(getattr(module, "reranker", None), "scorer", None), "judge", None)
+    if isinstance(judge, dspy.Predict):
+        predictors.append(judge)
+    return predictors
+
+
+def route_module(module, lms: dict, escalate: bool = True, price=None) -> int:
+    """
+    Point every predictor of `module` (and of its reranker's LM scorer)
+    whose signature has an LM in `lms` ({signature name: LM}) at a
+    RoutedLM over it. Apply after loading a compiled program (loading
+    resets predictor LMs). Returns the number of predictors routed.
+    """
+    routed = 0
+    for predictor in _predictors(module):
+        name = signature_name(predictor.signature)
+        if name in lms:
+            predictor.lm = RoutedLM(lms[name], name, predictor.signature, escalate=escalate, price=price)
+            routed += 1
+    return routed
@@ -0,0 +1,94 @@
+"""
+Pipeline Event Streaming
+========================
+Streams a module's intermediate results while it runs.
+
+Modules call emit() at each stage (generated search query, retrieved
+passages); stream_events() runs the module on a worker thread and yields
+those events as they happen, followed by the final insight/answer text
+token by token (via dspy.streamify, when available) and the prediction.
+
+Events are (kind, payload) tuples:
+    ("search_query", {"query": str, "hop": int | None})
+    ("passages", {"passages": list, "hop": int | None})
+    ("packing", {"budget": int, "saved_tokens": int, ...})  (see ContextPacker.pack)
+    ("token", {"field": str, "text": str})
+    ("prediction", dspy.Prediction)
+"""
+
+import contextvars
+import queue
+import threading
+
+import dspy
+
+# Final fields streamed token by token, in order of preference
+STREAM_FIELDS = ("structured_insight", "answer")
+
+_event_sink = contextvars.ContextVar("aura_event_sink", default=None)
+
+
+def emit(kind: str, **payload):
+    """Report a pipeline event to the active stream (a no-op outside stream_events)."""
+    sink = _event_sink.get()
+    if sink is not None:
+        sink((kind, payload))
+
+
+def final_predictor(program, fields=STREAM_FIELDS):
+    """
+    The predictor producing the module's final text: the last one (in
+    module order) with one of `fields` as an output. Returns (name, predictor, field).
+    """
+    for field in fields:
+        matches = [(name, p) for name, p in program.named_predictors() if field in p.signature.output_fields]
+        if matches:
+            return (*matches[-1], field)
+    return None, None, None
+
+
+def _token_stream(program, inputs):
+    """dspy.streamify over the final predictor, or None on DSPy versions without it."""
+    streamify = getattr(dspy, "streamify", None)
+    name, predictor, field = final_predictor(program)
+    if streamify is None or predictor is None:
+        return None
+    from dspy.streaming import StreamListener
+    listener = StreamListener(signature_field_name=field, predict=predictor, predict_name=name)
+    return streamify(program, stream_listeners=[listener], async_streaming=False)(**inputs)
+
+
+def stream_events(program, **inputs):
+    """
+    Run `program(**inputs)` and yield its events as they happen.
+    The last event is always ("prediction", pred); exceptions are re-raised.
+    """
+    events = queue.Queue()
+    done = object()
+
+    def run():
+        _event_sink.set(events.put)
+        try:
+            stream = _token_stream(program, inputs)
+            if stream is None:
+                events.put(("prediction", program(**inputs)))
+                return
+            for chunk in stream:
+                if isinstance(chunk, dspy.Prediction):
+                    events.put(("prediction", chunk))
+                elif getattr(chunk, "chunk", None):
+                    events.put(("token", {"field": chunk.signature_field_name, "text": chunk.chunk}))
+        except Exception as e:
+            events.put(("error", e))
+        finally:
+            events.put(done)
+
+    # The worker inherits the caller's context (dspy.context overrides)
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    while True:
+        event = events.get()
+        if event is done:
+            return
+        if event[0] == "error":
+            raise event[1]
+        yield event
@@ -0,0 +1,283 @@
+"""
+Pipeline Tracing
+================
+Lightweight spans for module steps, LM calls and retrieval.
+
+Code marks a step with `with span("retrieve", query=q) as s:` and adds
+attributes with s.set(...) or annotate(...). Spans nest through a context
+variable, so children opened on worker threads (copied contexts) and
+asyncio tasks attach to the right parent. Token counts of LM spans roll
+up into every enclosing span.
+
+Tracing is off unless the process-wide tracer is enabled (Config.TRACING_ENABLED,
+or enable_tracing()) or a capture() block is active; otherwise span()
+returns a shared no-op object. Finished spans go to:
+    - an optional JSONL file (one span per line)
+    - the tracer's in-process summary (per span name: count, latency, tokens)
+    - the list of any enclosing capture() block, e.g. for a per-request waterfall
+"""
+
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# Attributes summed into the parent span when a span ends
+ROLLUP_ATTRIBUTES = ("prompt_tokens", "completion_tokens")
+
+_current_span = contextvars.ContextVar("aura_current_span", default=None)
+_capture = contextvars.ContextVar("aura_trace_capture", default=None)
+_span_ids = itertools.count(1)
+_rollup_lock = threading.Lock()  # children on several threads can finish at once
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent", "trace_id", "start", "end", "attributes", "_token", "_sinks")
+
+    def __init__(self, name, parent, attributes, sinks):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = attributes
+        self.start = self.end = None
+        self._sinks = sinks
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return 1000 * (end - self.start)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc_type is not None and exc_type.__name__ == "CancelledError":
+            self.attributes["cancelled"] = True
+        elif exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        if self.parent is not None:
+            with _rollup_lock:
+                for key in ROLLUP_ATTRIBUTES:
+                    if key in self.attributes:
+                        self.parent.attributes[key] = self.parent.attributes.get(key, 0) + self.attributes[key]
+        for sink in self._sinks:
+            sink(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off."""
+
+    def set(self, **attributes):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Process-wide span sink: JSONL export plus a per-name summary."""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._lock = threading.Lock()
+        self._file = None
+        # Percentiles come from a window of recent durations; counts and totals cover everything
+        self._stats = defaultdict(lambda: {"count": 0, "errors": 0, "total_ms": 0.0, "durations": deque(maxlen=2048),
+                                           "prompt_tokens": 0, "completion_tokens": 0})
+
+    def enable(self, path: str = None):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            if path:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._file = open(path, "a", encoding="utf-8")
+            self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def record(self, span: Span):
+        with self._lock:
+            stats = self._stats[span.name]
+            stats["count"] += 1
+            stats["errors"] += "error" in span.attributes
+            stats["total_ms"] += span.duration_ms
+            stats["durations"].append(span.duration_ms)
+            # Only provider requests count tokens, so rolled-up totals aren't counted twice
+            if span.name == "lm.request":
+                for key in ROLLUP_ATTRIBUTES:
+                    stats[key] += span.attributes.get(key, 0)
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                self._file.flush()
+
+    def summary(self) -> dict:
+        """Per span name: count, errors, total/mean/p95 latency (ms) and LM tokens."""
+        with self._lock:
+            summary = {}
+            for name, stats in self._stats.items():
+                ordered = sorted(stats["durations"])
+                summary[name] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "total_ms": stats["total_ms"],
+                    "mean_ms": stats["total_ms"] / stats["count"],
+                    "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "completion_tokens": stats["completion_tokens"],
+                }
+            return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+tracer = Tracer()
+
+
+def enable_tracing(path: str = None):
+    """Trace every request in this process, appending spans to `path` (JSONL) if given."""
+    tracer.enable(path)
+
+
+def span(name: str, **attributes):
+    """Open a child of the current span (a shared no-op while tracing is off)."""
+    captured = _capture.get()
+    if not tracer.enabled and captured is None:
+        return _NOOP
+    sinks = []
+    if tracer.enabled:
+        sinks.append(tracer.record)
+    if captured is not None:
+        sinks.append(captured.append)
+    return Span(name, _current_span.get(), attributes, sinks)
+
+
+def traced(name: str):
+    """Decorator running a function (sync or async) inside span(name)."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def annotate(**attributes):
+    """Set attributes on the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def record_usage(response):
+    """Copy an LM response's token usage onto the current span."""
+    current = _current_span.get()
+    if current is None:
+        return
+    usage = getattr(response, "usage", None) or {}
+    for key in ROLLUP_ATTRIBUTES:
+        value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+        if value:
+            with _rollup_lock:
+                current.attributes[key] = current.attributes.get(key, 0) + value
+
+
+class capture:
+    """
+    Collect the spans finished inside this block (in this context and the
+    threads/tasks it starts), whether or not the global tracer is on:
+
+        with capture() as spans:
+            program(...)
+        waterfall(spans)
+    """
+
+    def __init__(self):
+        self.spans = []
+
+    def __enter__(self):
+        self._token = _capture.set(self.spans)
+        return self.spans
+
+    def __exit__(self, exc_type, exc, tb):
+        _capture.reset(self._token)
+        return False
+
+
+def waterfall(spans) -> list:
+    """
+    Spans as waterfall rows in start order, each with its nesting depth and
+    offset from the earliest span: [{"name", "depth", "offset_ms", "duration_ms", "attributes"}].
+    """
+    if not spans:
+        return []
+    by_id = {s.span_id: s for s in spans}
+    origin = min(s.start for s in spans)
+
+    def depth(s):
+        d = 0
+        while s.parent is not None and s.parent.span_id in by_id:
+            s = s.parent
+            d += 1
+        return d
+
+    return [
+        {
+            "name": s.name,
+            "depth": depth(s),
+            "offset_ms": 1000 * (s.start - origin),
+            "duration_ms": s.duration_ms,
+            "attributes": s.attributes,
+        }
+        for s in sorted(spans, key=lambda s: (s.start, s.span_id))
+    ]
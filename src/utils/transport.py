@@ -0,0 +1,329 @@
+"""
+HTTP Transport
+==============
+Shared, fault-tolerant transport for AURA's remote backends.
+
+HTTPTransport keeps one pooled requests.Session (keep-alive connections)
+per host, applies (connect, read) timeouts to every request and retries
+failures worth retrying (429, 5xx, connection errors, timeouts) with
+jittered exponential backoff, honouring Retry-After. A per-host circuit
+breaker opens after consecutive failures (5xx, timeouts, connection
+errors; 429s only slow callers down) and fails fast with
+CircuitOpenError until a cool-down passes, then lets one trial request
+through (half-open) before closing again.
+
+LM providers are reached through their own clients, which own their
+connections; RateLimitedLM runs those calls through call_with_retries
+with a per-provider breaker, so both kinds of backend share one policy.
+Retries stop once the retry budget (seconds, across all attempts) would
+be exceeded, which keeps tail latency bounded when a backend degrades.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from .tracing import annotate
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Exception names (requests, httpx, litellm, DSPy LM errors) that mean "try again"
+_RETRYABLE_NAMES = ("Timeout", "Connection", "Transport", "RateLimit", "ServiceUnavailable",
+                    "ServerError", "InternalServer", "BadGateway")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit open for {name}; retrying in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `reset_timeout` seconds (one trial request);
+    half-open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_started = None
+            if self.state == "half_open":
+                # One trial at a time; a trial that never reported back is replaced after the cool-down
+                if self._trial_started is None or now - self._trial_started >= self.reset_timeout:
+                    self._trial_started = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                print(f"⚠️ Circuit opened for {self.name} after {self.failures} failures.")
+                self.state = "open"
+                self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial_started = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "opened": self.opened, "rejected": self.rejected}
+
+
+class RetryPolicy:
+    """
+    Args:
+        max_retries: Retries after the first attempt
+        backoff_base: First backoff ceiling (seconds), doubled per retry
+        backoff_max: Largest single wait, including Retry-After hints
+        budget: Most seconds spent on one call across all attempts and waits
+    """
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 budget: float = 60.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Wait before retry number `attempt + 1`: full jitter, or the server's Retry-After."""
+        if retry_after is not None:
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @classmethod
+    def from_config(cls, budget: float = None):
+        return cls(Config.HTTP_MAX_RETRIES, Config.HTTP_BACKOFF_BASE, Config.HTTP_BACKOFF_MAX,
+                   budget if budget is not None else Config.HTTP_RETRY_BUDGET)
+
+
+def _retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None  # HTTP-date form: fall back to backoff
+
+
+def _status(error: Exception):
+    """HTTP status carried by an exception (DSPy/litellm/httpx errors or a requests response), if any."""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def classify_error(error: Exception):
+    """(retryable, retry_after seconds or None) for an exception from any backend client."""
+    response = getattr(error, "response", None)
+    status = _status(error)
+    retry_after = _retry_after(getattr(error, "retry_after", None))
+    if retry_after is None and response is not None:
+        retry_after = _retry_after(getattr(response, "headers", {}).get("Retry-After"))
+    if isinstance(status, int):
+        return status in RETRY_STATUSES, retry_after
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True, retry_after
+    return any(name in type(error).__name__ for name in _RETRYABLE_NAMES), retry_after
+
+
+def _next_delay(error, attempt, policy, start):
+    """Seconds to wait before retrying, or None to give up."""
+    retryable, retry_after = classify_error(error)
+    if not retryable or attempt >= policy.max_retries:
+        return None
+    delay = policy.delay(attempt, retry_after)
+    if time.monotonic() - start + delay > policy.budget:
+        return None
+    annotate(retries=attempt + 1)
+    return delay
+
+
+def is_throttled(error) -> bool:
+    """True for rate-limit errors (429)."""
+    return _status(error) == 429 or "RateLimit" in type(error).__name__
+
+
+def _report(breaker, error=None):
+    if breaker is None:
+        return
+    # Only backend trouble counts against the breaker; a 4xx means it answered. A 429 is
+    # a pacing signal the rate limiter handles (it pauses), not a sign the backend is down.
+    if error is not None and classify_error(error)[0] and not is_throttled(error):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def call_with_retries(fn, breaker: CircuitBreaker = None, policy: RetryPolicy = None):
+    """Call fn() under the retry policy and breaker; re-raises the last error."""
+    policy = policy or RetryPolicy.from_config()
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+        try:
+            result = fn()
+        except Exception as e:
+            _report(breaker, e)
+            delay = _next_delay(e, attempt, policy, start)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        _report(breaker)
+        return result
+
+
+async def acall_with_retries(fn, breaker: CircuitBreaker = None, policy: RetryPolicy = None):
+    """Async call_with_retries: `fn` returns an awaitable."""
+    policy = policy or RetryPolicy.from_config()
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+        try:
+            result = await fn()
+        except Exception as e:
+            _report(breaker, e)
+            delay = _next_delay(e, attempt, policy, start)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        _report(breaker)
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a host or provider, creating it on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT)
+        return _breakers[name]
+
+
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+class HTTPTransport:
+    """
+    Args:
+        timeout: (connect, read) seconds per attempt
+        pool_size: Keep-alive connections kept per host
+        policy: Retry policy (defaults to Config)
+    """
+
+    def __init__(self, timeout=None, pool_size: int = None, policy: RetryPolicy = None):
+        self.timeout = timeout or (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+        self.pool_size = pool_size or Config.HTTP_POOL_SIZE
+        self.policy = policy or RetryPolicy.from_config()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session(self, url: str) -> requests.Session:
+        host = self.host(url)
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        return get_breaker(self.host(url))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request with retries. Retryable statuses that persist raise
+        requests.HTTPError; other responses are returned as they are.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session(url)
+
+        def send():
+            response = session.request(method, url, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                response.raise_for_status()
+            return response
+
+        return call_with_retries(send, breaker=self.breaker(url), policy=self.policy)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Return the process-wide HTTPTransport, creating it on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport()
+        return _transport
@@ -0,0 +1,5 @@
+import sys
+import os
+
+# Robust Path Fix: Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,58 @@
+"""
+BM25 Index Tests
+================
+The compiled (memory-mapped) index ranks exactly like the in-memory one.
+"""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from src.retrieval.bm25 import BM25Index
+from src.retrieval.mmap_index import build_index, open_index
+
+TOPICS = {
+    "dspy": "dspy signatures modules optimizers compile prompts demos teleprompter",
+    "rag": "retrieval augmented generation passages grounding hallucination context",
+    "agents": "agents tools react reasoning actions observations planning loop",
+    "ml": "machine learning supervised gradient training loss features labels",
+}
+
+
+def make_corpus(n=400, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        topic = rng.choice(sorted(TOPICS))
+        words = TOPICS[topic].split()
+        corpus.append({"title": f"{topic} note {i}", "text": " ".join(rng.choices(words, k=rng.randint(5, 30)))})
+    return corpus
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in make_corpus()), encoding="utf-8")
+    return str(path)
+
+
+QUERIES = ["dspy optimizers compile", "grounding passages", "react agents tools", "gradient loss", "unknown words"]
+
+
+def test_compiled_index_ranks_like_the_in_memory_one(corpus_file, tmp_path):
+    in_memory = BM25Index.from_jsonl(corpus_file)
+    build_index(corpus_file, str(tmp_path / "index"))
+    mapped = open_index(str(tmp_path / "index"))
+
+    for query in QUERIES:
+        expected, got = in_memory.search(query, 10), mapped.search(query, 10)
+        assert [d for d, _ in got] == [d for d, _ in expected]
+        assert np.allclose([s for _, s in got], [s for _, s in expected])
+    assert mapped.passages[7] == in_memory.passages[7]
+
+
+def test_search_batch_matches_search(corpus_file):
+    index = BM25Index.from_jsonl(corpus_file)
+    assert index.search_batch(QUERIES, 5) == [index.search(q, 5) for q in QUERIES]
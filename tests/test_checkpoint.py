@@ -0,0 +1,93 @@
+"""
+Checkpoint Tests
+================
+Candidates survive a restart, and a resumed compile only runs the seeds
+that were not checkpointed.
+"""
+
+import dspy
+
+from pipelines.optimize_bootstrap import compile_resumable
+from src.utils.checkpoint import CheckpointedEvaluate, OptimizerCheckpoint
+
+
+class QA(dspy.Module):
+    def __init__(self):
+        super().__init__()
+        self.predict = dspy.Predict("question -> answer")
+
+
+def with_demo(program, answer):
+    program = program.deepcopy()
+    program.predict.demos = [dspy.Example(question="q", answer=answer)]
+    return program
+
+
+def test_records_are_reloaded_and_torn_lines_skipped(tmp_path):
+    checkpoint = OptimizerCheckpoint(str(tmp_path))
+    program = with_demo(QA(), "a")
+    key = checkpoint.key(program, [])
+    checkpoint.record(key, program, 0.5, [0.0, 1.0], label="seed=0")
+    with open(checkpoint._candidates_path, "a", encoding="utf-8") as f:
+        f.write('{"key": "cut sho')  # the process died mid-write
+
+    resumed = OptimizerCheckpoint(str(tmp_path))
+    assert len(resumed) == 1
+    record = resumed.find("seed=0")
+    assert record["subscores"] == [0.0, 1.0]
+    restored = resumed.load_program(record, QA())
+    assert restored.predict.demos[0]["answer"] == "a"
+    assert resumed.key(restored, []) == key
+
+
+class FakeEvaluate:
+    def __init__(self):
+        self.devset = [dspy.Example(question="q", answer="a").with_inputs("question")]
+        self.calls = 0
+
+    def __call__(self, program, devset=None, **kwargs):
+        self.calls += 1
+        results = [(ex, dspy.Prediction(), 1.0) for ex in devset]
+        return dspy.Prediction(score=100.0, results=results)
+
+
+def test_checkpointed_evaluate_reuses_scores(tmp_path):
+    evaluate = FakeEvaluate()
+    program = with_demo(QA(), "a")
+
+    CheckpointedEvaluate(evaluate, OptimizerCheckpoint(str(tmp_path)))(program)
+    checkpoint = OptimizerCheckpoint(str(tmp_path))
+    result = CheckpointedEvaluate(evaluate, checkpoint)(program)
+
+    assert evaluate.calls == 1
+    assert checkpoint.reused == 1
+    assert result.score == 100.0
+
+
+class FakeTeleprompter:
+    """Compiles seed N into a program whose score is N."""
+
+    num_candidate_sets = 3
+    compiled = []
+
+    def compile(self, student, trainset, valset, restrict):
+        seed = restrict[0]
+        self.compiled.append(seed)
+        program = with_demo(student, str(seed))
+        program.candidate_programs = [{"score": float(seed), "subscores": [float(seed)]}]
+        return program
+
+
+def test_resumed_compile_skips_checkpointed_seeds(tmp_path):
+    student = QA()
+    checkpoint = OptimizerCheckpoint(str(tmp_path))
+    for seed in (-3, -2, 2):
+        program = with_demo(student, str(seed))
+        checkpoint.record(checkpoint.key(program, []), program, float(seed), [], label=f"seed={seed}")
+    FakeTeleprompter.compiled = []
+
+    best = compile_resumable(FakeTeleprompter, student, [], [], OptimizerCheckpoint(str(tmp_path)), workers=2)
+
+    assert sorted(FakeTeleprompter.compiled) == [-1, 0, 1]
+    assert best.predict.demos[0]["answer"] == "2"  # restored from the checkpoint
+    assert [c["seed"] for c in best.candidate_programs] == [2, 1, 0, -1, -2, -3]
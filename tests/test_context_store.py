@@ -0,0 +1,58 @@
+"""
+Context Store Tests
+===================
+Deduplication, the token budget and incremental text assembly.
+"""
+
+import random
+
+from src.retrieval.context_store import ContextStore, estimate_tokens
+
+PASSAGE = ("ReAct agents interleave reasoning traces with tool calls, observing each result "
+           "before deciding on the next action in the loop.")
+
+
+def test_exact_duplicates_are_dropped_ignoring_case_and_spacing():
+    store = ContextStore()
+    assert store.add(PASSAGE)
+    assert not store.add("  " + PASSAGE.upper())
+    assert len(store) == 1
+    assert store.duplicates == 1
+
+
+def test_near_duplicates_are_dropped():
+    store = ContextStore()
+    store.add(PASSAGE)
+    assert not store.add(PASSAGE.replace("loop.", "loop!") + " Indeed.")
+    assert store.add("DSPy compiles declarative language model calls into optimized prompts and few-shot demos.")
+    assert store.near_duplicates == 1
+    assert len(store) == 2
+
+
+def test_budget_evicts_the_lowest_scored_passages():
+    passages = [f"passage {i} " + "word " * 40 for i in range(5)]
+    store = ContextStore(token_budget=estimate_tokens(passages[0]) * 3, near_duplicate_threshold=None)
+    store.extend(passages)  # scores 1, 1/2, ... 1/5
+
+    assert store.passages == passages[:3]
+    assert store.evicted == 2
+    assert store.total_tokens <= store.token_budget
+
+
+def test_text_matches_a_full_join_through_adds_and_evictions():
+    rng = random.Random(0)
+    store = ContextStore(token_budget=300, near_duplicate_threshold=None)
+    for i in range(200):
+        store.add(f"passage {i} " + "word " * rng.randint(1, 40), score=rng.random())
+        if rng.random() < 0.3:
+            assert store.text() == "\n".join(store.passages)
+    assert store.text() == "\n".join(store.passages)
+
+
+def test_text_is_reused_until_the_store_changes():
+    store = ContextStore()
+    store.add(PASSAGE)
+    first = store.text()
+    assert store.text() is first
+    store.add("DSPy compiles declarative language model calls into optimized prompts.")
+    assert store.text() == first + "\n" + "DSPy compiles declarative language model calls into optimized prompts."
@@ -0,0 +1,73 @@
+"""
+Dense Index Tests
+=================
+IVF search recalls the exhaustive results, and dense vectors from an
+earlier build of the index directory are refused.
+"""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from src.retrieval.dense import DenseIndex, build_dense_index, open_dense_index
+from src.retrieval.mmap_index import build_index
+
+TOPICS = {
+    "dspy": "dspy signatures modules optimizers compile prompts demos teleprompter",
+    "rag": "retrieval augmented generation passages grounding hallucination context",
+    "agents": "agents tools react reasoning actions observations planning loop",
+    "ml": "machine learning supervised gradient training loss features labels",
+}
+
+
+def make_corpus(n=400, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        topic = rng.choice(sorted(TOPICS))
+        words = TOPICS[topic].split()
+        corpus.append({"title": f"{topic} note {i}", "text": " ".join(rng.choices(words, k=rng.randint(5, 30)))})
+    return corpus
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in make_corpus()), encoding="utf-8")
+    return str(path)
+
+
+QUERIES = ["dspy optimizers compile", "grounding passages", "react agents tools", "gradient loss", "unknown words"]
+
+
+def test_ivf_recall_against_exhaustive_search():
+    corpus = make_corpus(n=2000, seed=1)
+    exhaustive = DenseIndex.build(corpus)
+    ivf = DenseIndex.build(corpus, nlist=16)
+
+    queries = [f"{topic} {words}" for topic, words in TOPICS.items()] + QUERIES
+    hits = total = 0
+    for exact, approx in zip(exhaustive.search_batch(queries, 10), ivf.search_batch(queries, 10, nprobe=8)):
+        hits += len({d for d, _ in exact} & {d for d, _ in approx})
+        total += len(exact)
+    assert hits / total >= 0.9
+
+
+def test_scan_shape_is_queries_by_rows():
+    index = DenseIndex.build(make_corpus(n=50))
+    queries = np.ones((3, index.embeddings.shape[1]), dtype=np.float32)
+    assert index._scan(queries).shape == (3, 50)
+    assert index._scan(queries, np.array([1, 4, 9])).shape == (3, 3)
+
+
+def test_dense_vectors_from_an_earlier_build_are_refused(corpus_file, tmp_path):
+    index_dir = str(tmp_path / "index")
+    build_index(corpus_file, index_dir)
+    build_dense_index(index_dir)
+    assert len(open_dense_index(index_dir).search("react agents", 3)) == 3
+
+    build_index(corpus_file, index_dir)  # rebuilt without --dense
+    with pytest.raises(ValueError, match="earlier build"):
+        open_dense_index(index_dir)
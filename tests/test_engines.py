@@ -0,0 +1,51 @@
+"""
+Engine Registry Tests
+=====================
+Engines are built once per key, and failed builds leave nothing behind.
+"""
+
+import threading
+
+import pytest
+
+from src.utils import engines
+from src.utils.engines import EngineRegistry
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    built = []
+
+    def get_model(provider, model=None, api_key=None):
+        built.append((provider, model))
+        if model == "broken":
+            raise RuntimeError("no such model")
+        return object()
+
+    monkeypatch.setattr(engines.ModelFactory, "get_model", staticmethod(get_model))
+    return built
+
+
+def test_concurrent_requests_build_one_engine(fake_models):
+    registry = EngineRegistry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("ollama", "phi"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(engine) for engine in results}) == 1
+    assert registry.builds == 1
+    assert fake_models == [("ollama", "phi")]
+
+
+def test_failed_build_is_not_cached_and_releases_its_lock(fake_models):
+    registry = EngineRegistry()
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            registry.get("ollama", "broken")
+
+    assert len(registry) == 0
+    assert registry._building == {}
+    assert fake_models == [("ollama", "broken")] * 2
@@ -0,0 +1,79 @@
+"""
+LM Cache Tests
+==============
+LMCache hits, size-bounded LRU eviction and the CachedLM wrapper.
+"""
+
+import asyncio
+import pickle
+
+import dspy
+import pytest
+
+from src.utils import lm_cache
+from src.utils.lm_cache import CachedLM, LMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LMCache(str(tmp_path / "lm.sqlite"), max_bytes=20000)
+
+
+def test_put_then_get(cache):
+    cache.put("key", {"answer": 42})
+    assert cache.get("key") == {"answer": 42}
+    assert cache.get("missing") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_eviction_keeps_the_cache_within_its_budget(cache):
+    for i in range(200):
+        cache.put(f"k{i}", "x" * 1000)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.max_bytes
+    assert cache._size == stats["bytes"]  # the running total matches the table
+    assert cache.get("k0") is None
+    assert cache.get("k199") is not None
+
+
+def test_eviction_drops_least_recently_used_first(cache, monkeypatch):
+    monkeypatch.setattr(lm_cache, "ACCESS_RESOLUTION", 0.0)  # every hit refreshes its entry
+    for i in range(10):
+        cache.put(f"k{i}", "x" * 1000)
+    cache.get("k0")
+    for i in range(10, 25):
+        cache.put(f"k{i}", "x" * 1000)
+
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None
+
+
+def test_running_total_is_recounted_after_unpickling(cache):
+    cache.put("key", "value")
+    clone = pickle.loads(pickle.dumps(cache))
+    assert clone._size is None
+    assert clone.get("key") == "value"
+
+
+class CountingLM(dspy.BaseLM):
+    def __init__(self):
+        super().__init__(model="fake/counting", model_type="chat", cache=False)
+        self.calls = 0
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        self.calls += 1
+        return {"call": self.calls}
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        return self.forward(prompt=prompt, messages=messages, **kwargs)
+
+
+def test_cached_lm_answers_repeats_from_the_cache(cache):
+    lm = CountingLM()
+    cached = CachedLM(lm, "fake", cache)
+
+    assert cached.forward(prompt="hi") == cached.forward(prompt="hi") == {"call": 1}
+    assert cached.forward(prompt="other") == {"call": 2}
+    assert asyncio.run(cached.aforward(prompt="hi")) == {"call": 1}
+    assert lm.calls == 2
@@ -0,0 +1,62 @@
+"""
+Metric Tests
+============
+The judge cascade's rule tier, and that it stays out of the way unless enabled.
+"""
+
+import pytest
+
+from config import Config
+from evaluation import metrics
+from evaluation.metrics import judge_score, rule_score
+
+GOAL = "How do AI agents use the ReAct pattern?"
+CONTEXT = "ReAct interleaves reasoning traces with tool actions, so agents observe results before the next thought."
+
+
+def test_empty_insight_scores_one():
+    assert rule_score(GOAL, CONTEXT, "") == 1.0
+
+
+def test_short_answer_goes_to_the_judge():
+    assert rule_score(GOAL, CONTEXT, "Agents interleave reasoning and tool actions.") is None
+
+
+def test_echo_of_the_goal_scores_one():
+    insight = "AI agents use the ReAct pattern. " * 3
+    assert rule_score(GOAL, CONTEXT, insight) == 1.0
+
+
+def test_ungrounded_insight_scores_two():
+    insight = "Bananas ripen faster beside apples because ethylene gas accelerates softening and sweetness."
+    assert rule_score(GOAL, CONTEXT, insight) == 2.0
+
+
+def test_grounded_insight_needs_a_judge():
+    insight = "Agents alternate reasoning traces with tool actions and observe each result before the next thought."
+    assert rule_score(GOAL, CONTEXT, insight) is None
+
+
+@pytest.fixture
+def fake_judge(monkeypatch):
+    calls = []
+
+    def judge_once(research_goal, context, insight):
+        calls.append(insight)
+        return 4.0
+
+    monkeypatch.setattr(metrics, "_judge_once", judge_once)
+    return calls
+
+
+def test_cascade_is_off_by_default(fake_judge):
+    assert not Config.JUDGE_CASCADE_ENABLED
+    assert judge_score(GOAL, CONTEXT, "") == (4.0, "judge")
+    assert fake_judge == [""]
+
+
+def test_cascade_settles_clear_failures_without_a_judge(fake_judge, monkeypatch):
+    monkeypatch.setattr(Config, "JUDGE_CASCADE_ENABLED", True)
+    assert judge_score(GOAL, CONTEXT, "") == (1.0, "rules")
+    assert judge_score(GOAL, CONTEXT, "Agents interleave reasoning and tool actions.") == (4.0, "judge")
+    assert len(fake_judge) == 1
@@ -0,0 +1,41 @@
+"""
+Multi-Hop Tests
+===============
+Fan-out hops widen the retrieved context.
+"""
+
+import json
+
+import dspy
+
+from benchmarks.fake_lm import ScriptedLM
+from src.modules.multihop import AuraMultiHop
+from src.utils.model_factory import MockRetriever
+
+SUB_QUERIES = ["DSPy signatures modules optimization", "retrieval augmented generation hallucination",
+               "ReAct pattern agents tools"]
+
+
+class SubQueryLM(ScriptedLM):
+    """Answers hop queries with fixed, topically distinct sub-queries."""
+
+    def _value(self, name, hint, rng, vocab, prompt):
+        if name == "search_queries":
+            return json.dumps(SUB_QUERIES)
+        if name == "search_query":
+            return SUB_QUERIES[0]
+        return super()._value(name, hint, rng, vocab, prompt)
+
+
+def run(fanout):
+    with dspy.context(lm=SubQueryLM(), rm=MockRetriever(k=1)):
+        return AuraMultiHop(max_hops=1, k=1, fanout=fanout)(question="How do DSPy, RAG and agents relate?")
+
+
+def test_fanout_adds_distinct_passages():
+    single, fanned = run(fanout=1), run(fanout=3)
+
+    assert len(single.context) == 1
+    assert len(fanned.context) == 3
+    assert len(set(fanned.context)) == 3
+    assert set(single.context) < set(fanned.context)
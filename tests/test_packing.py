@@ -0,0 +1,66 @@
+"""
+Context Packing Tests
+=====================
+ContextPacker stays within its budget, cuts at word boundaries and sizes
+the budget from the model that runs synthesis.
+"""
+
+import random
+
+import dspy
+
+from config import Config
+from src.modules.rag import AuraArchitect
+from src.retrieval.context_store import estimate_tokens
+from src.retrieval.packing import ContextPacker
+
+WORDS = "agents react retrieval dspy optimizer pattern tool loop reasoning action observation".split()
+
+
+def random_passages(rng):
+    return [
+        ". ".join(" ".join(rng.choices(WORDS, k=rng.randint(1, 9))) for _ in range(rng.randint(1, 12))) + "."
+        for _ in range(rng.randint(1, 6))
+    ]
+
+
+def test_packing_never_exceeds_the_budget():
+    rng = random.Random(0)
+    for _ in range(500):
+        budget = rng.randint(5, 200)
+        packed, stats = ContextPacker(token_budget=budget, min_fragment_tokens=2).pack(random_passages(rng), "react agents")
+        assert stats["packed_tokens"] == sum(estimate_tokens(p) for p in packed)
+        assert stats["packed_tokens"] <= budget
+
+
+def test_compressed_fragments_end_on_whole_words():
+    rng = random.Random(1)
+    for _ in range(500):
+        passages = random_passages(rng)
+        packed, _ = ContextPacker(token_budget=rng.randint(5, 60), min_fragment_tokens=2).pack(passages, "react agents")
+        for fragment in packed:
+            assert all(word.strip(".") in WORDS for word in fragment.split())
+
+
+def test_passages_that_fit_pass_through():
+    passages = ["ReAct interleaves reasoning and acting.", "DSPy compiles prompts."]
+    packed, stats = ContextPacker(token_budget=1000).pack(passages, "react")
+    assert packed == passages
+    assert stats["saved_tokens"] == 0
+
+
+def test_packing_is_opt_in():
+    assert not Config.CONTEXT_PACKING_ENABLED
+
+
+def test_budget_comes_from_the_synthesizers_lm():
+    packer = ContextPacker(context_fraction=0.5)
+    module = AuraArchitect(k=3, packer=packer)
+    module.synthesize.predict.lm = dspy.LM("ollama_chat/phi")  # 2048-token window, e.g. a model route
+    passages = ["reasoning and acting " * 300, "tool use by agents " * 300]
+
+    with dspy.context(lm=dspy.LM("openai/gpt-4o")):
+        _, stats = module._context(passages, "react agents")
+
+    assert stats["budget"] == 1024
+    assert stats["packed_tokens"] <= 1024
@@ -0,0 +1,116 @@
+"""
+AuraArchitect Tests
+===================
+The sync and async pipelines behave alike: same events, same failures.
+"""
+
+import asyncio
+import contextvars
+import time
+
+import dspy
+import pytest
+
+from benchmarks.fake_lm import ScriptedLM
+from src.modules.rag import AuraArchitect
+from src.utils.model_factory import MockRetriever
+from src.utils.streaming import _event_sink
+
+GOAL = "how do AI agents use the ReAct pattern"
+
+
+class FailingRewriteLM(ScriptedLM):
+    """Raises on query rewriting, answers everything else."""
+
+    def _fail(self, messages):
+        if "search_query" in str(messages[-1]) and "structured_insight" not in str(messages[0]):
+            raise RuntimeError("provider down")
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        self._fail(messages)
+        return super().forward(prompt=prompt, messages=messages, **kwargs)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        self._fail(messages)
+        return await super().aforward(prompt=prompt, messages=messages, **kwargs)
+
+
+class SlowRewriteLM(ScriptedLM):
+    """Takes `rewrite_seconds` to rewrite the query, answers everything else at once."""
+
+    def __init__(self, rewrite_seconds):
+        super().__init__()
+        self.rewrite_seconds = rewrite_seconds
+
+    def _is_rewrite(self, messages):
+        return "structured_insight" not in str(messages[0])
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        if self._is_rewrite(messages):
+            time.sleep(self.rewrite_seconds)
+        return super().forward(prompt=prompt, messages=messages, **kwargs)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        if self._is_rewrite(messages):
+            await asyncio.sleep(self.rewrite_seconds)
+        return await super().aforward(prompt=prompt, messages=messages, **kwargs)
+
+
+def run_with_events(call):
+    """Run call() with an event sink; returns (result, [event kinds])."""
+    events = []
+
+    def run():
+        _event_sink.set(events.append)
+        return call()
+
+    return contextvars.copy_context().run(run), [kind for kind, _ in events]
+
+
+@pytest.fixture
+def pipeline():
+    with dspy.context(lm=ScriptedLM(), rm=MockRetriever(k=3)):
+        yield AuraArchitect(k=3)
+
+
+def test_forward_and_aforward_agree(pipeline):
+    sync, sync_events = run_with_events(lambda: pipeline(research_goal=GOAL))
+    async_, async_events = run_with_events(lambda: asyncio.run(pipeline.acall(research_goal=GOAL)))
+
+    assert sync_events == async_events == ["search_query", "passages"]
+    assert sync.search_query == async_.search_query
+    assert sync.context == async_.context
+
+
+@pytest.mark.parametrize("speculative", [False, True])
+def test_rewrite_errors_propagate_in_both_paths(speculative):
+    with dspy.context(lm=FailingRewriteLM(), rm=MockRetriever(k=3)):
+        module = AuraArchitect(k=3, speculative=speculative)
+        with pytest.raises(RuntimeError, match="provider down"):
+            module(research_goal=GOAL)
+        with pytest.raises(RuntimeError, match="provider down"):
+            asyncio.run(module.acall(research_goal=GOAL))
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_slow_rewrite_falls_back_to_the_goals_passages(use_async):
+    retriever = MockRetriever(k=3)
+    with dspy.context(lm=SlowRewriteLM(rewrite_seconds=0.5), rm=retriever):
+        module = AuraArchitect(k=3, speculative=True, rewrite_timeout=0.05)
+        start = time.perf_counter()
+        if use_async:
+            result = asyncio.run(module.acall(research_goal=GOAL))
+        else:
+            result = module(research_goal=GOAL)
+
+    assert time.perf_counter() - start < 0.5
+    assert result.search_query == GOAL
+    assert result.context == [p["long_text"] for p in retriever(GOAL)]
+
+
+def test_speculation_fuses_the_rewrites_and_the_goals_passages():
+    with dspy.context(lm=ScriptedLM(), rm=MockRetriever(k=3)):
+        result = AuraArchitect(k=3, speculative=True, rewrite_timeout=5.0)(research_goal=GOAL)
+
+    assert result.search_query != GOAL
+    assert len(result.context) == 3
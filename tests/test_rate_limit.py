@@ -0,0 +1,81 @@
+"""
+Rate Limit Tests
+================
+Bucket pacing, 429 pauses and interactive-over-batch priority, driven
+through RateLimiter._take with a fixed clock.
+"""
+
+import pytest
+
+from src.utils import rate_limit
+from src.utils.rate_limit import BATCH, HOLD_SLACK, INTERACTIVE, RateLimiter
+
+
+def test_requests_are_paced_at_the_budget():
+    limiter = RateLimiter(requests_per_minute=60, burst=2)  # one per second
+    state = {}
+
+    assert limiter._take(state, 100.0, 0, BATCH) == 0.0
+    assert limiter._take(state, 100.0, 0, BATCH) == 0.0  # the burst
+    assert limiter._take(state, 100.0, 0, BATCH) == pytest.approx(1.0)
+    assert limiter._take(state, 100.5, 0, BATCH) == pytest.approx(0.5)
+    assert limiter._take(state, 101.0, 0, BATCH) == 0.0
+
+
+def test_tokens_are_paced_and_oversized_requests_wait_for_a_full_bucket():
+    limiter = RateLimiter(tokens_per_minute=600, burst_seconds=10)  # 10 tokens/s, 100 capacity
+    state = {}
+
+    assert limiter._take(state, 0.0, 80, BATCH) == 0.0
+    assert limiter._take(state, 0.0, 50, BATCH) == pytest.approx(3.0)
+    assert limiter._take(state, 0.0, 10_000, BATCH) == pytest.approx(8.0)  # waits for 100, not 10,000
+
+
+def test_settle_returns_unused_tokens():
+    limiter = RateLimiter(tokens_per_minute=600, burst_seconds=10)
+    limiter.acquire(80)
+    limiter.settle(reserved=80, used=30)
+    assert limiter.state.update(lambda s: s["tokens"]) == pytest.approx(70.0, abs=1.0)
+
+
+def test_pause_holds_every_caller():
+    limiter = RateLimiter(requests_per_minute=6000, burst=10)
+    state = {"paused_until": 105.0}
+    assert limiter._take(state, 100.0, 0, INTERACTIVE) == pytest.approx(5.0)
+    assert limiter._take(state, 105.0, 0, INTERACTIVE) == 0.0
+
+
+def test_batch_stands_back_while_interactive_waits():
+    limiter = RateLimiter(requests_per_minute=60, burst=1)
+    state = {}
+    limiter._take(state, 100.0, 0, BATCH)  # spends the bucket
+
+    interactive_wait = limiter._take(state, 100.0, 0, INTERACTIVE)
+    assert interactive_wait == pytest.approx(1.0)
+    # The bucket refills at 101.0, but batch callers keep off it until the interactive request went
+    assert limiter._take(state, 101.0, 0, BATCH) == pytest.approx(HOLD_SLACK)
+    assert limiter._take(state, 101.0, 0, INTERACTIVE) == 0.0
+    assert limiter._take(state, 101.0 + HOLD_SLACK, 0, BATCH) > 0  # the bucket is empty again
+    assert limiter._take(state, 102.0 + HOLD_SLACK, 0, BATCH) == 0.0
+
+
+def test_priority_follows_the_request_context(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_default_priority", BATCH)
+    assert rate_limit.current_priority() == BATCH
+    with rate_limit.request_priority("interactive"):
+        assert rate_limit.current_priority() == INTERACTIVE
+    assert rate_limit.current_priority() == BATCH
+
+
+def test_most_specific_limit_wins(monkeypatch):
+    monkeypatch.setattr(rate_limit.Config, "RATE_LIMIT_SHARED", False)
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setattr(rate_limit, "_config_loaded", True)
+    rate_limit.set_rate_limit("openai", 500)
+    rate_limit.set_rate_limit("openai", 60, model="gpt-4o")
+
+    assert rate_limit.get_rate_limiter("openai", "openai/gpt-4o").request_rate == pytest.approx(
+        60 * rate_limit.Config.RATE_LIMIT_HEADROOM / 60.0)
+    assert rate_limit.get_rate_limiter("openai", "gpt-4o-mini").request_rate == pytest.approx(
+        500 * rate_limit.Config.RATE_LIMIT_HEADROOM / 60.0)
+    assert rate_limit.get_rate_limiter("deepseek") is None
@@ -0,0 +1,62 @@
+"""
+Batch Research Tests
+====================
+Resuming skips finished goals, retries failed ones and recovers from a
+line torn by a crash.
+"""
+
+import json
+
+import pytest
+
+from benchmarks.fake_lm import ScriptedLM
+from config import Config
+from pipelines import research
+from pipelines.research import completed_ids
+
+
+def write_lines(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def test_completed_ids_skips_errors_and_truncates_a_torn_line(tmp_path):
+    out = tmp_path / "out.jsonl"
+    write_lines(out, [
+        json.dumps({"id": 0, "insight": "done"}) + "\n",
+        json.dumps({"id": 1, "error": "RateLimitError: 429"}) + "\n",
+        "not json\n",
+        '{"id": 2, "insi',
+    ])
+
+    assert completed_ids(str(out)) == {0}
+    assert out.read_text(encoding="utf-8").endswith("not json\n")
+
+
+def test_missing_output_means_nothing_is_done(tmp_path):
+    assert completed_ids(str(tmp_path / "out.jsonl")) == set()
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(research.ModelFactory, "get_model", staticmethod(lambda *args, **kwargs: ScriptedLM()))
+    monkeypatch.setattr(Config, "RETRIEVAL_CACHE_PATH", None)
+
+
+def test_resume_reruns_only_unfinished_goals(tmp_path, offline):
+    goals = tmp_path / "goals.jsonl"
+    write_lines(goals, [json.dumps({"id": i, "research_goal": f"how do agents use tools {i}"}) + "\n"
+                        for i in range(4)])
+    out = tmp_path / "out.jsonl"
+    write_lines(out, [
+        json.dumps({"id": 0, "insight": "done"}) + "\n",
+        json.dumps({"id": 1, "error": "Timeout"}) + "\n",
+        '{"id": 2, "insi',
+    ])
+
+    research.run(str(goals), str(out), workers=2)
+
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["id"] for r in records[:2]] == [0, 1]
+    assert sorted(r["id"] for r in records[2:]) == [1, 2, 3]
+    assert all("error" not in r for r in records[2:])
+    assert completed_ids(str(out)) == {0, 1, 2, 3}
@@ -0,0 +1,79 @@
+"""
+Retrieval Cache Tests
+=====================
+RetrievalCache TTL and eviction, CachedRetriever hit counting, and cache
+keys per retriever endpoint.
+"""
+
+import time
+
+from config import Config
+from src.retrieval.cache import CachedRetriever, RetrievalCache
+from src.utils.lm_cache import LMCache
+from src.utils.model_factory import ModelFactory
+
+
+class CountingRetriever:
+    def __init__(self, k=3):
+        self.k = k
+        self.calls = 0
+
+    def __call__(self, query, k=None):
+        self.calls += 1
+        return [{"long_text": f"passage for {query}", "text": "title"}]
+
+
+def test_hits_are_served_from_the_cache_and_counted():
+    retriever = CountingRetriever()
+    cached = CachedRetriever(retriever, "counting", RetrievalCache())
+
+    first = cached("What is DSPy?")
+    second = cached("  what is   dspy? ")  # normalized to the same key
+
+    assert retriever.calls == 1
+    assert [p.long_text for p in second] == [p.long_text for p in first]
+    assert second[0] is not first[0]
+    stats = cached.cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = RetrievalCache(ttl=0.05)
+    key = cache.make_key("r", "query", 3)
+    cache.put(key, [{"long_text": "x"}])
+    assert cache.get(key) is not None
+    time.sleep(0.06)
+    assert cache.get(key) is None
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = RetrievalCache(max_entries=2)
+    keys = [cache.make_key("r", q, 3) for q in ("a", "b", "c")]
+    cache.put(keys[0], ["a"])
+    cache.put(keys[1], ["b"])
+    cache.get(keys[0])  # "a" is now the most recently used
+    cache.put(keys[2], ["c"])
+
+    assert cache.get(keys[0]) == ["a"]
+    assert cache.get(keys[1]) is None
+
+
+def test_disk_tier_answers_after_the_memory_tier_is_lost(tmp_path):
+    disk = LMCache(str(tmp_path / "retrieval.sqlite"))
+    key = RetrievalCache.make_key("r", "query", 3)
+    RetrievalCache(disk=disk).put(key, ["passage"])
+
+    fresh = RetrievalCache(disk=disk)
+    assert fresh.get(key) == ["passage"]
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_colbert_cache_is_keyed_on_the_endpoint_used(monkeypatch):
+    monkeypatch.setattr(Config, "RETRIEVAL_CACHE_PATH", None)
+    default = ModelFactory.get_retriever("colbert", cache=True, failover=False)
+    same = ModelFactory.get_retriever("colbert", url=Config.COLBERT_URL, cache=True, failover=False)
+    other = ModelFactory.get_retriever("colbert", url="http://other:8893/api/search", cache=True, failover=False)
+
+    assert default.retriever_id == same.retriever_id == f"colbert:{Config.COLBERT_URL}"
+    assert other.retriever_id == "colbert:http://other:8893/api/search"
+
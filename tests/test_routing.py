@@ -0,0 +1,97 @@
+"""
+Model Routing Tests
+===================
+Routed predictors keep good cheap answers and escalate bad or failed
+ones to the pipeline's LM.
+"""
+
+import asyncio
+
+import dspy
+import pytest
+
+from benchmarks.fake_lm import ScriptedLM
+from src.modules.rag import AuraArchitect
+from src.utils.model_factory import MockRetriever
+from src.utils.routing import parse_routes, reset_routing_stats, route_module, routing_stats
+
+GOAL = "how do AI agents use the ReAct pattern"
+
+
+class CheapLM(ScriptedLM):
+    """A small model: answers search queries with `query`, or fails."""
+
+    def __init__(self, query="react agents tools", fail=False):
+        super().__init__()
+        self.model = "scripted/cheap"
+        self.query = query
+        self.fail = fail
+
+    def _respond(self, messages, kwargs):
+        if self.fail:
+            raise ConnectionError("model not loaded")
+        return super()._respond(messages, kwargs)
+
+    def _value(self, name, hint, rng, vocab, prompt):
+        if name == "search_query":
+            return self.query
+        return super()._value(name, hint, rng, vocab, prompt)
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    reset_routing_stats()
+    yield
+    reset_routing_stats()
+
+
+def run(cheap, escalate=True, use_async=False):
+    """Run AuraArchitect with query rewriting routed to `cheap`; returns (prediction, pipeline LM)."""
+    pipeline_lm = ScriptedLM()
+    with dspy.context(lm=pipeline_lm, rm=MockRetriever(k=3)):
+        module = AuraArchitect(k=3)
+        assert route_module(module, {"GenerateSearchQuery": cheap}, escalate=escalate) == 1
+        if use_async:
+            return asyncio.run(module.acall(research_goal=GOAL)), pipeline_lm
+        return module(research_goal=GOAL), pipeline_lm
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_valid_cheap_answers_are_kept(use_async):
+    result, pipeline_lm = run(CheapLM(), use_async=use_async)
+
+    assert result.search_query == "react agents tools"
+    assert pipeline_lm.calls == 1  # synthesis only
+    stats = routing_stats()["GenerateSearchQuery"]
+    assert (stats["calls"], stats["escalated"]) == (1, 0)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_empty_queries_escalate_to_the_pipeline_lm(use_async):
+    result, pipeline_lm = run(CheapLM(query="the of and"), use_async=use_async)
+
+    assert result.search_query != "the of and"
+    assert pipeline_lm.calls == 2  # the escalated rewrite, then synthesis
+    stats = routing_stats()["GenerateSearchQuery"]
+    assert (stats["escalated"], stats["errors"], stats["escalation_rate"]) == (1, 0, 1.0)
+
+
+def test_failed_calls_escalate():
+    result, pipeline_lm = run(CheapLM(fail=True))
+
+    assert result.search_query
+    assert pipeline_lm.calls == 2
+    assert routing_stats()["GenerateSearchQuery"]["errors"] == 1
+
+
+def test_without_escalation_the_cheap_answer_stands():
+    result, pipeline_lm = run(CheapLM(query="the of and"), escalate=False)
+
+    assert result.search_query == "the of and"
+    assert pipeline_lm.calls == 1
+
+
+def test_parse_routes_rejects_unknown_signatures():
+    assert parse_routes("GenerateSearchQuery=ollama:phi") == {"GenerateSearchQuery": ("ollama", "phi")}
+    with pytest.raises(ValueError, match="Unknown signature"):
+        parse_routes("Rewriter=ollama:phi")
@@ -0,0 +1,96 @@
+"""
+Server Tests
+============
+Concurrent requests to create_server share batched retrieval calls.
+"""
+
+import contextvars
+import json
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+import pytest
+
+from benchmarks.fake_lm import ScriptedLM
+from server import create_server
+from src.retrieval.batching import BatchingRetriever
+from src.utils.model_factory import MockRetriever
+
+
+class RecordingRetriever(MockRetriever):
+    """MockRetriever that records the size of every batch it scores."""
+
+    def __init__(self, k=3):
+        super().__init__(k=k)
+        self.batch_sizes = []
+        self.single_calls = 0
+
+    def __call__(self, query, k=None):
+        self.single_calls += 1
+        return super().__call__(query, k)
+
+    def batch(self, queries, k=None):
+        self.batch_sizes.append(len(queries))
+        return super().batch(queries, k)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+    previous = dspy.settings.lm, dspy.settings.rm
+
+    def start(**kwargs):
+        server = create_server(port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    dspy.settings.configure(lm=previous[0], rm=previous[1])
+
+
+def post(url, goal):
+    request = urllib.request.Request(url, data=json.dumps({"research_goal": goal}).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_concurrent_requests_share_retrieval_batches(serve):
+    retriever = RecordingRetriever(k=3)
+    rm = BatchingRetriever(retriever, max_wait_ms=200)
+    url = serve(modes=["rag"], lm=ScriptedLM(latency_ms=20), rm=rm)
+
+    goals = [f"how do AI agents use tools, case {i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=len(goals)) as pool:
+        results = list(pool.map(lambda goal: post(f"{url}/research/rag", goal), goals))
+
+    assert all(status == 200 and "error" not in record for status, record in results)
+    assert sum(retriever.batch_sizes) == len(goals)
+    assert retriever.single_calls == 0
+    assert rm.stats()["batches"] < len(goals)
+    assert max(retriever.batch_sizes) > 1
+
+
+def test_batches_run_in_the_callers_context():
+    marker = contextvars.ContextVar("marker", default=None)
+    seen = []
+
+    class ContextRetriever(MockRetriever):
+        def batch(self, queries, k=None):
+            seen.append(marker.get())
+            return super().batch(queries, k)
+
+    rm = BatchingRetriever(ContextRetriever(k=1), max_wait_ms=1)
+
+    def call():
+        marker.set("caller")
+        return rm("dspy")
+
+    assert len(contextvars.copy_context().run(call)) == 1
+    assert seen == ["caller"]
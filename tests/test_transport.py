@@ -0,0 +1,195 @@
+"""
+Transport Tests
+===============
+HTTPTransport, circuit breakers and FailoverRetriever against a local
+http.server stub.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config import Config
+from src.retrieval.remote import ColBERTRetriever, FailoverRetriever
+from src.utils.transport import CircuitOpenError, HTTPTransport, RetryPolicy
+
+
+class StubServer(ThreadingHTTPServer):
+    """Answers each request with the next scripted (status, headers, body); the last one repeats."""
+
+    def __init__(self, responses):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.responses = list(responses)
+        self.hits = []
+        self.on_request = None  # called as each request arrives
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/search"
+
+    def next_response(self):
+        self.hits.append(time.monotonic())
+        if self.on_request is not None:
+            self.on_request()
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, headers, body = self.server.next_response()
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+TOPK = {"topk": [{"text": "remote passage", "pid": 1, "score": 9.0}]}
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(*responses):
+        server = StubServer(responses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def breaker_config(monkeypatch):
+    # Each stub listens on a fresh port, so it gets a fresh breaker built from these
+    monkeypatch.setattr(Config, "BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(Config, "BREAKER_RESET_TIMEOUT", 0.3)
+
+
+def test_retry_after_is_honoured_on_429(stub):
+    server = stub((429, {"Retry-After": "0.3"}, {}), (200, {}, TOPK))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=2, backoff_base=0.01, backoff_max=1.0, budget=5.0))
+
+    response = transport.get(server.url)
+
+    assert response.status_code == 200
+    assert len(server.hits) == 2
+    assert server.hits[1] - server.hits[0] >= 0.3
+
+
+def test_5xx_retried_with_backoff_until_success(stub):
+    server = stub((503, {}, {}), (502, {}, {}), (200, {}, TOPK))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=3, backoff_base=0.01, backoff_max=0.05, budget=5.0))
+
+    assert transport.get(server.url).json() == TOPK
+    assert len(server.hits) == 3
+
+
+def test_persistent_5xx_raises_after_max_retries(stub):
+    server = stub((500, {}, {}))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=2, backoff_base=0.01, backoff_max=0.05, budget=5.0))
+
+    with pytest.raises(OSError):
+        transport.get(server.url)
+    assert len(server.hits) == 3
+
+
+def test_breaker_opens_then_half_opens_then_closes(stub, breaker_config):
+    server = stub((503, {}, {}), (503, {}, {}), (200, {}, TOPK))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=0))
+    breaker = transport.breaker(server.url)
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            transport.get(server.url)
+    assert breaker.state == "open"
+
+    # Open: fails fast without reaching the server
+    with pytest.raises(CircuitOpenError):
+        transport.get(server.url)
+    assert len(server.hits) == 2
+
+    # After the cool-down, one trial request goes out half-open and closes the circuit
+    time.sleep(0.35)
+    states = []
+    server.on_request = lambda: states.append(breaker.state)
+    assert transport.get(server.url).status_code == 200
+    assert states == ["half_open"]
+    assert breaker.state == "closed"
+
+
+def test_429s_do_not_open_the_breaker(stub, breaker_config):
+    server = stub((429, {"Retry-After": "0"}, {}))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=0))
+
+    for _ in range(4):
+        with pytest.raises(OSError):
+            transport.get(server.url)
+
+    assert transport.breaker(server.url).state == "closed"
+    assert len(server.hits) == 4
+
+
+def test_failed_half_open_trial_reopens(stub, breaker_config):
+    server = stub((503, {}, {}))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=0))
+    breaker = transport.breaker(server.url)
+    for _ in range(2):
+        with pytest.raises(OSError):
+            transport.get(server.url)
+
+    time.sleep(0.35)
+    with pytest.raises(OSError):
+        transport.get(server.url)  # the trial request
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+
+class LocalRetriever:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, query, k=None):
+        self.calls += 1
+        return [{"long_text": f"local passage for {query}"}]
+
+
+def test_failover_to_local_retriever(stub, breaker_config):
+    server = stub((503, {}, {}))
+    transport = HTTPTransport(policy=RetryPolicy(max_retries=0))
+    local = LocalRetriever()
+    retriever = FailoverRetriever(ColBERTRetriever(server.url, k=1, transport=transport), local)
+
+    for _ in range(3):
+        passages = retriever("dspy")
+        assert passages[0]["long_text"] == "local passage for dspy"
+
+    assert retriever.failovers == 3
+    assert local.calls == 3
+    # The third query hit the open breaker, not the server
+    assert len(server.hits) == 2
+
+
+def test_failover_passes_through_remote_answers(stub):
+    server = stub((200, {}, TOPK))
+    local = LocalRetriever()
+    retriever = FailoverRetriever(ColBERTRetriever(server.url, k=1, transport=HTTPTransport()), local)
+
+    passages = retriever("dspy")
+
+    assert [p.long_text for p in passages] == ["remote passage"]
+    assert retriever.failovers == 0
+    assert local.calls == 0